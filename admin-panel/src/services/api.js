@@ -94,6 +94,115 @@ export async function getThread(threadId) {
   }
 }
 
+/**
+ * List all LangGraph store items of a thread (highlights, memory_records,
+ * improvements and the collections meta record).
+ * @param {string} threadId - Thread ID
+ * @returns {Promise<Array>} Store items ({ namespace, key, value, ... })
+ */
+export async function searchThreadStore(threadId, { pageSize = 100 } = {}) {
+  const out = []
+  let offset = 0
+  try {
+    for (;;) {
+      const response = await api.post('/store/items/search', {
+        namespace_prefix: ['threads', threadId],
+        limit: pageSize,
+        offset
+      })
+      const items = response.data?.items || []
+      out.push(...items)
+      if (items.length < pageSize) break
+      offset += items.length
+    }
+    return out
+  } catch (error) {
+    console.error(`Error searching store for thread ${threadId}:`, error)
+    throw error
+  }
+}
+
+/**
+ * Aggregate LLM usage ledger entries per (node, model): calls, errors, token
+ * totals and avg/p95/max latency, most expensive first.
+ * @param {Array} entries - Ledger entries ({ at, node, model, prompt_tokens, ..., ms, error })
+ * @param {Date|null} since - Only entries at or after this time
+ * @returns {Object} { totals, nodes }
+ */
+export function summarizeLlmUsage(entries, since = null) {
+  const groups = new Map()
+  for (const e of entries) {
+    if (!e || typeof e !== 'object') continue
+    if (since) {
+      const at = new Date(e.at)
+      if (Number.isNaN(at.getTime()) || at < since) continue
+    }
+    const node = String(e.node || 'unknown')
+    const model = String(e.model || 'unknown')
+    const key = `${node}\u0000${model}`
+    if (!groups.has(key)) {
+      groups.set(key, { node, model, calls: 0, errors: 0, prompt_tokens: 0, completion_tokens: 0, cached_tokens: 0, ms: [] })
+    }
+    const g = groups.get(key)
+    g.calls += 1
+    if (e.error) g.errors += 1
+    g.prompt_tokens += Number(e.prompt_tokens) || 0
+    g.completion_tokens += Number(e.completion_tokens) || 0
+    g.cached_tokens += Number(e.cached_tokens) || 0
+    g.ms.push(Number(e.ms) || 0)
+  }
+
+  const nodes = [...groups.values()].map(({ ms, ...g }) => {
+    ms.sort((a, b) => a - b)
+    return {
+      ...g,
+      avg_ms: Math.round((ms.reduce((sum, v) => sum + v, 0) / ms.length) * 10) / 10,
+      p95_ms: ms[Math.min(ms.length - 1, Math.floor(0.95 * ms.length))],
+      max_ms: ms[ms.length - 1]
+    }
+  })
+  // Most expensive first: prompt + completion tokens, then total latency.
+  nodes.sort((a, b) =>
+    (b.prompt_tokens + b.completion_tokens) - (a.prompt_tokens + a.completion_tokens) ||
+    b.avg_ms * b.calls - a.avg_ms * a.calls
+  )
+  const totals = {}
+  for (const field of ['calls', 'errors', 'prompt_tokens', 'completion_tokens', 'cached_tokens']) {
+    totals[field] = nodes.reduce((sum, n) => sum + n[field], 0)
+  }
+  return { totals, nodes }
+}
+
+/**
+ * LLM usage report of a thread (tokens and latency per graph node and model),
+ * from the thread's usage ledger: the store item ("threads", id, "meta") / "llm_usage".
+ * @param {string} threadId - Thread ID
+ * @param {Object} [options]
+ * @param {number} [options.hours] - Only calls from the last N hours
+ * @returns {Promise<Object>} { totals, nodes, ledger_size, oldest_at }
+ */
+export async function getThreadUsage(threadId, { hours = null } = {}) {
+  let item = null
+  try {
+    const response = await api.get('/store/items', {
+      params: { namespace: `threads.${threadId}.meta`, key: 'llm_usage' }
+    })
+    item = response.data
+  } catch (error) {
+    if (error.response?.status !== 404) {
+      console.error(`Error getting usage ledger for thread ${threadId}:`, error)
+      throw error
+    }
+  }
+  const entries = Array.isArray(item?.value?.entries) ? item.value.entries : []
+  const since = hours ? new Date(Date.now() - hours * 3600 * 1000) : null
+  return {
+    ...summarizeLlmUsage(entries, since),
+    ledger_size: entries.length,
+    oldest_at: entries.length ? entries[0].at : null
+  }
+}
+
 /**
  * Get thread history (checkpoints)
  * @param {string} threadId - Thread ID
@@ -226,6 +335,7 @@ export default {
   getThreadState,
   getThread,
   getThreadHistory,
+  getThreadUsage,
   createRunWait,
   setIntroStatus,
   upsertUsers,
@@ -7,7 +7,7 @@ from langgraph.graph import add_messages
 from .humans import Human
 from .improvements import Improvement
 from .messages import MessageAPI, count_tokens
-from .utils.reducers import add_user, add_improvements, manage_state
+from .utils.reducers import add_user, add_improvements, manage_state, merge_thread_context
 
 
 class InternalState(BaseModel):
@@ -81,6 +81,7 @@ class ExternalState(BaseModel):
                               manage_state] = Field(default=None)
     improvements: Annotated[list[Improvement], add_improvements] = Field(default_factory=list)
     thread_info_entries: list[str] = Field(default_factory=list)
+    thread_context: Annotated[dict, merge_thread_context] = Field(default_factory=dict)
     chat_manager_response_stats: dict = Field(default_factory=dict)
 
     @property
@@ -82,6 +82,13 @@ def add_improvements(left: list["Improvement"], right: list["Improvement"]) -> l
     return left
 
 
+def merge_thread_context(left: Optional[dict], right: Optional[dict]) -> dict:
+    # Inputs without thread context (admin panel, cron) must not wipe hoisted values.
+    merged = dict(left or {})
+    merged.update({k: v for k, v in (right or {}).items() if v is not None})
+    return merged
+
+
 def manage_state(
     a: Optional[Union["InternalState", list[Any]]],
     b: Optional[Union["InternalState", list[Any]]]
@@ -6,6 +6,7 @@ from typing import Literal, Optional, Any
 from langchain_core.messages import HumanMessage
 import uuid
 from conversation_states.humans import Human
+from conversation_states.compact import split_thread_context
 from datetime import datetime, timezone
 
 
@@ -16,6 +17,8 @@ class ContextExtractor(BaseModel):
     content_type: Literal["text", "command"]
     chat_id: str
     thread_id: str
+    # Thread-constant metadata hoisted off message kwargs (stored once per thread).
+    thread_context: dict = {}
 
     @classmethod
     def from_update(cls, update: Update, context: ContextTypes.DEFAULT_TYPE, content_type: Literal["text", "command"]):
@@ -40,6 +43,8 @@ class ContextExtractor(BaseModel):
         reply_to_user_id = getattr(reply_to_user, "id", None) if reply_to_user else None
         reply_to_is_bot = bool(getattr(reply_to_user, "is_bot", False)) if reply_to_user else False
         reply_to_text = getattr(reply_to_message, "text", None)
+        forward_origin = getattr(tg_message, "forward_origin", None)
+        forward_chat = getattr(forward_origin, "chat", None) if forward_origin else None
         bot_username = getattr(getattr(context, "bot", None), "username", None)
         bot_id = getattr(getattr(context, "bot", None), "id", None)
 
@@ -53,30 +58,36 @@ class ContextExtractor(BaseModel):
             chat_username=chat_username,
             message_id=reply_to_message_id,
         )
+        message_kwargs, thread_context = split_thread_context({
+            "chat_id": chat_id,
+            "tg_chat_id": chat_id,
+            "tg_user_id": str(user_data.id),
+            "tg_message_id": message_id,
+            "tg_date": tg_date.isoformat() if isinstance(tg_date, datetime) else None,
+            "tg_link": msg_link,
+            "tg_reply_to_message_id": reply_to_message_id,
+            "tg_reply_to_link": reply_link,
+            "tg_reply_to_username": reply_to_username,
+            "tg_reply_to_user_id": str(reply_to_user_id) if reply_to_user_id is not None else None,
+            "tg_reply_to_is_bot": reply_to_is_bot,
+            "tg_reply_to_text": str(reply_to_text) if reply_to_text is not None else None,
+            "tg_forward_origin": getattr(forward_origin, "type", None) if forward_origin else None,
+            "tg_forward_from_chat": (
+                getattr(forward_chat, "username", None) or getattr(forward_chat, "title", None)
+            ) if forward_chat else None,
+            "tg_bot_username": str(bot_username) if bot_username else None,
+            "tg_bot_user_id": str(bot_id) if bot_id is not None else None,
+        })
         ctx_class = cls(
             chat_id=chat_id,
             thread_id=thread_id,
+            thread_context=thread_context,
             tg_message=tg_message,
             message=HumanMessage(
                 content=str(tg_message.text),
                 type="human",
                 name=username,
-                additional_kwargs={
-                    "chat_id": chat_id,
-                    "tg_chat_id": chat_id,
-                    "tg_user_id": str(user_data.id),
-                    "tg_message_id": message_id,
-                    "tg_date": tg_date.isoformat() if isinstance(tg_date, datetime) else None,
-                    "tg_link": msg_link,
-                    "tg_reply_to_message_id": reply_to_message_id,
-                    "tg_reply_to_link": reply_link,
-                    "tg_reply_to_username": reply_to_username,
-                    "tg_reply_to_user_id": str(reply_to_user_id) if reply_to_user_id is not None else None,
-                    "tg_reply_to_is_bot": reply_to_is_bot,
-                    "tg_reply_to_text": str(reply_to_text) if reply_to_text is not None else None,
-                    "tg_bot_username": str(bot_username) if bot_username else None,
-                    "tg_bot_user_id": str(bot_id) if bot_id is not None else None,
-                },
+                additional_kwargs=message_kwargs,
             ),
             user=Human(
                 username=username,
@@ -43,7 +43,6 @@ def _same_assistant_text(msg: dict[str, Any], expected_text: str) -> bool:
 async def backfill_assistant_tg_message_id(
     *,
     thread_id: str,
-    chat_id: str,
     tg_message_id: int,
     tg_date_iso: str | None,
     expected_text: str,
@@ -132,8 +131,6 @@ async def backfill_assistant_tg_message_id(
             msg_id = target_msg.get("id")
             kwargs = dict(target_msg.get("additional_kwargs") or {})
             kwargs["tg_message_id"] = int(tg_message_id)
-            kwargs["chat_id"] = str(chat_id)
-            kwargs["tg_chat_id"] = str(chat_id)
             if tg_date_iso:
                 kwargs["tg_date"] = tg_date_iso
             if tg_link:
@@ -84,7 +84,6 @@ class StreamConsumer():
             try:
                 await backfill_assistant_tg_message_id(
                     thread_id=self.thread_id,
-                    chat_id=self.chat_id,
                     tg_message_id=int(sent["tg_message_id"]),
                     tg_date_iso=sent.get("tg_date"),
                     expected_text=str(sent.get("text") or ""),
@@ -114,6 +113,8 @@ class StreamConsumer():
                     await self.restrict_responder(item)
                 case "unrestrict":
                     await self.unrestrict_responder(item)
+                case "chat-action":
+                    await self.chat_action_responder(item)
                 # case "image":
                 #     await image_responder(item)
 
@@ -124,6 +125,16 @@ class StreamConsumer():
         except Exception as e:
             logging.error(f"Failed to set reaction: {item.value} error={e}", exc_info=True)
 
+    async def chat_action_responder(self, item: Action):
+        """Placeholder status (typing/upload_photo/record_voice) while media is generated."""
+        action = str(item.value or "").strip()
+        if not action:
+            return
+        try:
+            await self.tg_message.chat.send_action(action=action)
+        except Exception as e:
+            logging.warning(f"Failed to send chat action: {action} error={e}")
+
     async def system_message_responder(self, item: Action):
         text = item.value.strip()
         if not text:
@@ -141,7 +152,6 @@ class StreamConsumer():
             try:
                 await backfill_assistant_tg_message_id(
                     thread_id=self.thread_id,
-                    chat_id=self.chat_id,
                     tg_message_id=int(sent.message_id),
                     tg_date_iso=sent.date.isoformat() if getattr(sent, "date", None) else None,
                     expected_text=str(chunk),
@@ -201,9 +201,7 @@ class StreamProducer():
         require_intro = StreamProducer._require_intro_from_metadata(meta)
         state = ExternalState()
         state.thread_info_entries = StreamProducer._thread_info_entries_from_metadata(meta)
-        msg_kwargs = dict(getattr(ctx.message, "additional_kwargs", {}) or {})
-        msg_kwargs["require_intro"] = require_intro
-        ctx.message.additional_kwargs = msg_kwargs
+        state.thread_context = {**ctx.thread_context, "require_intro": require_intro}
         state.messages = [ctx.message]
         state.users = [ctx.user]
 
@@ -346,7 +344,7 @@ class StreamProducer():
         # In responder nodes we can receive intermediate model chunks (for example
         # planner JSON) that should never be shown to Telegram users. Only pass
         # explicitly named final user-facing responder messages.
-        if "responder" in node_parts:
+        if node_parts & {"responder", "responder_media"}:
             allowed_responder_names = {
                 "chat_manager_responder",
                 "intro_responder",
@@ -7,6 +7,7 @@ from .commands import (
     get_available_commands,
     get_command_mapping,
 )
+from .mentions import ASSISTANT_ALIASES, MentionMatcher, mention_matcher, strip_webapp_deeplinks
 
 __all__ = [
     "ADMIN_USER_IDS",
@@ -14,4 +15,8 @@ __all__ = [
     "is_admin",
     "get_available_commands",
     "get_command_mapping",
+    "ASSISTANT_ALIASES",
+    "MentionMatcher",
+    "mention_matcher",
+    "strip_webapp_deeplinks",
 ]
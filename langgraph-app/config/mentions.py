@@ -0,0 +1,73 @@
+"""Bot alias configuration and the compiled mention matcher built from it."""
+
+from __future__ import annotations
+
+import os
+import re
+
+
+_DEFAULT_MENTION_TOKENS = (
+    "victorai,@victorai,викор,victorducoai_bot,@victorducoai_bot,victorai_dev_bot,@victorai_dev_bot"
+)
+
+# Russian case endings accepted after Cyrillic aliases ("викора", "викору", "викором").
+_CYRILLIC_ENDINGS = r"(?:ом|ем|ой|ою|а|я|у|ю|е|ы|и)?"
+_CYRILLIC_RE = re.compile(r"[а-яё]", re.IGNORECASE)
+
+# Telegram Mini App deep links contain the bot username but are not mentions.
+_WEBAPP_LINK = r"(?:https?://)?t\.me/[a-z0-9_]+/app(?:\?\S*)?|@[a-z0-9_]+/app(?:\?\S*)?"
+_WEBAPP_LINK_RE = re.compile(_WEBAPP_LINK, re.IGNORECASE)
+
+
+def _load_aliases() -> tuple[str, ...]:
+    raw = os.getenv("BOT_MENTION_TOKENS", _DEFAULT_MENTION_TOKENS).strip()
+    return tuple(x.strip() for x in raw.split(",") if x.strip())
+
+
+# Assistant aliases as configured (original case, used in prompts).
+ASSISTANT_ALIASES: tuple[str, ...] = _load_aliases()
+
+
+def strip_webapp_deeplinks(text: str) -> str:
+    return _WEBAPP_LINK_RE.sub(" ", text or "")
+
+
+def _alias_pattern(alias: str) -> str:
+    body = re.escape(alias)
+    if _CYRILLIC_RE.search(alias) and alias[-1].isalpha():
+        body += _CYRILLIC_ENDINGS
+    return body
+
+
+class MentionMatcher:
+    """
+    One compiled regex for all aliases. Mini App deep links are matched by the same
+    pattern (first alternative) and skipped, so text is scanned once. Word
+    boundaries use Unicode \\w, which covers Cyrillic and Latin aliases alike.
+    """
+
+    def __init__(self, aliases: tuple[str, ...] | list[str]):
+        self.aliases = tuple(a for a in aliases if a)
+        self.usernames = frozenset(a.lower().lstrip("@") for a in self.aliases)
+        # Longest first so "@victorai_dev_bot" wins over "@victorai".
+        ordered = sorted(self.aliases, key=len, reverse=True)
+        alternatives = "|".join(_alias_pattern(a) for a in ordered) or r"(?!x)x"
+        # Cheap first-character gate lets the engine skip most positions.
+        first = {a[0].lower() for a in self.aliases} | {"h", "t", "@"}
+        gate = "".join(re.escape(c) for c in sorted(first))
+        self._pattern = re.compile(
+            rf"(?<!\w)(?=[{gate}])(?:(?P<link>{_WEBAPP_LINK})|(?P<alias>{alternatives})(?!\w))",
+            re.IGNORECASE,
+        )
+
+    def mentions(self, text: str) -> bool:
+        for match in self._pattern.finditer(text or ""):
+            if match.lastgroup == "alias":
+                return True
+        return False
+
+    def is_alias_username(self, username: str | None) -> bool:
+        return bool(username) and str(username).strip().lower().lstrip("@") in self.usernames
+
+
+mention_matcher = MentionMatcher(ASSISTANT_ALIASES)
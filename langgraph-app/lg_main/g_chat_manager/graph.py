@@ -3,47 +3,38 @@ from __future__ import annotations
 from langgraph.graph import END, START, StateGraph
 from langchain_core.messages import SystemMessage
 
+from conversation_states.repository import thread_repository
 from conversation_states.states import ExternalState, InternalState
+from conversation_states.utils.delta import state_delta
 from .internal_graph import graph_chat_manager_internal
 
 
-def prepare_internal(state: ExternalState) -> InternalState:
-    # Reuse existing conversion logic.
-    return InternalState.from_external(state)
+def prepare_internal(state: ExternalState) -> dict:
+    # Reuse existing conversion logic; only channels that actually change are written.
+    recorded = state.record_sender_activity()
+    delta = state_delta(state, InternalState.from_external(state))
+    if recorded is not None:
+        # Users are mutated in place, so the delta cannot see the change by itself.
+        delta["users"] = list(state.users)
+    repo = thread_repository()
+    if repo is not None:
+        # Collections live in the store; legacy checkpoint copies are migrated and dropped.
+        delta.update(repo.cleared_channels(state))
+    return delta
 
 
-def prepare_external(state: InternalState) -> ExternalState:
-    # Return the last assistant message if any, otherwise send nothing.
+def prepare_external(state: InternalState) -> dict:
+    # Users, thread info and stats already live in shared channels; only the reply
+    # (if any) and the reasoning trace are new.
     last = state.reasoning_messages_api.last()
-    if not last:
-        return ExternalState(
-            messages=[],
-            users=list(state.users),
-            summary=state.summary,
-            last_reasoning=state.reasoning_messages,
-            memory_records=list(getattr(state, "memory_records", []) or []),
-            highlights=list(getattr(state, "highlights", []) or []),
-            improvements=list(getattr(state, "improvements", []) or []),
-            thread_info_entries=list(getattr(state, "thread_info_entries", []) or []),
-            chat_manager_response_stats=dict(getattr(state, "chat_manager_response_stats", {}) or {}),
-        )
-
-    [msg] = last
+    msg = last[0] if last else None
     # If responder produced empty output, treat it as no-op.
-    if getattr(msg, "content", "") == "":
-        return ExternalState(
-            messages=[],
-            users=list(state.users),
-            summary=state.summary,
-            last_reasoning=state.reasoning_messages,
-            memory_records=list(getattr(state, "memory_records", []) or []),
-            highlights=list(getattr(state, "highlights", []) or []),
-            improvements=list(getattr(state, "improvements", []) or []),
-            thread_info_entries=list(getattr(state, "thread_info_entries", []) or []),
-            chat_manager_response_stats=dict(getattr(state, "chat_manager_response_stats", {}) or {}),
-        )
-
-    return ExternalState.from_internal(state, msg)
+    if msg is not None and getattr(msg, "content", "") == "":
+        msg = None
+    return state_delta(state, {
+        "messages": [msg] if msg is not None else None,
+        "last_reasoning": state.reasoning_messages,
+    })
 
 
 builder = StateGraph(InternalState, input=ExternalState, output=ExternalState)
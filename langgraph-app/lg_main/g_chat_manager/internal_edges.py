@@ -2,7 +2,10 @@ from __future__ import annotations
 
 from typing import Literal
 
+from langgraph.graph import END
+
 from conversation_states.states import InternalState
+from .internal_nodes import has_pending_media
 
 
 def should_use_tools(state: InternalState) -> Literal["tools", "responder"]:
@@ -14,3 +17,9 @@ def should_use_tools(state: InternalState) -> Literal["tools", "responder"]:
     if tool_calls:
         return "tools"
     return "responder"
+
+
+def after_responder(state: InternalState) -> Literal["responder_media", "__end__"]:
+    if has_pending_media(state):
+        return "responder_media"
+    return END
@@ -0,0 +1,167 @@
+"""
+Doer tools of the chat manager: the LangChain tool definitions bound to the doer
+model and the registry run_tools dispatches calls through. Imported on first use
+by internal_nodes so the tool sets stay out of graph import time.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable
+
+from conversation_states.states import InternalState
+from tool_sets.chat_memory import _get_unique_categories_impl
+from tool_sets.chat_memory import _add_memory_record_result, _list_memory_records_impl, _search_memory_records_impl
+from tool_sets.chat_memory import add_memory_record, list_memory_records, search_memory_records
+from tool_sets.highlights import (
+    _add_highlights_impl,
+    _delete_highlight_impl,
+    _search_highlights_impl,
+    _trending_highlights_impl,
+    add_highlights,
+    delete_highlight,
+    search_highlights,
+    trending_highlights,
+)
+from tool_sets.improvements import (
+    _add_improvement_impl,
+    _list_improvements_impl,
+    add_improvement,
+    list_improvements,
+)
+
+
+CHAT_MANAGER_TOOLS = [
+    add_memory_record,
+    list_memory_records,
+    search_memory_records,
+    add_highlights,
+    delete_highlight,
+    search_highlights,
+    trending_highlights,
+    add_improvement,
+    list_improvements,
+]
+
+
+def _json_tool_result(result: Any) -> str:
+    # JSON so doer/responder can format a short list safely.
+    return json.dumps(result, ensure_ascii=False)
+
+
+def _run_add_memory_record(state: InternalState, args: dict[str, Any]) -> str:
+    category = str(args.get("category") or "")
+    text = str(args.get("text") or "")
+    return _json_tool_result(_add_memory_record_result(state=state, category=category, text=text))
+
+
+def _run_list_memory_records(state: InternalState, args: dict[str, Any]) -> str:
+    return _json_tool_result(_list_memory_records_impl(state=state))
+
+
+def _run_search_memory_records(state: InternalState, args: dict[str, Any]) -> str:
+    return _json_tool_result(
+        _search_memory_records_impl(
+            state=state,
+            query=str(args.get("query") or ""),
+            category=args.get("category"),
+            limit=args.get("limit", 10),
+        )
+    )
+
+
+def _run_add_highlights(state: InternalState, args: dict[str, Any]) -> str:
+    return _json_tool_result(_add_highlights_impl(state=state, highlights=args.get("highlights")))
+
+
+def _run_delete_highlight(state: InternalState, args: dict[str, Any]) -> str:
+    return _json_tool_result(
+        _delete_highlight_impl(
+            state=state,
+            highlight_id=args.get("highlight_id"),
+            highlight_link=args.get("highlight_link") or args.get("message_link"),
+            hard_delete=bool(args.get("hard_delete", False)),
+        )
+    )
+
+
+def _run_search_highlights(state: InternalState, args: dict[str, Any]) -> str:
+    return _json_tool_result(
+        _search_highlights_impl(
+            state=state,
+            author_username=args.get("author_username"),
+            author_telegram_id=args.get("author_telegram_id"),
+            days=args.get("days"),
+            category=args.get("category"),
+            tags=args.get("tags"),
+            query=args.get("query"),
+            limit=args.get("limit", 20),
+            offset=args.get("offset", 0),
+            cursor=args.get("cursor"),
+        )
+    )
+
+
+def _run_trending_highlights(state: InternalState, args: dict[str, Any]) -> str:
+    return _json_tool_result(
+        _trending_highlights_impl(
+            state=state,
+            days=args.get("days", 5),
+            category=args.get("category"),
+            limit=args.get("limit", 10),
+        )
+    )
+
+
+def _run_add_improvement(state: InternalState, args: dict[str, Any]) -> str:
+    return _json_tool_result(_add_improvement_impl(state=state, improvements=args.get("improvements")))
+
+
+def _run_list_improvements(state: InternalState, args: dict[str, Any]) -> str:
+    return _json_tool_result(
+        _list_improvements_impl(
+            state=state,
+            status=args.get("status", "open"),
+            days=args.get("days", 60),
+            category=args.get("category"),
+            limit=args.get("limit", 100),
+            offset=args.get("offset", 0),
+            cursor=args.get("cursor"),
+        )
+    )
+
+
+class ToolSpec:
+    """
+    How run_tools executes one doer tool: the store collections it needs, whether
+    it only reads them (safe to run concurrently) or writes, and whether it can
+    change the memory categories list.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[InternalState, dict[str, Any]], str],
+        collections: tuple[str, ...],
+        *,
+        writes: bool = False,
+        changes_categories: bool = False,
+    ):
+        self.run = run
+        self.collections = collections
+        self.writes = writes
+        self.changes_categories = changes_categories
+
+
+TOOL_REGISTRY: dict[str, ToolSpec] = {
+    "add_memory_record": ToolSpec(
+        _run_add_memory_record, ("memory_records",), writes=True, changes_categories=True
+    ),
+    "list_memory_records": ToolSpec(_run_list_memory_records, ("memory_records",)),
+    "search_memory_records": ToolSpec(_run_search_memory_records, ("memory_records",)),
+    "add_highlights": ToolSpec(_run_add_highlights, ("highlights",), writes=True),
+    "delete_highlight": ToolSpec(_run_delete_highlight, ("highlights",), writes=True),
+    "search_highlights": ToolSpec(_run_search_highlights, ("highlights",)),
+    "trending_highlights": ToolSpec(_run_trending_highlights, ("highlights",)),
+    "add_improvement": ToolSpec(_run_add_improvement, ("improvements",), writes=True),
+    "list_improvements": ToolSpec(_run_list_improvements, ("improvements",)),
+}
@@ -2,21 +2,27 @@ from __future__ import annotations
 
 import json
 import logging
+import os
 import re
 from datetime import datetime, timedelta, timezone
-from typing import Literal
+from typing import TYPE_CHECKING, Callable, Literal
 from zoneinfo import ZoneInfo
 from uuid import uuid4
 
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
-from langchain_openai import ChatOpenAI
 from langgraph.graph import END, START, StateGraph
 from pydantic import BaseModel, Field, ValidationError
 
 from conversation_states.improvements import Improvement
+from conversation_states.repository import thread_repository
 from conversation_states.states import ExternalState
+from conversation_states.utils.reducers import add_improvements
 from conversation_states.actions import Action, ActionSender
+from lg_main.models import lazy_chat
+
+if TYPE_CHECKING:
+    from tool_sets.similarity import NearDuplicateIndex
 
 
 class DailyMetaImproverState(ExternalState):
@@ -27,10 +33,11 @@ class DailyMetaImproverState(ExternalState):
     window_until_utc: str | None = None
 
 
-llm = ChatOpenAI(model="gpt-4.1-2025-04-14", temperature=0.2)
+llm = lazy_chat("review")
 log = logging.getLogger("daily_meta_improver_graph")
 META_IMPROVER_REPORTER = "meta-improver---auto"
 _INC_RE = re.compile(r"^INC(\d{5})$")
+_RELATED_LIMIT = int(os.getenv("META_IMPROVER_RELATED_LIMIT", "20"))
 
 
 def _safe_zoneinfo(tz_name: str) -> ZoneInfo:
@@ -63,15 +70,14 @@ def _parse_dt(val: object) -> datetime | None:
     return None
 
 
-def _extract_tg_meta(msg: BaseMessage) -> tuple[datetime | None, str | None]:
+def _extract_tg_link(msg: BaseMessage) -> str | None:
     ak = getattr(msg, "additional_kwargs", None) or {}
     if not isinstance(ak, dict):
-        return None, None
-    dt = _parse_dt(ak.get("tg_date"))
+        return None
     link = ak.get("tg_link")
     if link is not None:
         link = str(link).strip() or None
-    return dt, link
+    return link
 
 
 def _window_bounds(
@@ -107,12 +113,11 @@ def _collect_messages_in_window(
     tz: ZoneInfo,
 ) -> list[dict]:
     out: list[dict] = []
-    for m in (state.messages or []):
+    # Time index: bisect to the window instead of scanning/parsing every message.
+    for dt, m in state.messages_api.window(since_utc, until_utc):
         if not isinstance(m, (HumanMessage, AIMessage)):
             continue
-        dt, link = _extract_tg_meta(m)
-        if not dt or dt < since_utc or dt > until_utc:
-            continue
+        link = _extract_tg_link(m)
         if isinstance(m, AIMessage):
             role = "assistant"
             author = getattr(m, "name", None) or "assistant"
@@ -132,7 +137,6 @@ def _collect_messages_in_window(
                 "link": link,
             }
         )
-    out.sort(key=lambda x: x["at_utc"])
     return out
 
 
@@ -242,24 +246,69 @@ def _current_improvement_identity_map(state: DailyMetaImproverState) -> dict[str
     return out
 
 
-def _next_inc_number(current: list[dict]) -> str:
-    max_n = 0
-    for item in current:
-        t = str(item.get("task_number") or "").strip().upper()
-        m = _INC_RE.match(t)
-        if not m:
-            continue
-        try:
-            max_n = max(max_n, int(m.group(1)))
-        except Exception:
-            continue
-    return f"INC{max_n + 1:05d}"
+def _duplicate_index(current: list[dict]) -> NearDuplicateIndex:
+    from tool_sets.similarity import NearDuplicateIndex
+
+    index = NearDuplicateIndex()
+    for pos, item in enumerate(current):
+        index.add(pos, str(item.get("description") or ""))
+    return index
+
+
+def _review_scope(current: list[dict], recent: list[dict], index: NearDuplicateIndex) -> tuple[list[list[dict]], list[dict]]:
+    """
+    What the LLM gets instead of the whole backlog: clusters of likely duplicates
+    with at least one open item, and the open items that best match the window's
+    messages (candidates for status updates).
+    """
+    from tool_sets.text_search import BM25Index
+
+    live = [p for p, i in enumerate(current) if i.get("status") != "wont_do"]
+    clusters = [
+        [current[p] for p in group]
+        for group in index.clusters(keys=live)
+        if any(current[p].get("status") == "open" for p in group)
+    ]
+    clustered = {str(i.get("task_number")) for group in clusters for i in group}
+    bm25 = BM25Index()
+    for pos, item in enumerate(current):
+        if item.get("status") == "open" and str(item.get("task_number")) not in clustered:
+            bm25.add(pos, str(item.get("description") or ""))
+    scores = bm25.scores(" ".join(str(m.get("text") or "") for m in recent))
+    ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:_RELATED_LIMIT]
+    return clusters, [current[p] for p, _ in ranked]
+
+
+def _drop_known_duplicates(
+    items: list[ImprovementLLMItem],
+    current: list[dict],
+    index: NearDuplicateIndex,
+    known_tasks: set[str],
+) -> list[ImprovementLLMItem]:
+    # The backlog is not in the prompt, so new findings are checked against it here.
+    # Only open items count: a finding like a closed one is a regression, and a
+    # rejected (wont_do) one is left to the reviewer, as in similar_improvements.
+    out: list[ImprovementLLMItem] = []
+    for x in items:
+        task = str(x.task_number or "").strip().upper()
+        if task not in known_tasks:
+            hits = [(p, s) for p, s in index.similar(str(x.description or "")) if current[p].get("status") == "open"]
+            if hits:
+                log.info(
+                    "node_review_improvements: skipping new item similar to open %s: %s",
+                    current[hits[0][0]].get("task_number"),
+                    x.description,
+                )
+                continue
+        out.append(x)
+    return out
 
 
 def _normalize_improvements_for_state(
     items: list[ImprovementLLMItem],
     current: list[dict],
     identity_by_task: dict[str, dict],
+    allocate: Callable[[int], list[str]],
 ) -> list[dict]:
     now = datetime.now(timezone.utc)
     existing_by_task: dict[str, dict] = {}
@@ -299,7 +348,7 @@ def _normalize_improvements_for_state(
             or str(x.task_number or "").strip().upper()
         )
         if not _INC_RE.match(task_number):
-            task_number = _next_inc_number(current + out)
+            task_number = ""  # numbered below, in one allocation for the whole response
 
         reporter = (
             _normalize_reporter_name(x.reporter)
@@ -320,6 +369,9 @@ def _normalize_improvements_for_state(
                 "created_at": created_at,
             }
         )
+    unnumbered = [item for item in out if not item["task_number"]]
+    for item, number in zip(unnumbered, allocate(len(unnumbered))):
+        item["task_number"] = number
     return out
 
 
@@ -436,27 +488,33 @@ def node_review_thread_info(state: DailyMetaImproverState, config: RunnableConfi
     return {"thread_info_entries_reviewed": reviewed}
 
 
-def node_review_improvements(state: DailyMetaImproverState, config: RunnableConfig | None = None) -> dict:
-    tz_name = _get_tz_name(state)
-    tz = _safe_zoneinfo(tz_name)
-    now_utc = datetime.now(timezone.utc)
-    since_utc, until_utc = _window_bounds(state, config, now_utc=now_utc)
-    recent = _collect_messages_in_window(state, since_utc=since_utc, until_utc=until_utc, tz=tz)
-    reviewed_entries = _clean_thread_info_entries(getattr(state, "thread_info_entries_reviewed", []) or [])
-    current = _current_improvements(state)
-    identity_by_task = _current_improvement_identity_map(state)
+def _ask_improvements_llm(
+    *,
+    tz_name: str,
+    since_utc: datetime,
+    until_utc: datetime,
+    reviewed_entries: list[str],
+    recent: list[dict],
+    clusters: list[list[dict]],
+    related: list[dict],
+) -> ImprovementLLMResponse:
     schema_json = json.dumps(ImprovementLLMResponse.model_json_schema(), ensure_ascii=False)
 
     system = SystemMessage(
         content=(
             "Ты продуктовый менеджер и QA чат-агента. Верни ТОЛЬКО валидный JSON.\n"
             "Задача: по сообщениям, thread info и текущим improvements собрать обновления по improvements.\n"
+            "Весь backlog не передается: только кластеры вероятных дубликатов (найдены автоматически) "
+            "и open improvements, похожие на сообщения окна. Новые записи, повторяющие существующие, "
+            "отфильтруются автоматически.\n"
             "Найди баги, проблемы UX, недостающие фичи, слабые места. Учитывай только реальный контекст.\n"
             "Анализируй сообщения пользователей И ответы бота (assistant).\n"
             "Если по контексту ожидалась реакция/ответ бота, но ее нет или она не по делу, "
             "добавляй improvement (обычно bug) с кратким контекстом.\n"
             "Если запись уже существует, верни ее с тем же task_number и новыми полями при необходимости.\n"
             "Если есть дубликаты, ОБЯЗАТЕЛЬНО пометь дубликат как status=wont_do и укажи в resolution, что это дубликат.\n"
+            "Каждый кластер проверь: если записи действительно про одно и то же, оставь одну открытой; "
+            "если нет, ничего не меняй.\n"
             "Считай дубликатом и случай, когда bug и feature описывают одну проблему разными словами "
             "(например: 'бот спамит' и 'бот не должен спамить'). "
             "Оставляй одну каноническую запись, вторую помечай как status=wont_do с причиной duplicate.\n"
@@ -478,8 +536,10 @@ def node_review_improvements(state: DailyMetaImproverState, config: RunnableConf
             f"{json.dumps(reviewed_entries, ensure_ascii=False)}\n"
             "Messages in window JSON:\n"
             f"{json.dumps(recent, ensure_ascii=False)}\n"
-            "Current improvements JSON:\n"
-            f"{json.dumps(current, ensure_ascii=False)}"
+            "Duplicate candidate clusters JSON:\n"
+            f"{json.dumps(clusters, ensure_ascii=False)}\n"
+            "Related open improvements JSON:\n"
+            f"{json.dumps(related, ensure_ascii=False)}"
         )
     )
     log.info("node_improvements llm prompt system=%s", system.content)
@@ -492,18 +552,66 @@ def node_review_improvements(state: DailyMetaImproverState, config: RunnableConf
     except Exception:
         data = {}
     try:
-        parsed = ImprovementLLMResponse.model_validate(data)
+        return ImprovementLLMResponse.model_validate(data)
     except ValidationError:
         log.warning("node_review_improvements: LLM response schema validation failed")
-        return {}
+        return ImprovementLLMResponse()
+
+
+def node_review_improvements(state: DailyMetaImproverState, config: RunnableConfig | None = None) -> dict:
+    tz_name = _get_tz_name(state)
+    tz = _safe_zoneinfo(tz_name)
+    now_utc = datetime.now(timezone.utc)
+    since_utc, until_utc = _window_bounds(state, config, now_utc=now_utc)
+    recent = _collect_messages_in_window(state, since_utc=since_utc, until_utc=until_utc, tz=tz)
+    reviewed_entries = _clean_thread_info_entries(getattr(state, "thread_info_entries_reviewed", []) or [])
+    # Tool sets load on the first review, not when the graph is imported.
+    from tool_sets.improvements import _repair_inc_numbers_impl, allocate_inc_numbers
+
+    repo = thread_repository()
+    if repo is not None:
+        repo.hydrate(state, "improvements")
+    # Historical duplicate/invalid INC numbers are fixed before the LLM sees them.
+    repair = _repair_inc_numbers_impl(state=state)
+    repaired_ids = {c["id"] for c in repair["repaired"]}
+    if repaired_ids:
+        log.warning("node_review_improvements: repaired task numbers %s", repair["repaired"])
+    current = _current_improvements(state)
+    identity_by_task = _current_improvement_identity_map(state)
+    index = _duplicate_index(current)
+    clusters, related = _review_scope(current, recent, index)
+    log.info(
+        "node_review_improvements: backlog=%s clusters=%s related=%s",
+        len(current),
+        len(clusters),
+        len(related),
+    )
+    if recent or clusters:
+        parsed = _ask_improvements_llm(
+            tz_name=tz_name,
+            since_utc=since_utc,
+            until_utc=until_utc,
+            reviewed_entries=reviewed_entries,
+            recent=recent,
+            clusters=clusters,
+            related=related,
+        )
+    else:
+        parsed = ImprovementLLMResponse()
     normalized = _normalize_improvements_for_state(
-        parsed.improvements,
+        _drop_known_duplicates(parsed.improvements, current, index, set(identity_by_task)),
         current=current,
         identity_by_task=identity_by_task,
+        allocate=lambda n: allocate_inc_numbers(list(state.improvements or []), n),
     )
-    if not normalized:
+    repaired = [i for i in (state.improvements or []) if i.id in repaired_ids]
+    if repo is not None:
+        if normalized or repaired:
+            repo.sync("improvements", add_improvements(state.improvements, normalized))
+        return repo.cleared_channels(state)
+    if not normalized and not repaired:
         return {}
-    return {"improvements": normalized}
+    return {"improvements": [i.model_dump(mode="json") for i in repaired] + normalized}
 
 
 builder = StateGraph(DailyMetaImproverState)
@@ -3,6 +3,7 @@ from __future__ import annotations
 from pydantic import Field
 from langgraph.graph import END, START, StateGraph
 
+from conversation_states.repository import thread_repository
 from conversation_states.states import ExternalState
 from lg_main.g_daily_meta_improver.graph import graph_daily_meta_improver
 from lg_main.g_daily_summary.graph import graph_daily_summary
@@ -19,13 +20,18 @@ class DailyRunnerState(ExternalState):
     window_until_utc: str | None = None
 
 
-def node_strip_improver_context(_: DailyRunnerState) -> dict:
+def node_strip_improver_context(state: DailyRunnerState) -> dict:
     # Ensure daily_summary does not receive improver-specific context.
-    return {
+    out: dict = {
         "thread_meta": {},
         "thread_info_entries_input": [],
         "thread_info_entries_reviewed": [],
     }
+    repo = thread_repository()
+    if repo is not None:
+        # Subgraph resets do not reach this graph's channels; legacy collections are dropped here.
+        out.update(repo.cleared_channels(state))
+    return out
 
 
 builder = StateGraph(DailyRunnerState)
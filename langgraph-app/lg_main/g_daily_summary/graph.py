@@ -4,21 +4,21 @@ import json
 import random
 import re
 import logging
-import base64
 import os
 from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
-from langchain_openai import ChatOpenAI
 from langgraph.graph import END, START, StateGraph
 from pydantic import Field
-from openai import OpenAI
 
 from conversation_states.memory import MemoryRecord
+from conversation_states.repository import thread_repository
 from conversation_states.states import ExternalState
 from conversation_states.actions import Action, ActionSender
+from lg_main.models import lazy_chat
+from lg_main.media_service import media_service, tts_model, tts_voice
 
 
 class DailySummaryState(ExternalState):
@@ -28,10 +28,9 @@ class DailySummaryState(ExternalState):
     window_until_utc: str | None = None
 
 
-llm = ChatOpenAI(model="gpt-4.1-2025-04-14", temperature=0.2)
+llm = lazy_chat("review")
 # Final user-facing digest phrasing.
-llm_style = ChatOpenAI(model="gpt-5-mini", temperature=0.7)
-image_client = OpenAI()
+llm_style = lazy_chat("style")
 log = logging.getLogger("daily_summary_graph")
 
 _URL_RE = re.compile(r"https?://\S+")
@@ -90,15 +89,14 @@ def _parse_dt(val: object) -> datetime | None:
     return None
 
 
-def _extract_tg_meta(msg: HumanMessage) -> tuple[datetime | None, str | None]:
+def _extract_tg_link(msg: BaseMessage) -> str | None:
     ak = getattr(msg, "additional_kwargs", None) or {}
     if not isinstance(ak, dict):
-        return None, None
-    dt = _parse_dt(ak.get("tg_date"))
+        return None
     link = ak.get("tg_link")
     if link is not None:
         link = str(link).strip() or None
-    return dt, link
+    return link
 
 
 def _window_bounds(
@@ -136,12 +134,9 @@ def _collect_messages_in_window(
     tz: ZoneInfo,
 ) -> list[dict]:
     out: list[dict] = []
-    for m in (state.messages or []):
-        if not isinstance(m, HumanMessage):
-            continue
-        dt, link = _extract_tg_meta(m)
-        if not dt or dt < since_utc or dt > until_utc:
-            continue
+    # Time index: bisect to the window instead of scanning/parsing every message.
+    for dt, m in state.messages_api.window(since_utc, until_utc, role="human"):
+        link = _extract_tg_link(m)
         author = getattr(m, "name", None) or "unknown"
         text = str(getattr(m, "content", "") or "").strip().replace("\n", " ")
         if len(text) > 350:
@@ -155,7 +150,6 @@ def _collect_messages_in_window(
                 "link": link,
             }
         )
-    out.sort(key=lambda x: x["at_utc"])
     return out
 
 
@@ -165,20 +159,13 @@ def _collect_new_participants_count(
     since_utc: datetime,
     until_utc: datetime,
 ) -> int:
-    before: set[str] = set()
-    recent: set[str] = set()
-    for m in (state.messages or []):
-        if not isinstance(m, HumanMessage):
-            continue
-        dt, _ = _extract_tg_meta(m)
-        if not dt:
-            continue
-        author = getattr(m, "name", None) or "unknown"
-        if since_utc <= dt <= until_utc:
-            recent.add(author)
-        elif dt < since_utc:
-            before.add(author)
-    return len(recent - before)
+    # first_seen_at is maintained at ingest (Human.record_message), so this is O(users).
+    count = 0
+    for u in (state.users or []):
+        first = _parse_dt(getattr(u, "first_seen_at", None))
+        if first and since_utc <= first <= until_utc:
+            count += 1
+    return count
 
 
 def _collect_intro_messages_in_window(
@@ -201,6 +188,10 @@ def _collect_records_in_window(
 ) -> list[dict]:
     out: list[dict] = []
     recs: list[MemoryRecord] = list(getattr(state, "memory_records", []) or [])
+    repo = thread_repository()
+    if repo is not None:
+        repo.migrate_from_state(state)
+        recs = list(repo.collection("memory_records"))
     for r in recs:
         created = _parse_dt(getattr(r, "created_at", None))
         if not created or created < since_utc or created > until_utc:
@@ -392,7 +383,7 @@ def node3_compose_message(state: DailySummaryState) -> dict:
     return {"messages": [AIMessage(content=text, name="daily_runner")]}
 
 
-def node4_generate_image(state: DailySummaryState, writer=None) -> dict:
+async def node4_generate_image(state: DailySummaryState, writer=None) -> dict:
     payload = dict(getattr(state, "node2_payload", {}) or {})
     if payload.get("no_updates") is True:
         return {}
@@ -443,37 +434,16 @@ def node4_generate_image(state: DailySummaryState, writer=None) -> dict:
     )
 
     try:
-        img = image_client.images.generate(
-            model="gpt-image-1",
-            prompt=prompt,
-            size="1024x1024",
-        )
-        b64 = (img.data[0].b64_json if img and img.data else None) or ""
-        if not b64:
-            return {}
-
-        # Validate base64 early; if invalid do nothing.
-        base64.b64decode(b64)
-        if writer:
+        value = await media_service.image_payload(prompt)
+        if value and writer:
             sender = ActionSender(writer)
-            sender.send_action(
-                Action(
-                    type="image",
-                    value=json.dumps(
-                        {
-                            "b64_json": b64,
-                            "mime_type": "image/png",
-                        },
-                        ensure_ascii=False,
-                    ),
-                )
-            )
+            sender.send_action(Action(type="image", value=value))
     except Exception:
         log.exception("node4_generate_image failed")
     return {}
 
 
-def node5_generate_voice(state: DailySummaryState, writer=None) -> dict:
+async def node5_generate_voice(state: DailySummaryState, writer=None) -> dict:
     payload = dict(getattr(state, "node2_payload", {}) or {})
     if payload.get("no_updates") is True:
         return {}
@@ -509,7 +479,7 @@ def node5_generate_voice(state: DailySummaryState, writer=None) -> dict:
             "Дайджест:\n"
             f"{digest_text[:1800]}"
         )
-        voice_raw = llm_style.invoke([HumanMessage(content=voice_prompt)]).content
+        voice_raw = (await llm_style.ainvoke([HumanMessage(content=voice_prompt)])).content
         voice_text = str(voice_raw or "").strip().replace("\n", " ")
         words = [w for w in voice_text.split() if w.strip()]
         if not (15 <= len(words) <= 20):
@@ -517,43 +487,14 @@ def node5_generate_voice(state: DailySummaryState, writer=None) -> dict:
                 "Спасибо за активность сегодня: двигаемся дальше, поддерживаем друг друга и превращаем идеи в сильные результаты вместе."
             )
 
-        tts_model = os.getenv("OPENAI_TTS_MODEL", "tts-1")
-        tts_voice = os.getenv("OPENAI_TTS_VOICE", "Ash").strip().lower()
-        log.info("node5 voice_text=%r model=%s voice=%s prob=%.4f roll=%.4f", voice_text[:300], tts_model, tts_voice, prob, roll)
-        speech = image_client.audio.speech.create(
-            model=tts_model,
-            voice=tts_voice,
-            input=voice_text,
-            response_format="opus",
+        log.info(
+            "node5 voice_text=%r model=%s voice=%s prob=%.4f roll=%.4f",
+            voice_text[:300], tts_model(), tts_voice(), prob, roll,
         )
-
-        audio_bytes = None
-        if hasattr(speech, "read"):
-            audio_bytes = speech.read()
-        elif hasattr(speech, "content"):
-            audio_bytes = speech.content
-        elif isinstance(speech, (bytes, bytearray)):
-            audio_bytes = bytes(speech)
-
-        if not audio_bytes:
-            return {}
-
-        b64 = base64.b64encode(audio_bytes).decode("ascii")
-        if writer:
+        value = await media_service.voice_payload(voice_text, filename="daily_digest.ogg")
+        if value and writer:
             sender = ActionSender(writer)
-            sender.send_action(
-                Action(
-                    type="voice",
-                    value=json.dumps(
-                        {
-                            "b64": b64,
-                            "mime_type": "audio/ogg",
-                            "filename": "daily_digest.ogg",
-                        },
-                        ensure_ascii=False,
-                    ),
-                )
-            )
+            sender.send_action(Action(type="voice", value=value))
     except Exception:
         log.exception("node5_generate_voice failed")
     return {}
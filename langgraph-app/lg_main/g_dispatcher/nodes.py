@@ -23,21 +23,13 @@ def dispatcher_router(state: ExternalState, config: RunnableConfig) -> ExternalS
     return state
 
 
-def dispatcher_default_reply(state: ExternalState) -> ExternalState:
+def dispatcher_default_reply(state: ExternalState) -> dict:
     # No routing info: respond without calling any LLM/tools.
-    return ExternalState(
-        messages=[
+    return {
+        "messages": [
             AIMessage(
                 content="Routing is not configured for this thread.",
                 name="dispatcher_default_no_routing",
             )
         ],
-        users=list(state.users),
-        summary=state.summary,
-        last_reasoning=state.last_reasoning,
-        memory_records=list(getattr(state, "memory_records", []) or []),
-        highlights=list(getattr(state, "highlights", []) or []),
-        improvements=list(getattr(state, "improvements", []) or []),
-        thread_info_entries=list(getattr(state, "thread_info_entries", []) or []),
-        chat_manager_response_stats=dict(getattr(state, "chat_manager_response_stats", {}) or {}),
-    )
+    }
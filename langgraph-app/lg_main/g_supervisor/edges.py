@@ -1,6 +1,7 @@
 from typing import Literal
-from conversation_states.states import InternalState
-from langchain_openai import ChatOpenAI
+from conversation_states.states import ExternalState, InternalState
+from lg_main.models import models
+from .nodes import ingest_fast_path_enabled, needs_full_run
 
 
 def _is_intro_required(state: InternalState) -> bool:
@@ -19,6 +20,13 @@ def _is_intro_required(state: InternalState) -> bool:
     return True
 
 
+def route_at_start(state: ExternalState) -> Literal["prepare_internal", "ingest_message"]:
+    # Plain chatter only needs to be stored; skip the guard pipeline entirely.
+    if ingest_fast_path_enabled() and not needs_full_run(state):
+        return "ingest_message"
+    return "prepare_internal"
+
+
 def route_after_intro_checker(state: InternalState) -> Literal["intro_quality_guard", "no_intro", "mention_checker"]:
     if not _is_intro_required(state):
         return "mention_checker"
@@ -81,7 +89,7 @@ def route_actions(state: InternalState) -> Literal["text_assistant", "action_ass
 
 def should_summarize(state: InternalState) -> Literal["prepare_external", "__end__"]:
     messages = state.messages
-    num_tokens = ChatOpenAI().get_num_tokens_from_messages(messages)
+    num_tokens = models.chat("default").get_num_tokens_from_messages(messages)
 
     if num_tokens > 500:
         return "prepare_external"
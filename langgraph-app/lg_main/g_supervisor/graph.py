@@ -5,10 +5,12 @@ from .nodes import (
     intro_quality_guard,
     intro_quality_reprompt,
     intro_responder,
+    ingest_message,
     prepare_internal,
     prepare_external,
 )
 from .edges import (
+    route_at_start,
     route_after_intro_checker,
     route_after_intro_quality_guard,
     route_after_mention_checker,
@@ -21,6 +23,7 @@ from .nodes import no_intro, mention_checker, mentioned_quality_guard, unmention
 
 # Build graph
 builder = StateGraph(InternalState, input=ExternalState, output=ExternalState)
+builder.add_node("ingest_message", ingest_message)
 builder.add_node("prepare_internal", prepare_internal)
 builder.add_node("intro_checker", intro_checker)
 builder.add_node("intro_quality_guard", intro_quality_guard)
@@ -36,7 +39,8 @@ builder.add_node("prepare_external", prepare_external)
 
 
 # Add edges
-builder.add_edge(START, "prepare_internal")
+builder.add_conditional_edges(START, route_at_start)
+builder.add_edge("ingest_message", END)
 builder.add_edge("prepare_internal", "intro_checker")
 builder.add_conditional_edges("intro_checker", route_after_intro_checker)
 builder.add_conditional_edges("intro_quality_guard", route_after_intro_quality_guard)
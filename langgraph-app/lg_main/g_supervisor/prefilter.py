@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import os
+import re
+from typing import Any
+from urllib.parse import urlparse
+
+
+# Modes for UNMENTIONED_PREFILTER_MODE:
+# - off: always ask the LLM guard
+# - shadow: ask the LLM guard, log and count how the prefilter verdict compares
+# - enforce: skip the LLM guard when the prefilter is confident
+PREFILTER_MODES = ("off", "shadow", "enforce")
+
+_URL_RE = re.compile(r"(?:https?://|(?<![\w.])t\.me/)[^\s<>\"')\]]+", re.IGNORECASE)
+# t.me/<name> with no post id: profile, group or channel invite rather than material.
+_TG_PROFILE_RE = re.compile(r"^(?:https?://)?t\.me/(?:\+|joinchat/)?[a-z0-9_]+/?$", re.IGNORECASE)
+_SHORT_TEXT_WORDS = 4
+
+
+def prefilter_mode() -> str:
+    mode = str(os.getenv("UNMENTIONED_PREFILTER_MODE", "shadow")).strip().lower()
+    return mode if mode in PREFILTER_MODES else "shadow"
+
+
+def _domains_from_env(name: str, default: str) -> tuple[str, ...]:
+    raw = os.getenv(name, default)
+    return tuple(x.strip().lower().lstrip(".") for x in raw.split(",") if x.strip())
+
+
+def resource_domains() -> tuple[str, ...]:
+    return _domains_from_env(
+        "RELEVANCE_RESOURCE_DOMAINS",
+        "habr.com,medium.com,github.com,arxiv.org,substack.com,vc.ru,dev.to,hh.ru,notion.site,coursera.org",
+    )
+
+
+def noise_domains() -> tuple[str, ...]:
+    return _domains_from_env(
+        "RELEVANCE_NOISE_DOMAINS",
+        "tiktok.com,instagram.com,9gag.com,coub.com,pinterest.com",
+    )
+
+
+def _domain(url: str) -> str:
+    candidate = url if "://" in url else f"https://{url}"
+    try:
+        host = urlparse(candidate).hostname or ""
+    except ValueError:
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def _matches(domain: str, known: tuple[str, ...]) -> bool:
+    return any(domain == d or domain.endswith(f".{d}") for d in known)
+
+
+def extract_features(text: str, kwargs: dict | None = None) -> dict[str, Any]:
+    """Cheap message features used by `prefilter_relevance` (and logged with each verdict)."""
+    kwargs = kwargs or {}
+    urls = _URL_RE.findall(text or "")
+    for key in ("highlight_link", "message_link"):
+        if kwargs.get(key):
+            urls.append(str(kwargs[key]))
+    domains = sorted({d for d in (_domain(u) for u in urls) if d})
+    rest = _URL_RE.sub(" ", text or "")
+    words = [w for w in rest.split() if any(ch.isalnum() for ch in w)]
+    return {
+        "links": len(urls),
+        "domains": domains,
+        "words": len(words),
+        "emoji_only": bool(rest.strip()) and not any(ch.isalnum() for ch in rest),
+        "profile_links_only": bool(urls) and all(_TG_PROFILE_RE.match(u) for u in urls),
+        "forwarded_from_channel": str(kwargs.get("tg_forward_origin") or "") == "channel",
+        "resource_domain": any(_matches(d, resource_domains()) for d in domains),
+        "noise_domain": bool(domains) and all(_matches(d, noise_domains()) for d in domains),
+    }
+
+
+def prefilter_relevance(text: str, kwargs: dict | None = None) -> dict[str, Any]:
+    """
+    Decide obvious cases for the unmentioned relevance guard without an LLM call.
+    Returns {"allow": bool | None, "reason": str, "features": dict}; allow=None means
+    the message is not obvious and the LLM guard has to decide.
+    """
+    f = extract_features(text, kwargs)
+    if not f["links"] and not f["forwarded_from_channel"]:
+        reason = "emoji_only" if f["emoji_only"] else "no_link"
+        return {"allow": False, "reason": reason, "features": f}
+    if f["profile_links_only"] and f["words"] <= _SHORT_TEXT_WORDS:
+        return {"allow": False, "reason": "profile_link_only", "features": f}
+    if f["noise_domain"] and f["words"] <= _SHORT_TEXT_WORDS:
+        return {"allow": False, "reason": "noise_domain_short", "features": f}
+    if f["resource_domain"]:
+        return {"allow": True, "reason": "resource_domain", "features": f}
+    if f["forwarded_from_channel"] and f["links"] and not f["profile_links_only"]:
+        return {"allow": True, "reason": "channel_forward_with_link", "features": f}
+    return {"allow": None, "reason": "uncertain", "features": f}
+
+
+def record_shadow_verdict(stats: dict, prefilter_allow: bool | None, llm_allow: bool) -> dict:
+    """Count prefilter vs LLM agreement in guard stats (mutates and returns `stats`)."""
+    counters = dict(stats.get("unmentioned_prefilter") or {})
+    counters["total"] = int(counters.get("total", 0)) + 1
+    if prefilter_allow is None:
+        counters["uncertain"] = int(counters.get("uncertain", 0)) + 1
+    else:
+        key = "agree" if prefilter_allow == llm_allow else ("false_block" if llm_allow else "false_allow")
+        counters[key] = int(counters.get(key, 0)) + 1
+    if llm_allow:
+        counters["llm_allow"] = int(counters.get("llm_allow", 0)) + 1
+    stats["unmentioned_prefilter"] = counters
+    return stats
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import socket
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from langgraph.config import get_store
+from langgraph.store.base import BaseStore
+
+
+log = logging.getLogger("guard_verdict_cache")
+
+CACHE_NAMESPACE = "guard_cache"
+_STATS_NAMESPACE = (CACHE_NAMESPACE, "stats")
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_dt(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def normalize_text(text: str) -> str:
+    """Case/whitespace/unicode-form insensitive form of a message used for the cache key."""
+    return " ".join(unicodedata.normalize("NFKC", text or "").casefold().split())
+
+
+def prompt_version(prompt: str) -> str:
+    """Short hash of the guard system prompt; editing the prompt invalidates its verdicts."""
+    return hashlib.sha256((prompt or "").encode("utf-8")).hexdigest()[:12]
+
+
+def _text_key(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def _current_store() -> Optional[BaseStore]:
+    try:
+        return get_store()
+    except (RuntimeError, KeyError, AttributeError):
+        return None
+
+
+class GuardVerdictCache:
+    """
+    Guard verdicts keyed by (guard, prompt version, normalized text hash).
+
+    A bounded in-process LRU sits in front of the LangGraph store, so verdicts are
+    shared across threads and server workers. Entries expire after `ttl`
+    (store-level TTL is used as well when the store supports it).
+
+    Hit/miss counters are kept in process and written at most every
+    `stats_flush_interval` seconds, one item per worker under
+    ("guard_cache", "stats", <guard>); totals are the sum over workers.
+    """
+
+    def __init__(
+        self,
+        max_items: int = 2048,
+        ttl: timedelta = timedelta(hours=24),
+        stats_flush_interval: float = 60.0,
+    ):
+        self.max_items = max(1, int(max_items))
+        self.ttl = ttl
+        self.stats_flush_interval = max(0.0, float(stats_flush_interval))
+        self._local: OrderedDict[tuple[str, str, str], dict] = OrderedDict()
+        self._stats: dict[str, dict[str, int]] = {}
+        self._stats_dirty: set[str] = set()
+        self._stats_flushed_at = time.monotonic()
+        self._worker = f"{socket.gethostname()}-{os.getpid()}"
+
+    def _fresh(self, entry: Optional[dict]) -> bool:
+        cached_at = _parse_dt((entry or {}).get("cached_at"))
+        return cached_at is not None and (_utc_now() - cached_at) < self.ttl
+
+    def _remember(self, key: tuple[str, str, str], entry: dict) -> None:
+        self._local[key] = entry
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_items:
+            self._local.popitem(last=False)
+
+    async def aget(self, guard: str, prompt: str, text: str) -> Optional[dict]:
+        """Cached {"allow", "reason"} verdict or None; counts the hit/miss."""
+        version = prompt_version(prompt)
+        key = (guard, version, _text_key(text))
+        entry = self._local.get(key)
+        if entry is not None and not self._fresh(entry):
+            self._local.pop(key, None)
+            entry = None
+        if entry is None:
+            store = _current_store()
+            if store is not None:
+                try:
+                    item = await store.aget((CACHE_NAMESPACE, guard, version), key[2])
+                except Exception:
+                    log.exception("guard cache read failed guard=%s", guard)
+                    item = None
+                if item is not None and self._fresh(item.value):
+                    entry = dict(item.value)
+                    self._remember(key, entry)
+        else:
+            self._local.move_to_end(key)
+
+        self._record(guard, hit=entry is not None, tokens=int((entry or {}).get("tokens") or 0))
+        if time.monotonic() - self._stats_flushed_at >= self.stats_flush_interval:
+            await self.aflush_stats()
+        if entry is None:
+            return None
+        return {"allow": bool(entry.get("allow")), "reason": str(entry.get("reason") or "")}
+
+    async def aput(self, guard: str, prompt: str, text: str, verdict: dict, *, tokens: int = 0) -> None:
+        version = prompt_version(prompt)
+        key = (guard, version, _text_key(text))
+        entry = {
+            "allow": bool(verdict.get("allow")),
+            "reason": str(verdict.get("reason") or ""),
+            "tokens": int(tokens or 0),
+            "cached_at": _utc_now().isoformat(),
+        }
+        self._remember(key, entry)
+        store = _current_store()
+        if store is None:
+            return
+        ttl = self.ttl.total_seconds() / 60 if store.supports_ttl else None
+        try:
+            await store.aput((CACHE_NAMESPACE, guard, version), key[2], entry, index=False, ttl=ttl)
+        except Exception:
+            log.exception("guard cache write failed guard=%s", guard)
+
+    def _record(self, guard: str, *, hit: bool, tokens: int) -> None:
+        field = "hits" if hit else "misses"
+        stats = self._stats.setdefault(guard, {})
+        stats[field] = int(stats.get(field, 0)) + 1
+        if hit:
+            stats["tokens_saved"] = int(stats.get("tokens_saved", 0)) + tokens
+        self._stats_dirty.add(guard)
+
+    async def aflush_stats(self) -> None:
+        """Write this worker's counters of guards that changed since the last flush."""
+        self._stats_flushed_at = time.monotonic()
+        store = _current_store()
+        if store is None or not self._stats_dirty:
+            return
+        dirty, self._stats_dirty = self._stats_dirty, set()
+        for guard in dirty:
+            # Each worker owns its item, so there is no read-modify-write to race on.
+            try:
+                await store.aput((*_STATS_NAMESPACE, guard), self._worker, dict(self._stats[guard]), index=False)
+            except Exception:
+                self._stats_dirty.add(guard)
+                log.exception("guard cache stats flush failed guard=%s", guard)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Per-guard hits, misses, hit_rate and tokens_saved for this process."""
+        out: dict[str, dict[str, Any]] = {}
+        for guard, stats in self._stats.items():
+            hits = int(stats.get("hits", 0))
+            total = hits + int(stats.get("misses", 0))
+            out[guard] = {**stats, "hit_rate": round(hits / total, 3) if total else 0.0}
+        return out
+
+
+verdict_cache = GuardVerdictCache(
+    max_items=int(os.getenv("GUARD_CACHE_MAX_ITEMS", "2048")),
+    ttl=timedelta(hours=float(os.getenv("GUARD_CACHE_TTL_HOURS", "24"))),
+    stats_flush_interval=float(os.getenv("GUARD_CACHE_STATS_FLUSH_SECONDS", "60")),
+)
@@ -0,0 +1,162 @@
+"""
+Per-node LLM usage ledger.
+
+One callback handler is attached to every ChatOpenAI instance. For each call it
+records the graph node (LangGraph puts it in the run metadata), model, prompt /
+completion / cached tokens and wall-clock latency. Entries are buffered in
+process and appended in batches to a bounded per-thread ring buffer in the store
+(("threads", <id>, "meta"), key "llm_usage"): a thread's buffer is written once it
+holds LLM_USAGE_FLUSH_SIZE entries or its oldest entry is LLM_USAGE_FLUSH_SECONDS
+old, and whatever is left at interpreter exit. Calls outside a graph run with a
+store are only logged.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from langgraph.store.base import BaseStore
+
+from conversation_states.repository import USAGE_DOCUMENT, ThreadRepository, thread_repository
+from prompt_templates.prompt_cache import cached_tokens
+
+
+log = logging.getLogger(__name__)
+
+
+def ledger_capacity() -> int:
+    try:
+        return max(1, int(os.getenv("LLM_USAGE_LEDGER_SIZE", "500")))
+    except ValueError:
+        return 500
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _usage_message(response: LLMResult) -> Any:
+    for generations in response.generations or []:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if message is not None:
+                return message
+    return None
+
+
+class LLMUsageLedger(BaseCallbackHandler):
+    """Callback handler timing chat model calls and recording their token usage."""
+
+    def __init__(self, flush_size: int = 20, flush_interval: float = 30.0) -> None:
+        self.flush_size = max(1, int(flush_size))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self._pending: dict[UUID, dict[str, Any]] = {}
+        # (store, thread_id) -> (monotonic time of the oldest entry, entries not written yet)
+        self._buffers: dict[tuple[BaseStore, str], tuple[float, list[dict]]] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list,
+        *,
+        run_id: UUID,
+        metadata: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        metadata = metadata or {}
+        params = kwargs.get("invocation_params") or {}
+        with self._lock:
+            self._pending[run_id] = {
+                "started": time.perf_counter(),
+                "node": str(metadata.get("langgraph_node") or "unknown"),
+                "graph": metadata.get("graph_id"),
+                "thread_id": metadata.get("thread_id"),
+                "model": params.get("model") or params.get("model_name") or metadata.get("ls_model_name"),
+            }
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        message = _usage_message(response)
+        usage = (getattr(message, "usage_metadata", None) or {}) if message is not None else {}
+        model = ((getattr(message, "response_metadata", None) or {}).get("model_name")) if message is not None else None
+        self._finish(
+            run_id,
+            model=model or (response.llm_output or {}).get("model_name"),
+            prompt_tokens=int(usage.get("input_tokens") or 0),
+            completion_tokens=int(usage.get("output_tokens") or 0),
+            cached_tokens=cached_tokens(message) if message is not None else 0,
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, error=type(error).__name__)
+
+    def _finish(self, run_id: UUID, **fields: Any) -> None:
+        with self._lock:
+            pending = self._pending.pop(run_id, None)
+        if pending is None:
+            return
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "node": pending["node"],
+            "graph": pending["graph"],
+            "model": fields.pop("model", None) or pending["model"],
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cached_tokens": 0,
+            "ms": round((time.perf_counter() - pending["started"]) * 1000, 1),
+            **fields,
+        }
+        log.debug("llm usage thread=%s %s", pending["thread_id"], entry)
+        repo = thread_repository()
+        now = time.monotonic()
+        with self._lock:
+            if repo is not None:
+                key = (repo.store, repo.thread_id)
+                started, entries = self._buffers.get(key) or (now, [])
+                entries.append(entry)
+                self._buffers[key] = (started, entries)
+            due = [
+                key
+                for key, (started, entries) in self._buffers.items()
+                if len(entries) >= self.flush_size or now - started >= self.flush_interval
+            ]
+            batches = [(key, self._buffers.pop(key)[1]) for key in due]
+        self._write(batches)
+
+    def flush(self) -> None:
+        """Write every buffered entry now."""
+        with self._lock:
+            batches, self._buffers = list(self._buffers.items()), {}
+        self._write([(key, entries) for key, (_, entries) in batches])
+
+    @staticmethod
+    def _write(batches: list[tuple[tuple[BaseStore, str], list[dict]]]) -> None:
+        for (store, thread_id), entries in batches:
+            try:
+                ThreadRepository(store, thread_id).append_ring(USAGE_DOCUMENT, entries, ledger_capacity())
+            except Exception:
+                log.exception("llm usage: failed to persist %d ledger entries thread=%s", len(entries), thread_id)
+
+
+# Shared by all ChatOpenAI instances; lg_main.models attaches it when building a model.
+usage_ledger = LLMUsageLedger(
+    flush_size=int(_env_number("LLM_USAGE_FLUSH_SIZE", 20)),
+    flush_interval=_env_number("LLM_USAGE_FLUSH_SECONDS", 30),
+)
+atexit.register(usage_ledger.flush)
+
+
+__all__ = ["LLMUsageLedger", "ledger_capacity", "usage_ledger"]
@@ -0,0 +1,309 @@
+"""
+Shared TTS/image generation with a content-hash disk cache.
+
+Every graph that sends voice or image actions goes through `media_service`:
+inputs are normalized, generated bytes are cached on local disk (size-bounded,
+least recently used files are evicted first), identical concurrent requests
+share one OpenAI call, and hit/miss/latency counters are kept per media kind.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+
+from lg_main.models import models
+
+if TYPE_CHECKING:
+    # The openai SDK is the single most expensive import; the registry loads it on first use.
+    from openai import AsyncOpenAI
+
+
+log = logging.getLogger("media_service")
+
+_EXTENSIONS = {"voice": "ogg", "image": "png"}
+
+
+def normalize_input(text: str) -> str:
+    """Unicode-normalized text with collapsed whitespace; case is kept (it changes TTS prosody)."""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def tts_model() -> str:
+    return os.getenv("OPENAI_TTS_MODEL", "tts-1")
+
+
+def tts_voice() -> str:
+    return str(os.getenv("OPENAI_TTS_VOICE", "ash")).strip().lower() or "ash"
+
+
+def _cache_key(kind: str, params: dict[str, Any]) -> str:
+    raw = json.dumps({"kind": kind, **params}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MediaCache:
+    """
+    Generated media files named by content hash. The LRU order lives in memory
+    and is seeded from file mtimes on first use; hits refresh the mtime so the
+    order survives restarts. Methods are called from worker threads, hence the lock.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries: OrderedDict[str, tuple[Path, int]] = OrderedDict()
+        self._total = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.root.is_dir():
+            return
+        files = []
+        for path in self.root.iterdir():
+            if path.is_file() and not path.name.startswith("."):
+                st = path.stat()
+                files.append((st.st_mtime, path, st.st_size))
+        for _, path, size in sorted(files):
+            self._entries[path.stem] = (path, size)
+            self._total += size
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._entries and self._total > self.max_bytes:
+            _, (path, size) = self._entries.popitem(last=False)
+            self._total -= size
+            self.evictions += 1
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        self._load()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        path, size = entry
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            self._entries.pop(key, None)
+            self._total -= size
+            return None
+        self._entries.move_to_end(key)
+        return data
+
+    def put(self, key: str, ext: str, data: bytes) -> None:
+        if self.max_bytes <= 0 or len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self._put(key, ext, data)
+
+    def _put(self, key: str, ext: str, data: bytes) -> None:
+        self._load()
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / f"{key}.{ext}"
+        # Write-then-rename so a concurrent reader never sees a partial file.
+        tmp = self.root / f".{key}.{os.getpid()}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._total -= previous[1]
+        self._entries[key] = (path, len(data))
+        self._total += len(data)
+        self._evict()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class MediaService:
+    def __init__(self, cache: MediaCache, client_factory: Callable[[], AsyncOpenAI] = models.async_openai):
+        self.cache = cache
+        self._client_factory = client_factory
+        self._client: Optional[AsyncOpenAI] = None
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._stats: dict[str, dict[str, Any]] = {}
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        if self._client is None:
+            self._client = self._client_factory()
+        return self._client
+
+    def _count(self, kind: str, field: str, amount: float = 1) -> None:
+        stats = self._stats.setdefault(kind, {})
+        stats[field] = stats.get(field, 0) + amount
+
+    async def _cached(self, kind: str, params: dict[str, Any], generate: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[bytes]:
+        key = _cache_key(kind, params)
+        self._count(kind, "requests")
+        while (pending := self._inflight.get(key)) is not None:
+            try:
+                # shield: a cancelled waiter must not cancel the shared generation.
+                result = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The request that owned the generation was cancelled; take over.
+                continue
+            self._count(kind, "deduplicated")
+            return result
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            try:
+                data = await asyncio.to_thread(self.cache.get, key)
+            except OSError:
+                log.exception("media cache read failed kind=%s", kind)
+                data = None
+            if data is not None:
+                self._count(kind, "hits")
+            else:
+                self._count(kind, "misses")
+                started = time.perf_counter()
+                try:
+                    data = await generate()
+                finally:
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    self._count(kind, "generate_ms_total", round(elapsed_ms, 1))
+                    stats = self._stats[kind]
+                    stats["generate_ms_max"] = max(float(stats.get("generate_ms_max", 0.0)), round(elapsed_ms, 1))
+                if data:
+                    self._count(kind, "generated_bytes", len(data))
+                    try:
+                        await asyncio.to_thread(self.cache.put, key, _EXTENSIONS[kind], data)
+                    except OSError:
+                        log.exception("media cache write failed kind=%s", kind)
+                else:
+                    self._count(kind, "failures")
+            future.set_result(data)
+            return data
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            self._count(kind, "failures")
+            future.set_exception(exc)
+            # Waiters get the exception; mark it retrieved for the no-waiter case.
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def speech(self, text: str, *, voice: Optional[str] = None, model: Optional[str] = None) -> Optional[bytes]:
+        """Opus audio for text, or None when the input is empty or generation failed."""
+        voice_input = normalize_input(text)
+        if not voice_input:
+            return None
+        params = {"model": model or tts_model(), "voice": (voice or tts_voice()).strip().lower(), "input": voice_input}
+
+        async def generate() -> Optional[bytes]:
+            speech = await self.client.audio.speech.create(**params, response_format="opus")
+            if hasattr(speech, "aread"):
+                return await speech.aread()
+            if hasattr(speech, "content"):
+                return speech.content
+            if isinstance(speech, (bytes, bytearray)):
+                return bytes(speech)
+            return None
+
+        try:
+            return await self._cached("voice", params, generate)
+        except Exception:
+            log.exception("voice generation failed")
+            return None
+
+    async def image(self, prompt: str, *, model: str = "gpt-image-1", size: str = "1024x1024") -> Optional[bytes]:
+        """PNG bytes for the prompt, or None when the prompt is empty or generation failed."""
+        image_prompt = normalize_input(prompt)
+        if not image_prompt:
+            return None
+        params = {"model": model, "size": size, "prompt": image_prompt}
+
+        async def generate() -> Optional[bytes]:
+            img = await self.client.images.generate(**params)
+            b64 = (img.data[0].b64_json if img and img.data else None) or ""
+            return base64.b64decode(b64) if b64 else None
+
+        try:
+            return await self._cached("image", params, generate)
+        except Exception:
+            log.exception("image generation failed")
+            return None
+
+    async def voice_payload(self, text: str, *, filename: str = "voice.ogg") -> Optional[str]:
+        """Voice action payload (JSON with base64 opus) as expected by the chatbot."""
+        audio = await self.speech(text)
+        if not audio:
+            return None
+        return json.dumps(
+            {"b64": base64.b64encode(audio).decode("ascii"), "mime_type": "audio/ogg", "filename": filename},
+            ensure_ascii=False,
+        )
+
+    async def image_payload(self, prompt: str) -> Optional[str]:
+        """Image action payload (JSON with base64 png) as expected by the chatbot."""
+        png = await self.image(prompt)
+        if not png:
+            return None
+        return json.dumps(
+            {"b64_json": base64.b64encode(png).decode("ascii"), "mime_type": "image/png"},
+            ensure_ascii=False,
+        )
+
+    def stats(self) -> dict[str, Any]:
+        """Per-kind requests/hits/misses/deduplicated/failures, hit_rate and timings, plus cache size."""
+        out: dict[str, Any] = {}
+        for kind, stats in self._stats.items():
+            requests = int(stats.get("requests", 0))
+            served = int(stats.get("hits", 0)) + int(stats.get("deduplicated", 0))
+            misses = int(stats.get("misses", 0))
+            out[kind] = {
+                **stats,
+                "hit_rate": round(served / requests, 3) if requests else 0.0,
+                "generate_ms_avg": round(float(stats.get("generate_ms_total", 0.0)) / misses, 1) if misses else 0.0,
+            }
+        out["cache"] = {
+            "files": len(self.cache),
+            "bytes": self.cache.total_bytes,
+            "max_bytes": self.cache.max_bytes,
+            "evictions": self.cache.evictions,
+        }
+        return out
+
+
+media_service = MediaService(
+    MediaCache(
+        root=Path(os.getenv("MEDIA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "chat-manager-media"))),
+        max_bytes=int(float(os.getenv("MEDIA_CACHE_MAX_MB", "256")) * 1024 * 1024),
+    ),
+)
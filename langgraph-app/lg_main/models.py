@@ -0,0 +1,177 @@
+"""
+Model and client registry for all graphs.
+
+Chat models are looked up by role and built on first use, so importing a graph
+constructs no OpenAI client. Every model and the raw OpenAI clients (media) go
+through one pair of pooled HTTP clients instead of opening a pool per instance.
+
+Model names, timeout and retries come from the environment:
+  LLM_MODEL_<ROLE>      model name for a role (e.g. LLM_MODEL_RESPONDER=gpt-5-mini)
+  LLM_TIMEOUT_SECONDS   request timeout for every model and client (default: the
+                        SDK's own, so long media generations are not cut short)
+  LLM_MAX_RETRIES       retries per request (default 2)
+  LLM_MAX_CONNECTIONS   size of the shared connection pool (default 50)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Optional
+
+from lg_main.llm_usage import usage_ledger
+
+
+log = logging.getLogger(__name__)
+
+# role -> (default model, temperature or None for the provider default)
+ROLES: dict[str, tuple[str, Optional[float]]] = {
+    "default": ("gpt-4.1-2025-04-14", None),
+    "planner": ("gpt-4.1-2025-04-14", 0.1),
+    "responder": ("gpt-5-mini", 0.4),
+    "review": ("gpt-4.1-2025-04-14", 0.2),
+    "style": ("gpt-5-mini", 0.7),
+}
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def model_name(role: str) -> str:
+    return os.getenv(f"LLM_MODEL_{role.upper()}") or ROLES[role][0]
+
+
+def request_timeout() -> Optional[float]:
+    """LLM_TIMEOUT_SECONDS, or None to keep the SDK default."""
+    if not os.getenv("LLM_TIMEOUT_SECONDS"):
+        return None
+    return max(_float_env("LLM_TIMEOUT_SECONDS", 600.0), 1.0)
+
+
+def _timeout_kwargs() -> dict[str, float]:
+    timeout = request_timeout()
+    return {} if timeout is None else {"timeout": timeout}
+
+
+def max_retries() -> int:
+    return max(int(_float_env("LLM_MAX_RETRIES", 2)), 0)
+
+
+class ModelRegistry:
+    """Lazily built chat models by role and the shared HTTP/OpenAI clients behind them."""
+
+    def __init__(self) -> None:
+        self._models: dict[str, Any] = {}
+        self._clients: dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self.build_ms: dict[str, float] = {}
+
+    def _limits(self) -> Any:
+        import httpx
+
+        return httpx.Limits(max_connections=int(_float_env("LLM_MAX_CONNECTIONS", 50)), max_keepalive_connections=20)
+
+    def http_client(self) -> Any:
+        with self._lock:
+            if "http" not in self._clients:
+                from openai import DefaultHttpxClient
+
+                self._clients["http"] = DefaultHttpxClient(limits=self._limits(), **_timeout_kwargs())
+            return self._clients["http"]
+
+    def http_async_client(self) -> Any:
+        with self._lock:
+            if "http_async" not in self._clients:
+                from openai import DefaultAsyncHttpxClient
+
+                self._clients["http_async"] = DefaultAsyncHttpxClient(limits=self._limits(), **_timeout_kwargs())
+            return self._clients["http_async"]
+
+    def async_openai(self) -> Any:
+        """Raw AsyncOpenAI client (TTS, images) on the shared pool."""
+        with self._lock:
+            if "async_openai" not in self._clients:
+                from openai import AsyncOpenAI
+
+                self._clients["async_openai"] = AsyncOpenAI(
+                    http_client=self.http_async_client(), max_retries=max_retries(), **_timeout_kwargs()
+                )
+            return self._clients["async_openai"]
+
+    def chat(self, role: str) -> Any:
+        """The ChatOpenAI instance of `role`, built on first call."""
+        model = self._models.get(role)
+        if model is not None:
+            return model
+        with self._lock:
+            if role not in self._models:
+                started = time.perf_counter()
+                from langchain_openai import ChatOpenAI
+
+                kwargs: dict[str, Any] = _timeout_kwargs()
+                temperature = ROLES[role][1]
+                if temperature is not None:
+                    kwargs["temperature"] = temperature
+                self._models[role] = ChatOpenAI(
+                    model=model_name(role),
+                    max_retries=max_retries(),
+                    http_client=self.http_client(),
+                    http_async_client=self.http_async_client(),
+                    callbacks=[usage_ledger],
+                    **kwargs,
+                )
+                self.build_ms[role] = round((time.perf_counter() - started) * 1000, 1)
+                log.info("model registry: built %s (%s) in %.0f ms", role, model_name(role), self.build_ms[role])
+            return self._models[role]
+
+    def built(self) -> list[str]:
+        return sorted(self._models)
+
+
+class LazyChatModel:
+    """
+    Module-level stand-in for a registry model: `llm = lazy_chat("planner")` keeps
+    call sites (`llm.ainvoke(...)`, `llm.bind_tools(...)`) unchanged while the
+    model is only built when first used.
+    """
+
+    def __init__(self, registry: ModelRegistry, role: str):
+        if role not in ROLES:
+            raise KeyError(f"unknown model role: {role}")
+        self._registry = registry
+        self.role = role
+
+    # Defined here rather than forwarded: LangGraph inspects node closures at
+    # compile time (getattr(llm, "invoke")), which must not build the model.
+    def invoke(self, *args: Any, **kwargs: Any) -> Any:
+        return self._registry.chat(self.role).invoke(*args, **kwargs)
+
+    async def ainvoke(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._registry.chat(self.role).ainvoke(*args, **kwargs)
+
+    def bind_tools(self, *args: Any, **kwargs: Any) -> Any:
+        return self._registry.chat(self.role).bind_tools(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self._registry.chat(self.role), name)
+
+    def __repr__(self) -> str:
+        return f"LazyChatModel({self.role!r})"
+
+
+models = ModelRegistry()
+
+
+def lazy_chat(role: str) -> LazyChatModel:
+    return LazyChatModel(models, role)
+
+
+__all__ = ["LazyChatModel", "ModelRegistry", "ROLES", "lazy_chat", "model_name", "models", "request_timeout"]
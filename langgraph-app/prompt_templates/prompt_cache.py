@@ -0,0 +1,67 @@
+"""
+System prompt assembly for provider-side prompt caching.
+
+OpenAI caches the longest previously seen prompt prefix, so everything that is
+the same for every thread (instructions, tool docs, aliases) goes first and the
+per-thread data (thread info, categories, per-turn options) is appended after it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Mapping, Optional
+
+from langchain_core.messages import SystemMessage
+
+
+class CachedPrompt:
+    """Static prompt prefix plus titled dynamic sections rendered after it."""
+
+    def __init__(self, name: str, static: str):
+        self.name = name
+        self.static = static.rstrip("\n") + "\n"
+        self.version = hashlib.sha256(self.static.encode("utf-8")).hexdigest()[:12]
+
+    def render(self, sections: Optional[Mapping[str, str]] = None) -> SystemMessage:
+        parts = [self.static]
+        for title, body in (sections or {}).items():
+            parts.append(f"\n{title}:\n{str(body).strip()}\n")
+        return SystemMessage(content="".join(parts), name=self.name)
+
+
+def cached_tokens(response: Any) -> int:
+    """Prompt tokens served from the provider cache for one LLM response."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    if details.get("cache_read") is not None:
+        return int(details.get("cache_read") or 0)
+    token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    return int(((token_usage.get("prompt_tokens_details") or {}).get("cached_tokens")) or 0)
+
+
+def record_prompt_usage(stats: dict, node: str, prompt: CachedPrompt, response: Any, elapsed_ms: float) -> dict:
+    """
+    Accumulate per-node prompt cache telemetry under stats["prompt_cache"][node]:
+    input/cached tokens, cache-hit calls and latency split by hit/miss. Counters
+    restart when the prompt version changes.
+    """
+    usage = getattr(response, "usage_metadata", None) or {}
+    input_tokens = int(usage.get("input_tokens") or 0)
+    cached = cached_tokens(response)
+
+    prompt_cache = dict(stats.get("prompt_cache") or {})
+    entry = dict(prompt_cache.get(node) or {})
+    if entry.get("version") != prompt.version:
+        entry = {"version": prompt.version}
+    hit = cached > 0
+    ms = round(float(elapsed_ms), 1)
+    entry["calls"] = int(entry.get("calls", 0)) + 1
+    entry["input_tokens"] = int(entry.get("input_tokens", 0)) + input_tokens
+    entry["cached_tokens"] = int(entry.get("cached_tokens", 0)) + cached
+    entry["hit_calls"] = int(entry.get("hit_calls", 0)) + int(hit)
+    key = "hit_ms_total" if hit else "miss_ms_total"
+    entry[key] = round(float(entry.get(key, 0.0)) + ms, 1)
+    entry["cached_ratio"] = round(entry["cached_tokens"] / entry["input_tokens"], 3) if entry["input_tokens"] else 0.0
+    prompt_cache[node] = entry
+    stats["prompt_cache"] = prompt_cache
+    return stats
@@ -0,0 +1,54 @@
+"""Checkpoint writes of the supervisor's prepare_* nodes stay limited to the channels they change."""
+from __future__ import annotations
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from conversation_states.humans import Human
+
+
+@pytest.fixture
+def supervisor(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    # Force the full pipeline; plain chatter would otherwise take the ingest-only path.
+    monkeypatch.setenv("SUPERVISOR_INGEST_FAST_PATH", "0")
+    from lg_main.g_supervisor.graph import builder
+
+    return builder.compile(checkpointer=InMemorySaver())
+
+
+def _state_channels(graph) -> set[str]:
+    return {name for name in graph.channels if not name.startswith("__") and ":" not in name}
+
+
+def _changed_channels(graph, config, node: str) -> set[str]:
+    """State channels whose version moved in the step that ran `node`."""
+    history = list(graph.checkpointer.list(config))  # newest first
+    for after, before in zip(history, history[1:]):
+        if {task.name for task in graph.get_state(before.config).tasks} == {node}:
+            break
+    else:
+        raise AssertionError(f"{node} did not run")
+    old, new = before.checkpoint["channel_versions"], after.checkpoint["channel_versions"]
+    return {name for name in _state_channels(graph) if new.get(name) != old.get(name)}
+
+
+def test_prepare_nodes_write_only_changed_channels(supervisor):
+    config = {"configurable": {"thread_id": "delta-test"}}
+    user = Human(username="alice", first_name="Alice", intro_completed=True)
+    message = HumanMessage(
+        content="just chatting",
+        name="alice",
+        additional_kwargs={"require_intro": False, "tg_message_id": "1", "chat_id": "-100"},
+    )
+    supervisor.invoke({"messages": [message], "users": [user]}, config)
+
+    assert _changed_channels(supervisor, config, "prepare_internal") == {
+        "last_external_message",
+        "external_messages",
+        "last_sender",
+        "reasoning_messages",
+        "users",
+    }
+    assert _changed_channels(supervisor, config, "prepare_external") == {"last_reasoning"}
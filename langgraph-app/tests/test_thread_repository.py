@@ -0,0 +1,63 @@
+"""ThreadRepository bookkeeping that readers outside the graphs rely on."""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from langgraph.store.memory import InMemoryStore
+
+from conversation_states import repository
+from conversation_states.memory import MemoryRecord
+from conversation_states.repository import ThreadRepository
+from conversation_states.utils.reducers import ClearedCollection
+
+
+def _empty_state() -> SimpleNamespace:
+    return SimpleNamespace(highlights=[], memory_records=[], improvements=[])
+
+
+def test_first_write_marks_empty_thread_store_backed():
+    store = InMemoryStore()
+    repo = ThreadRepository(store, "fresh-thread")
+    state = _empty_state()
+
+    repo.open(state, "memory_records")
+    assert repo.meta() == {}  # nothing to migrate, nothing written yet
+    state.memory_records.append(
+        MemoryRecord(id="m1", created_at=datetime.now(timezone.utc), category="general", text="likes tea")
+    )
+    repo.close(state)
+
+    meta = repo.meta()
+    assert meta.get("store_backed_at")
+    assert "migrated_at" not in meta
+    assert [item.key for item in store.search(("threads", "fresh-thread", "memory_records"))] == ["m1"]
+    assert isinstance(state.memory_records, ClearedCollection)
+
+
+def test_read_only_run_leaves_meta_alone():
+    repo = ThreadRepository(InMemoryStore(), "read-only-thread")
+    state = _empty_state()
+
+    repo.open(state, "highlights", "improvements")
+    repo.close(state)
+
+    assert repo.meta() == {}
+
+
+def test_run_repository_in_use_survives_lru_eviction(monkeypatch):
+    store = InMemoryStore()
+    config = {"configurable": {"thread_id": "busy-thread", "run_id": "run-0"}}
+    monkeypatch.setattr(repository, "get_store", lambda: store)
+    monkeypatch.setattr(repository, "get_config", lambda: config)
+
+    held = repository.thread_repository()
+    state = _empty_state()
+    held.open(state, "memory_records")
+    for n in range(1, repository._RUN_REPOSITORIES_SIZE + 8):
+        config["configurable"]["run_id"] = f"run-{n}"
+        repository.thread_repository()
+
+    config["configurable"]["run_id"] = "run-0"
+    assert repository.thread_repository() is held
+    held.close(state)
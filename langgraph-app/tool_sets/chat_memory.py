@@ -8,7 +8,10 @@ from langchain_core.tools import tool
 from langgraph.prebuilt import InjectedState
 
 from conversation_states.memory import MemoryFrom, MemoryRecord
+from conversation_states.repository import thread_collections
 from conversation_states.states import InternalState
+from tool_sets.similarity import list_duplicate_index
+from tool_sets.text_search import join_text, list_text_index
 
 
 def _normalize_category(category: str) -> str:
@@ -50,12 +53,57 @@ def _add_memory_record_impl(
     return rec.id
 
 
+def _similar_memory_records_impl(*, state: InternalState, text: str, limit: int = 3) -> list[dict]:
+    if state.memory_records is None:
+        state.memory_records = []
+    index = list_duplicate_index("memory_records", state.memory_records, lambda r: r.text)
+    return [
+        {"id": rec.id, "category": rec.category, "text": rec.text, "similarity": similarity}
+        for rec, similarity in index.similar(text)[: max(1, int(limit))]
+    ]
+
+
+def _add_memory_record_result(*, state: InternalState, category: str, text: str, from_username: Optional[str] = None) -> dict:
+    """Add a record; likely duplicates already in the log are reported, not rejected."""
+    duplicates = _similar_memory_records_impl(state=state, text=text)
+    out: dict = {
+        "record_id": _add_memory_record_impl(
+            state=state, category=category, text=text, from_username=from_username
+        )
+    }
+    if duplicates:
+        out["possible_duplicates"] = duplicates
+    return out
+
+
 def _list_memory_records_impl(*, state: InternalState) -> list[dict]:
     items = list(getattr(state, "memory_records", []) or [])
     items.sort(key=lambda r: r.created_at, reverse=True)
     return [r.model_dump(mode="json") for r in items]
 
 
+def _search_memory_records_impl(
+    *,
+    state: InternalState,
+    query: str,
+    category: Optional[str] = None,
+    limit: int = 10,
+) -> list[dict]:
+    if state.memory_records is None:
+        state.memory_records = []
+    index = list_text_index("memory_records", state.memory_records, lambda r: join_text([r.category, r.text]))
+    wanted = (category or "").strip().lower()
+    safe_limit = min(max(1, int(limit)), 50)
+    out: list[dict] = []
+    for rec, score in index.search(query or ""):
+        if wanted and rec.category.strip().lower() != wanted:
+            continue
+        out.append({**rec.model_dump(mode="json"), "score": score})
+        if len(out) >= safe_limit:
+            break
+    return out
+
+
 def _get_unique_categories_impl(*, state: InternalState) -> list[str]:
     cats = []
     seen = set()
@@ -77,7 +125,7 @@ def add_memory_record(
     text: str,
     state: Annotated[InternalState, InjectedState],
     from_username: Optional[str] = None,
-) -> str:
+) -> dict:
     """
     Add a new idea/task/note to the thread-level ideas log.
 
@@ -91,14 +139,19 @@ def add_memory_record(
     - from_username: optional override; by default uses the message sender.
 
     Returns:
-    - record id (str)
+    - {"record_id": str, "possible_duplicates"?: [{id, category, text, similarity}]}
+      possible_duplicates lists similar existing records; the new one is saved anyway.
     """
-    return _add_memory_record_impl(
-        state=state,
-        category=category,
-        text=text,
-        from_username=from_username,
-    )
+    with thread_collections(state, "memory_records") as repo:
+        result = _add_memory_record_result(
+            state=state,
+            category=category,
+            text=text,
+            from_username=from_username,
+        )
+        if repo is not None:
+            repo.update_meta(memory_categories=_get_unique_categories_impl(state=state))
+    return result
 
 
 @tool
@@ -106,7 +159,25 @@ def list_memory_records(
     state: Annotated[InternalState, InjectedState],
 ) -> list[dict]:
     """Return all idea records (most recent first)."""
-    return _list_memory_records_impl(state=state)
+    with thread_collections(state, "memory_records"):
+        return _list_memory_records_impl(state=state)
+
+
+@tool
+def search_memory_records(
+    query: str,
+    state: Annotated[InternalState, InjectedState],
+    category: Optional[str] = None,
+    limit: int = 10,
+) -> list[dict]:
+    """
+    Find idea records matching a free-text query (RU/EN), best matches first.
+
+    Prefer this over list_memory_records when the user asks about a topic:
+    only the top `limit` records are returned, each with a relevance score.
+    """
+    with thread_collections(state, "memory_records"):
+        return _search_memory_records_impl(state=state, query=query, category=category, limit=limit)
 
 
 @tool
@@ -114,14 +185,19 @@ def get_unique_categories(
     state: Annotated[InternalState, InjectedState],
 ) -> list[str]:
     """Return all unique categories currently stored in memory records."""
-    return _get_unique_categories_impl(state=state)
+    with thread_collections(state, "memory_records"):
+        return _get_unique_categories_impl(state=state)
 
 
 __all__ = [
     "add_memory_record",
     "list_memory_records",
+    "search_memory_records",
     "get_unique_categories",
     "_add_memory_record_impl",
+    "_add_memory_record_result",
     "_list_memory_records_impl",
+    "_search_memory_records_impl",
+    "_similar_memory_records_impl",
     "_get_unique_categories_impl",
 ]
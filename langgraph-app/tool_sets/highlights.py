@@ -1,16 +1,25 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
-from typing import Annotated, Optional
+from typing import Annotated, Iterable, Iterator, Optional
 from urllib.parse import urlparse
 from uuid import uuid4
+import hashlib
 import re
+import threading
 
 from langchain_core.tools import tool
 from langgraph.prebuilt import InjectedState
 
 from conversation_states.highlights import Highlight
+from conversation_states.messages import message_timestamp
+from conversation_states.repository import TRENDING_DOCUMENT, ThreadRepository, thread_repository
+from conversation_states.repository import collection_index, thread_collections
 from conversation_states.states import InternalState
+from tool_sets.pagination import Key, KeysetOrder, decode_cursor, encode_cursor, epoch, walk_newest_first
+from tool_sets.text_search import ListTextIndex, join_text, list_text_index
+from tool_sets.trending import TrendingBoard, TrendingTop
 
 
 ALLOWED_CATEGORIES = {"jobs", "resources", "services"}
@@ -65,6 +74,264 @@ def _normalize_tags(tags: Optional[list[str]]) -> list[str]:
     return out
 
 
+def _sort_key(h: Highlight) -> Key:
+    return (epoch(h.published_at), h.id)
+
+
+class HighlightIndex:
+    """
+    Secondary indexes over one highlights list, by position: id, normalized link,
+    lowercased author, tag, and positions sorted by (published_at, id). Appends are
+    indexed incrementally; a replaced list (load, hard delete) or records changed in
+    place get a new index (see highlight_index).
+    Soft-deleted/expired records stay indexed and are filtered at query time.
+    The link map (urlparse per record) is filled only when a link lookup needs it.
+    Tool calls of one run share the index from worker threads, so every update and
+    read of the maps holds the index lock.
+    """
+
+    def __init__(self, items: list[Highlight]):
+        self._items = items
+        self._size = 0
+        self._linked = 0
+        self._lock = threading.RLock()
+        self.by_id: dict[str, int] = {}
+        self.by_link: dict[str, list[int]] = {}
+        self.by_author: dict[str, list[int]] = {}
+        self.by_tag: dict[str, list[int]] = {}
+        self.order = KeysetOrder()
+        self.extend()
+
+    def extend(self) -> None:
+        """Index records appended since the last call."""
+        with self._lock:
+            for pos in range(self._size, len(self._items)):
+                h = self._items[pos]
+                self.by_id[h.id] = pos
+                self.by_author.setdefault((h.author_username or "").lower(), []).append(pos)
+                for tag in set(h.tags or []):
+                    self.by_tag.setdefault(tag, []).append(pos)
+                self.order.add(pos, _sort_key(h))
+            self._size = len(self._items)
+
+    def get(self, highlight_id: str) -> Optional[Highlight]:
+        with self._lock:
+            pos = self.by_id.get(highlight_id)
+        return self._items[pos] if pos is not None else None
+
+    def position(self, highlight_id: str) -> Optional[int]:
+        with self._lock:
+            return self.by_id.get(highlight_id)
+
+    def positions(self, *, author: Optional[str] = None, tags: Iterable[str] = ()) -> tuple[Optional[set[int]], Optional[set[int]]]:
+        """(positions by author, positions having any of `tags`); None where no filter is given."""
+        with self._lock:
+            by_author = set(self.by_author.get(author, ())) if author is not None else None
+            tags = list(tags)
+            by_tags = {p for t in tags for p in self.by_tag.get(t, ())} if tags else None
+        return by_author, by_tags
+
+    def with_link(self, normalized_link: str) -> list[Highlight]:
+        """Records whose normalized link matches, in list order."""
+        with self._lock:
+            for pos in range(self._linked, self._size):
+                link = _normalize_link(str(self._items[pos].highlight_link or ""))
+                if link:
+                    self.by_link.setdefault(link, []).append(pos)
+            self._linked = self._size
+            positions = list(self.by_link.get(normalized_link, ()))
+        return [self._items[p] for p in positions]
+
+    def newest_first(
+        self,
+        *,
+        since: Optional[datetime] = None,
+        before: Optional[Key] = None,
+        candidates: Optional[set[int]] = None,
+        limit: int = 32,
+    ) -> Iterable[Highlight]:
+        """
+        Records published at/after `since` and keyed below `before` (a cursor key),
+        newest first, optionally restricted to candidate positions. `limit` is how
+        many records the caller expects to take.
+        """
+        since_ts = epoch(since) if since is not None else None
+        if candidates is not None:
+            with self._lock:
+                lo, hi = self.order.bounds(since=since_ts, before=before)
+            if len(candidates) < hi - lo:
+                low_key = (since_ts, "") if since_ts is not None else None
+                keyed = sorted(((_sort_key(self._items[p]), p) for p in candidates), reverse=True)
+                return (
+                    self._items[p]
+                    for key, p in keyed
+                    if (low_key is None or key >= low_key) and (before is None or key < before)
+                )
+        positions = walk_newest_first(self.order, self._lock, since=since_ts, before=before, page_size=limit)
+        if candidates is None:
+            return (self._items[p] for p in positions)
+        return (self._items[p] for p in positions if p in candidates)
+
+
+def highlight_index(state: InternalState) -> HighlightIndex:
+    """
+    Index for state.highlights. It is kept with the run's repository while
+    state.highlights is its working list (rebuilt when records change in place)
+    and picks up appends on access; without a repository it is built per call.
+    """
+    if state.highlights is None:
+        state.highlights = []
+    index = collection_index("highlights", "index", state.highlights, HighlightIndex)
+    index.extend()
+    return index
+
+
+def _highlight_text(h: Highlight) -> str:
+    return join_text([h.highlight_description, h.message_text, " ".join(h.tags or [])])
+
+
+def highlight_text_index(state: InternalState) -> ListTextIndex[Highlight]:
+    """Ranked full-text index over description, message text and tags of live highlights."""
+    if state.highlights is None:
+        state.highlights = []
+    return list_text_index("highlights", state.highlights, _highlight_text, skip=lambda h: h.deleted_at is not None)
+
+
+def _highlight_link(h: Highlight) -> str:
+    return _normalize_link(str(h.highlight_link or ""))
+
+
+# One item per tracked highlight, and "msg:<tg id>" / "link:<sha1>" -> {"highlight_id"} lookups.
+_TRENDING_ENTRIES = "trending"
+_TRENDING_REFS = "trending_refs"
+
+
+def _message_ref(message_id: str) -> str:
+    return f"msg:{message_id}"
+
+
+def _link_ref(link: str) -> str:
+    return "link:" + hashlib.sha1(link.encode("utf-8")).hexdigest()
+
+
+def _trending_header(repo: ThreadRepository) -> Optional[dict]:
+    """
+    Board settings, or None until the thread's board is seeded. A board still stored
+    as a single document is split into per-highlight items here. Call under the
+    thread's document lock.
+    """
+    header = repo.document(TRENDING_DOCUMENT)
+    if header and "entries" in header:
+        # Top lists are seeded by the next trending query.
+        board = TrendingBoard(header.get("entries"), half_life=header.get("half_life"))
+        board.changed = set(board.entries)
+        _save_trending(repo, board, {}, {})
+        header = {"half_life": board.half_life}
+        repo.put_document(TRENDING_DOCUMENT, header)
+    return header
+
+
+def _save_trending(repo: ThreadRepository, board: TrendingBoard, by_message: dict, by_link: dict) -> None:
+    """Write the entries and lookups that differ from what the board was loaded with."""
+    for highlight_id in board.changed:
+        repo.put_item(_TRENDING_ENTRIES, highlight_id, board.entries[highlight_id])
+    for highlight_id in board.removed:
+        repo.delete_item(_TRENDING_ENTRIES, highlight_id)
+    for before, after, ref in ((by_message, board.by_message, _message_ref), (by_link, board.by_link, _link_ref)):
+        for key in before.keys() | after.keys():
+            if before.get(key) == after.get(key):
+                continue
+            if key in after:
+                repo.put_item(_TRENDING_REFS, ref(key), {"highlight_id": after[key]})
+            else:
+                repo.delete_item(_TRENDING_REFS, ref(key))
+
+
+@contextmanager
+def _trending_update(
+    *,
+    ids: Iterable[str] = (),
+    message_ids: Iterable[str] = (),
+    links: Iterable[str] = (),
+) -> Iterator[Optional[TrendingBoard]]:
+    """
+    The part of the stored board an update touches: entries of `ids` and the
+    highlights behind `message_ids` / `links`, with their lookups. Changed entries are
+    written back one item each on exit. Yields None without a store or before the
+    board is seeded (the next trending query seeds it). Holds the thread's document lock.
+    """
+    repo = thread_repository()
+    if repo is None:
+        yield None
+        return
+    with repo.document_lock():
+        header = _trending_header(repo)
+        if header is None:
+            yield None
+            return
+        entries = repo.get_items(_TRENDING_ENTRIES, ids)
+        message_ids = {str(m) for m in message_ids} | {e["tg_message_id"] for e in entries.values() if e.get("tg_message_id")}
+        links = set(links) | {e["link"] for e in entries.values() if e.get("link")}
+        refs = repo.get_items(_TRENDING_REFS, [_message_ref(m) for m in message_ids] + [_link_ref(l) for l in links])
+        by_message = {m: refs[_message_ref(m)]["highlight_id"] for m in message_ids if _message_ref(m) in refs}
+        by_link = {l: refs[_link_ref(l)]["highlight_id"] for l in links if _link_ref(l) in refs}
+        entries.update(repo.get_items(_TRENDING_ENTRIES, {*by_message.values(), *by_link.values()} - entries.keys()))
+        board = TrendingBoard(entries, by_message=by_message, by_link=by_link, half_life=header.get("half_life"))
+        yield board
+        _save_trending(repo, board, by_message, by_link)
+        if header.get("top") is not None and board.dirty:
+            top = TrendingTop.from_dict(header["top"])
+            if top.apply(board):
+                repo.put_document(TRENDING_DOCUMENT, {**header, "top": top.to_dict()})
+
+
+def _track_trending(records: list[Highlight]) -> None:
+    links = [link for h in records if (link := _highlight_link(h))]
+    message_ids = [str(h.tg_message_id) for h in records if h.tg_message_id]
+    with _trending_update(message_ids=message_ids, links=links) as board:
+        if board is not None:
+            for h in records:
+                board.track(h, _highlight_link(h))
+
+
+def _untrack_trending(highlight_ids: list[str]) -> None:
+    with _trending_update(ids=highlight_ids) as board:
+        if board is not None:
+            for highlight_id in highlight_ids:
+                board.untrack(highlight_id)
+
+
+_MESSAGE_LINK_RE = re.compile(r"(?:https?://|\bt\.me/)[^\s<>\"']+", re.IGNORECASE)
+
+
+def record_message_engagement(message: object) -> list[str]:
+    """
+    Count an incoming chat message towards trending: a reply to a highlight's source
+    message or a re-share of a highlighted link. Returns the highlight ids updated.
+    Only messages with a reply target or a link touch the store.
+    """
+    kwargs = getattr(message, "additional_kwargs", None) or {}
+    reply_to = kwargs.get("tg_reply_to_message_id")
+    links = []
+    for raw in _MESSAGE_LINK_RE.findall(_message_to_text(getattr(message, "content", ""))):
+        raw = raw.rstrip(".,;:!?)»")
+        link = _normalize_link(raw if "://" in raw else f"https://{raw}")
+        if link:
+            links.append(link)
+    if reply_to is None and not links:
+        return []
+    message_id = kwargs.get("tg_message_id")
+    with _trending_update(message_ids=[str(reply_to)] if reply_to is not None else [], links=links) as board:
+        if board is None:
+            return []
+        return board.ingest(
+            at=message_timestamp(message) or _utc_now(),
+            message_id=str(message_id) if message_id is not None else None,
+            reply_to_message_id=str(reply_to) if reply_to is not None else None,
+            links=links,
+        )
+
+
 def _message_to_text(content: object) -> str:
     if isinstance(content, str):
         return content.strip()
@@ -149,6 +416,7 @@ def _resolve_current_message_context(state: InternalState) -> tuple[Optional[dic
         "fallback_link": _normalize_link(str(current_link or "")) if current_link else None,
         "author_username": author_username,
         "author_telegram_id": author_tg_id,
+        "tg_message_id": str(current_mid) if current_mid is not None else None,
     }, None)
 
 
@@ -179,10 +447,9 @@ def _add_single_highlight_impl(
     if not message_text:
         return {"ok": False, "reason": "failed to derive message_text from current message"}
 
-    existing = list(getattr(state, "highlights", []) or [])
     if normalized_link:
-        for h in existing:
-            if _normalize_link(str(getattr(h, "highlight_link", "") or "")) == normalized_link and getattr(h, "deleted_at", None) is None:
+        for h in highlight_index(state).with_link(normalized_link):
+            if getattr(h, "deleted_at", None) is None:
                 return {
                     "ok": True,
                     "deduplicated": True,
@@ -210,6 +477,7 @@ def _add_single_highlight_impl(
         message_text=message_text,
         author_username=final_username,
         author_telegram_id=final_tg_id,
+        tg_message_id=context.get("tg_message_id"),
         published_at=_utc_now(),
         expires_at=None,
     )
@@ -234,6 +502,7 @@ def _add_highlights_impl(
 
     added: list[dict] = []
     failed: list[dict] = []
+    new_records: list[Highlight] = []
     for idx, payload in enumerate(items):
         if not isinstance(payload, dict):
             failed.append({"index": idx, "ok": False, "reason": "item must be an object"})
@@ -241,9 +510,14 @@ def _add_highlights_impl(
         result = _add_single_highlight_impl(state=state, context=context, payload=payload)
         if result.get("ok"):
             added.append({"index": idx, **result})
+            if not result.get("deduplicated"):
+                new_records.append(state.highlights[-1])
         else:
             failed.append({"index": idx, **result})
 
+    if new_records:
+        _track_trending(new_records)
+
     return {
         "ok": len(added) > 0,
         "added_count": len(added),
@@ -266,25 +540,30 @@ def _delete_highlight_impl(
     if not target_id and not target_link:
         return {"ok": False, "reason": "highlight_id or highlight_link is required"}
 
-    items = list(getattr(state, "highlights", []) or [])
-    matched: list[Highlight] = []
-    for h in items:
-        if target_id and h.id == target_id:
-            matched.append(h)
-            continue
-        if target_link and _normalize_link(str(h.highlight_link or "")) == target_link:
-            matched.append(h)
+    index = highlight_index(state)
+    items = list(state.highlights)
+    matched_by_id: dict[str, Highlight] = {}
+    if target_id and (h := index.get(target_id)) is not None:
+        matched_by_id[h.id] = h
+    if target_link:
+        for h in index.with_link(target_link):
+            matched_by_id.setdefault(h.id, h)
+    matched = sorted(matched_by_id.values(), key=lambda h: index.position(h.id))
 
     if not matched:
         return {"ok": False, "reason": "highlight not found", "deleted_count": 0, "deleted_ids": []}
 
     deleted_ids = [h.id for h in matched]
+    _untrack_trending(deleted_ids)
     if hard_delete:
-        state.highlights = [h for h in items if h.id not in set(deleted_ids)]
+        removed = set(deleted_ids)
+        state.highlights = [h for h in items if h.id not in removed]
     else:
         ts = _utc_now()
+        text_index = highlight_text_index(state)
         for h in matched:
             h.deleted_at = ts
+            text_index.discard(index.position(h.id))
 
     return {"ok": True, "deleted_count": len(deleted_ids), "deleted_ids": deleted_ids}
 
@@ -297,9 +576,19 @@ def _search_highlights_impl(
     days: Optional[int] = None,
     category: Optional[str] = None,
     tags: Optional[list[str]] = None,
+    query: Optional[str] = None,
     limit: int = 20,
     offset: int = 0,
+    cursor: Optional[str] = None,
 ) -> dict:
+    """
+    Filtered highlights, newest first (or by relevance with `query`).
+
+    Paging: the first page reports `total`; every page returns `next_cursor` when
+    more items follow. Passing it back (with the same filters) resumes after the
+    last item through the (published_at, id) order without counting or skipping
+    earlier items; `total` is omitted then. Ranked `query` results page by offset.
+    """
     now = _utc_now()
     normalized_author = (author_username or "").strip().lstrip("@").lower()
     normalized_category = _normalize_category(category or "") if category else ""
@@ -307,36 +596,64 @@ def _search_highlights_impl(
     days_int = int(days) if days is not None else None
     if days_int is not None and days_int < 0:
         days_int = 0
+    ranked_query = (query or "").strip()
+    try:
+        before = decode_cursor(cursor)
+    except ValueError:
+        return {"ok": False, "reason": "invalid cursor"}
+    if before is not None and ranked_query:
+        return {"ok": False, "reason": "cursor is not supported with query; use offset"}
+    safe_offset = max(0, int(offset)) if before is None else 0
+    safe_limit = min(max(1, int(limit)), 100)
+
+    index = highlight_index(state)
+    # Author and tags narrow the candidates through the indexes; the time window is
+    # a bisect on the published_at order. Remaining filters are checked per record.
+    candidates, tagged = index.positions(author=normalized_author or None, tags=normalized_tags)
+    if tagged is not None:
+        candidates = tagged if candidates is None else candidates & tagged
+    since = now - timedelta(days=days_int) if days_int is not None else None
+
+    scores: dict[str, float] = {}
+    if ranked_query:
+        # Free-text query: BM25 order instead of newest first, same filters.
+        ranked = highlight_text_index(state).search(ranked_query)
+        scores = {h.id: score for h, score in ranked}
+        rows: Iterable[Highlight] = (
+            h
+            for h, _ in ranked
+            if (candidates is None or index.position(h.id) in candidates)
+            and (since is None or h.published_at >= since)
+        )
+    else:
+        rows = index.newest_first(since=since, before=before, candidates=candidates, limit=safe_limit + 1)
 
-    rows: list[Highlight] = list(getattr(state, "highlights", []) or [])
     filtered: list[Highlight] = []
     for h in rows:
+        # With a cursor only one item past the page is needed to know if more follow.
+        if before is not None and len(filtered) > safe_limit:
+            break
         if h.deleted_at is not None:
             continue
         if h.expires_at is not None and h.expires_at < now:
             continue
-        if normalized_author and h.author_username.lower() != normalized_author:
-            continue
         if author_telegram_id is not None and h.author_telegram_id != int(author_telegram_id):
             continue
         if normalized_category and h.category != normalized_category:
             continue
-        if days_int is not None and h.published_at < (now - timedelta(days=days_int)):
-            continue
-        if normalized_tags and not normalized_tags.intersection(set(h.tags or [])):
-            continue
         filtered.append(h)
 
-    filtered.sort(key=lambda r: r.published_at, reverse=True)
-    safe_offset = max(0, int(offset))
-    safe_limit = min(max(1, int(limit)), 100)
     page = filtered[safe_offset:safe_offset + safe_limit]
-
-    return {
-        "ok": True,
-        "total": len(filtered),
-        "items": [r.model_dump(mode="json") for r in page],
-    }
+    has_more = len(filtered) > safe_offset + safe_limit
+
+    items = [r.model_dump(mode="json") for r in page]
+    if scores:
+        items = [{**item, "score": scores[item["id"]]} for item in items]
+    out: dict = {"ok": True, "items": items}
+    if before is None:
+        out["total"] = len(filtered)
+    out["next_cursor"] = encode_cursor(_sort_key(page[-1])) if has_more and page and not scores else None
+    return out
 
 
 def _trending_highlights_impl(
@@ -346,31 +663,76 @@ def _trending_highlights_impl(
     category: Optional[str] = None,
     limit: int = 10,
 ) -> dict:
-    base = _search_highlights_impl(
-        state=state,
-        days=days,
-        category=category,
-        limit=100,
-        offset=0,
-    )
-    if not base.get("ok"):
-        return base
-
+    """
+    Top highlights by decayed engagement (publication, replies, reactions, re-shares)
+    published within `days`. Reads the stored top list of the category and only the
+    entries it returns; a thread without top lists (or without a store), or a query
+    whose filters run past an incomplete list, ranks all entries instead.
+    """
     now = _utc_now()
-    enriched = []
-    for item in base.get("items", []):
-        try:
-            published_at = datetime.fromisoformat(str(item["published_at"]).replace("Z", "+00:00"))
-        except Exception:
-            published_at = now
-        age_hours = max((now - published_at).total_seconds() / 3600.0, 0.0)
-        freshness = max(0.0, 1.0 - (age_hours / max(days * 24, 1)))
-        score = round(freshness, 4)
-        enriched.append({**item, "score": score})
-
-    enriched.sort(key=lambda i: (i.get("score", 0.0), i.get("published_at", "")), reverse=True)
+    index = highlight_index(state)
+    normalized_category = _normalize_category(category or "") if category else ""
+    since = now - timedelta(days=max(0, int(days)))
     safe_limit = min(max(1, int(limit)), 100)
-    return {"ok": True, "total": len(enriched), "items": enriched[:safe_limit]}
+
+    def live(highlight_id: str) -> Optional[Highlight]:
+        h = index.get(highlight_id)
+        if h is None or h.deleted_at is not None or (h.expires_at is not None and h.expires_at < now):
+            return None
+        return h
+
+    repo = thread_repository()
+    board: Optional[TrendingBoard] = None
+    chosen: Optional[list[Highlight]] = None
+    if repo is None:
+        board = TrendingBoard.from_highlights(state.highlights or [], _highlight_link)
+    else:
+        with repo.document_lock():
+            header = _trending_header(repo)
+            if header is None:
+                board = TrendingBoard.from_highlights(state.highlights or [], _highlight_link)
+                _save_trending(repo, board, {}, {})
+                header = {"half_life": board.half_life}
+            elif header.get("top") is not None:
+                # The usual path: walk the category's stored top list and read only
+                # the entries of the highlights returned.
+                ranked, complete = TrendingTop.from_dict(header["top"]).ranked(normalized_category or None)
+                since_h = since.timestamp() / 3600.0
+                picked: list[Highlight] = []
+                for _, highlight_id, published_h in ranked:
+                    if published_h < since_h or (h := live(highlight_id)) is None:
+                        continue
+                    picked.append(h)
+                    if len(picked) >= safe_limit:
+                        break
+                if len(picked) >= safe_limit or complete:
+                    board = TrendingBoard(repo.get_items(_TRENDING_ENTRIES, [h.id for h in picked]), half_life=header.get("half_life"))
+                    chosen = [h for h in picked if h.id in board]
+            if board is None:
+                # No top lists yet, or the filters ran past an incomplete list: rank
+                # every entry once and (re)seed the lists from them.
+                board = TrendingBoard(repo.all_items(_TRENDING_ENTRIES), half_life=header.get("half_life"))
+            if chosen is None:
+                repo.put_document(TRENDING_DOCUMENT, {**header, "top": TrendingTop.from_entries(board.entries).to_dict()})
+
+    if chosen is None:
+        chosen = []
+        for highlight_id in board.top(category=normalized_category or None, since=since):
+            h = live(highlight_id)
+            if h is None:
+                continue
+            chosen.append(h)
+            if len(chosen) >= safe_limit:
+                break
+    items: list[dict] = [
+        {
+            **h.model_dump(mode="json"),
+            "score": round(board.score_at(h.id, now), 4),
+            "engagement": board.engagement(h.id),
+        }
+        for h in chosen
+    ]
+    return {"ok": True, "total": len(items), "items": items}
 
 
 @tool
@@ -406,10 +768,11 @@ def add_highlights(
     - if not provided, tool tries Telegram metadata from current message
     - if unavailable, highlight is still saved with empty link
     """
-    return _add_highlights_impl(
-        state=state,
-        highlights=highlights,
-    )
+    with thread_collections(state, "highlights"):
+        return _add_highlights_impl(
+            state=state,
+            highlights=highlights,
+        )
 
 
 @tool
@@ -420,12 +783,13 @@ def delete_highlight(
     hard_delete: bool = False,
 ) -> dict:
     """Delete highlight by id or highlight_link. Soft-delete by default."""
-    return _delete_highlight_impl(
-        state=state,
-        highlight_id=highlight_id,
-        highlight_link=highlight_link,
-        hard_delete=hard_delete,
-    )
+    with thread_collections(state, "highlights"):
+        return _delete_highlight_impl(
+            state=state,
+            highlight_id=highlight_id,
+            highlight_link=highlight_link,
+            hard_delete=hard_delete,
+        )
 
 
 @tool
@@ -436,24 +800,32 @@ def search_highlights(
     days: Optional[int] = None,
     category: Optional[str] = None,
     tags: Optional[list[str]] = None,
+    query: Optional[str] = None,
     limit: int = 20,
     offset: int = 0,
+    cursor: Optional[str] = None,
 ) -> dict:
     """
     Search useful saved highlights by user, recent days, top-level category, and tags.
+    With query (free text, RU/EN), matches are ranked by relevance over description,
+    message text and tags and carry a score; only the top `limit` are returned.
+    For the next page pass the returned next_cursor with the same filters.
 
     Returns structured items including highlight_description, message_text, and highlight_link.
     """
-    return _search_highlights_impl(
-        state=state,
-        author_username=author_username,
-        author_telegram_id=author_telegram_id,
-        days=days,
-        category=category,
-        tags=tags,
-        limit=limit,
-        offset=offset,
-    )
+    with thread_collections(state, "highlights"):
+        return _search_highlights_impl(
+            state=state,
+            author_username=author_username,
+            author_telegram_id=author_telegram_id,
+            days=days,
+            category=category,
+            tags=tags,
+            query=query,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+        )
 
 
 @tool
@@ -463,13 +835,17 @@ def trending_highlights(
     category: Optional[str] = None,
     limit: int = 10,
 ) -> dict:
-    """Return top recent highlights (useful links/materials) ranked by freshness."""
-    return _trending_highlights_impl(
-        state=state,
-        days=days,
-        category=category,
-        limit=limit,
-    )
+    """
+    Return top recent highlights (useful links/materials) ranked by freshness and
+    engagement: replies to the saved message, reactions and re-shares of the link.
+    """
+    with thread_collections(state, "highlights"):
+        return _trending_highlights_impl(
+            state=state,
+            days=days,
+            category=category,
+            limit=limit,
+        )
 
 
 __all__ = [
@@ -477,6 +853,10 @@ __all__ = [
     "delete_highlight",
     "search_highlights",
     "trending_highlights",
+    "HighlightIndex",
+    "highlight_index",
+    "highlight_text_index",
+    "record_message_engagement",
     "_add_highlights_impl",
     "_delete_highlight_impl",
     "_search_highlights_impl",
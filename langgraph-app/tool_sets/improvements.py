@@ -1,20 +1,26 @@
 from __future__ import annotations
 
+import hashlib
 from datetime import datetime, timedelta, timezone
 import re
-from typing import Annotated, Optional, Any
+from typing import Annotated, Callable, Optional, Any
 from uuid import uuid4
 
 from langchain_core.tools import tool
 from langgraph.prebuilt import InjectedState
 
 from conversation_states.improvements import Improvement
+from conversation_states.repository import thread_collections, thread_repository
 from conversation_states.states import InternalState
+from tool_sets.pagination import Key, decode_cursor, encode_cursor, epoch, list_keyset_index
+from tool_sets.similarity import list_duplicate_index
 
 
 ALLOWED_CATEGORIES = {"bug", "feature"}
 ALLOWED_STATUSES = {"open", "closed", "wont_do", "all"}
 _INC_RE = re.compile(r"^INC(\d{5})$")
+# Name of the per-thread store sequence that hands out INC numbers.
+INC_SEQUENCE = "improvements"
 
 
 def _utc_now() -> datetime:
@@ -53,18 +59,96 @@ def _default_reporter_from_state(state: InternalState) -> str | None:
     return first_name or None
 
 
-def _next_inc_number(state: InternalState) -> str:
-    max_n = 0
-    for item in list(getattr(state, "improvements", []) or []):
-        task = str(getattr(item, "task_number", "") or "").strip().upper()
-        m = _INC_RE.match(task)
-        if not m:
-            continue
-        try:
-            max_n = max(max_n, int(m.group(1)))
-        except Exception:
+def inc_value(task_number: object) -> Optional[int]:
+    m = _INC_RE.match(str(task_number or "").strip().upper())
+    return int(m.group(1)) if m else None
+
+
+def format_inc(n: int) -> str:
+    return f"INC{n:05d}"
+
+
+def max_inc_number(improvements: list) -> int:
+    values = (inc_value(i.get("task_number") if isinstance(i, dict) else getattr(i, "task_number", None)) for i in improvements or [])
+    return max((v for v in values if v is not None), default=0)
+
+
+def allocate_inc_numbers(improvements: list, count: int) -> list[str]:
+    """
+    `count` new INC numbers for the current thread in one call. With a store they
+    come from the persisted per-thread sequence (seeded once from the highest
+    existing number); without one they continue after the highest in `improvements`.
+    """
+    if count <= 0:
+        return []
+    repo = thread_repository()
+    if repo is not None:
+        first = repo.allocate(INC_SEQUENCE, count, floor=lambda: max_inc_number(improvements))
+    else:
+        first = max_inc_number(improvements) + 1
+    return [format_inc(first + i) for i in range(count)]
+
+
+def repair_inc_numbers(improvements: list[Improvement], allocate: Callable[[int], list[str]]) -> list[dict]:
+    """
+    Make task numbers unique and valid in place. Of records sharing a number the
+    earliest created keeps it; the others, and records without a valid number, get
+    fresh ones from `allocate`. Returns [{"id", "from", "to"}] for changed records.
+    """
+    seen: set[int] = set()
+    broken: list[Improvement] = []
+    for item in sorted(improvements or [], key=lambda i: (i.created_at, i.id)):
+        n = inc_value(item.task_number)
+        if n is None or n in seen:
+            broken.append(item)
             continue
-    return f"INC{max_n + 1:05d}"
+        seen.add(n)
+        item.task_number = format_inc(n)
+    changes: list[dict] = []
+    for item, number in zip(broken, allocate(len(broken))):
+        changes.append({"id": item.id, "from": item.task_number, "to": number})
+        item.task_number = number
+    return changes
+
+
+def _settle_inc_numbers(state: InternalState, added_ids: set[str]) -> dict[str, str]:
+    """
+    Repair INC numbers handed out twice by concurrent allocation: the sequence lock is
+    process-local (see ThreadRepository.allocate). The new records are stored first;
+    if another stored record holds one of their numbers, the thread's improvements are
+    reloaded and repaired. Returns {old: new} task numbers of the new records that moved.
+    """
+    repo = thread_repository()
+    if repo is None or not added_ids:
+        return {}
+    repo.sync("improvements", state.improvements)
+    numbers = {i.task_number for i in state.improvements if i.id in added_ids}
+    if not any(len(repo.find("improvements", {"task_number": n}, limit=2)) > 1 for n in numbers):
+        return {}
+    fresh = repo.load("improvements")
+    repo.raise_sequence(INC_SEQUENCE, max_inc_number(fresh))
+    changes = repair_inc_numbers(fresh, lambda n: allocate_inc_numbers(fresh, n))
+    repo.sync("improvements", fresh)
+    state.improvements = repo.collection("improvements")
+    return {c["from"]: c["to"] for c in changes if c["id"] in added_ids}
+
+
+def _repair_inc_numbers_impl(*, state: InternalState) -> dict:
+    if state.improvements is None:
+        state.improvements = []
+    items = state.improvements
+    repo = thread_repository()
+    if repo is not None:
+        # A sequence behind the stored numbers would hand out duplicates again.
+        repo.raise_sequence(INC_SEQUENCE, max_inc_number(items))
+    changes = repair_inc_numbers(items, lambda n: allocate_inc_numbers(items, n))
+    return {"ok": True, "repaired_count": len(changes), "repaired": changes}
+
+
+def _sort_key(item: Improvement) -> Key:
+    # Ties break on the immutable id (task numbers can be repaired between pages),
+    # hashed because cursors end up in LLM-facing output.
+    return (epoch(item.created_at), hashlib.sha1(item.id.encode("utf-8")).hexdigest()[:16])
 
 
 def _public_improvement(item: Improvement) -> dict:
@@ -72,26 +156,41 @@ def _public_improvement(item: Improvement) -> dict:
     return item.model_dump(mode="json", exclude={"id"})
 
 
+def similar_improvements(improvements: list[Improvement], description: str, limit: int = 3) -> list[dict]:
+    """Likely duplicates of `description` among non-rejected improvements, most similar first."""
+    index = list_duplicate_index("improvements", improvements, lambda i: i.description)
+    out: list[dict] = []
+    for item, similarity in index.similar(description):
+        if item.status == "wont_do":
+            continue
+        out.append(
+            {
+                "task_number": item.task_number,
+                "status": item.status,
+                "description": item.description,
+                "similarity": similarity,
+            }
+        )
+        if len(out) >= limit:
+            break
+    return out
+
+
 def _add_improvement_one(
     *,
     state: InternalState,
     description: str,
     category: str,
+    task_number: str,
     reporter: Optional[str] = None,
 ) -> dict:
     normalized_category = _normalize_category(category)
-    if not normalized_category:
-        return {"ok": False, "reason": "category must be one of: bug, feature"}
-
     final_description = str(description or "").strip()
-    if not final_description:
-        return {"ok": False, "reason": "description is required"}
-
     final_reporter = _normalize_reporter(reporter) or _default_reporter_from_state(state)
 
     rec = Improvement(
         id=uuid4().hex,
-        task_number=_next_inc_number(state),
+        task_number=task_number,
         category=normalized_category,  # type: ignore[arg-type]
         description=final_description,
         reporter=final_reporter,
@@ -100,8 +199,13 @@ def _add_improvement_one(
     )
     if state.improvements is None:
         state.improvements = []
+    # Flag only: the caller decides; earlier items of the same batch are compared too.
+    duplicates = similar_improvements(state.improvements, final_description)
     state.improvements.append(rec)
-    return {"ok": True, "task_number": rec.task_number, "improvement": _public_improvement(rec)}
+    out = {"ok": True, "task_number": rec.task_number, "improvement": _public_improvement(rec)}
+    if duplicates:
+        out["possible_duplicates"] = duplicates
+    return out
 
 
 def _normalize_batch_item(item: Any) -> dict | None:
@@ -133,23 +237,43 @@ def _add_improvement_impl(
             "reason": "improvements[] is required and must be non-empty",
         }
 
+    # Validate first so the whole batch takes one block of INC numbers without gaps.
+    valid: list[int] = []
+    reasons: dict[int, str] = {}
+    for idx, it in enumerate(items):
+        if not _normalize_category(it.get("category")):
+            reasons[idx] = "category must be one of: bug, feature"
+        elif not str(it.get("description") or "").strip():
+            reasons[idx] = "description is required"
+        else:
+            valid.append(idx)
+    numbers = dict(zip(valid, allocate_inc_numbers(list(state.improvements or []), len(valid))))
+    if state.improvements is None:
+        state.improvements = []
+    first_new = len(state.improvements)
+
     added: list[dict] = []
     errors: list[dict] = []
     for idx, it in enumerate(items):
-        result = _add_improvement_one(
-            state=state,
-            description=it.get("description"),
-            category=it.get("category"),
-            reporter=it.get("reporter"),
-        )
-        if result.get("ok") is True:
-            added.append(
-                {
-                    "index": idx,
-                    "task_number": result.get("task_number"),
-                    "improvement": result.get("improvement"),
-                }
+        if idx in numbers:
+            result = _add_improvement_one(
+                state=state,
+                description=it.get("description"),
+                category=it.get("category"),
+                task_number=numbers[idx],
+                reporter=it.get("reporter"),
             )
+        else:
+            result = {"ok": False, "reason": reasons[idx]}
+        if result.get("ok") is True:
+            entry = {
+                "index": idx,
+                "task_number": result.get("task_number"),
+                "improvement": result.get("improvement"),
+            }
+            if result.get("possible_duplicates"):
+                entry["possible_duplicates"] = result["possible_duplicates"]
+            added.append(entry)
         else:
             errors.append(
                 {
@@ -163,6 +287,11 @@ def _add_improvement_impl(
                 }
             )
 
+    moved = _settle_inc_numbers(state, {i.id for i in state.improvements[first_new:]})
+    for entry in added:
+        if entry["task_number"] in moved:
+            entry["task_number"] = entry["improvement"]["task_number"] = moved[entry["task_number"]]
+
     out: dict[str, Any] = {
         "ok": len(errors) == 0 and len(added) > 0,
         "added_count": len(added),
@@ -181,6 +310,7 @@ def _list_improvements_impl(
     category: Optional[str] = None,
     limit: int = 100,
     offset: int = 0,
+    cursor: Optional[str] = None,
 ) -> dict:
     normalized_status = _normalize_status(status)
     if not normalized_status:
@@ -192,26 +322,37 @@ def _list_improvements_impl(
         if not normalized_category:
             return {"ok": False, "reason": "category must be one of: bug, feature, all"}
 
+    try:
+        before = decode_cursor(cursor)
+    except ValueError:
+        return {"ok": False, "reason": "invalid cursor"}
+
     safe_days = max(0, int(days))
     cutoff = _utc_now() - timedelta(days=safe_days)
+    safe_offset = max(0, int(offset)) if before is None else 0
+    safe_limit = min(max(1, int(limit)), 500)
 
-    rows = list(getattr(state, "improvements", []) or [])
+    if state.improvements is None:
+        state.improvements = []
+    index = list_keyset_index("improvements", state.improvements, _sort_key)
     filtered: list[Improvement] = []
-    for item in rows:
-        if item.created_at < cutoff:
-            continue
+    for item in index.newest_first(since=cutoff, before=before, limit=safe_limit + 1):
+        # With a cursor only one item past the page is needed to know if more follow.
+        if before is not None and len(filtered) > safe_limit:
+            break
         if normalized_status != "all" and item.status != normalized_status:
             continue
         if normalized_category and item.category != normalized_category:
             continue
         filtered.append(item)
 
-    filtered.sort(key=lambda i: i.created_at, reverse=True)
-    safe_offset = max(0, int(offset))
-    safe_limit = min(max(1, int(limit)), 500)
     page = filtered[safe_offset:safe_offset + safe_limit]
-
-    return {"ok": True, "total": len(filtered), "items": [_public_improvement(i) for i in page]}
+    has_more = len(filtered) > safe_offset + safe_limit
+    out: dict[str, Any] = {"ok": True, "items": [_public_improvement(i) for i in page]}
+    if before is None:
+        out["total"] = len(filtered)
+    out["next_cursor"] = encode_cursor(_sort_key(page[-1])) if has_more else None
+    return out
 
 
 @tool
@@ -232,11 +373,15 @@ def add_improvement(
     Auto-filled in background:
     - created_at
     - status=open
+
+    Added items that look like existing ones carry possible_duplicates
+    (task_number, status, description, similarity); they are still added.
     """
-    return _add_improvement_impl(
-        state=state,
-        improvements=improvements,
-    )
+    with thread_collections(state, "improvements"):
+        return _add_improvement_impl(
+            state=state,
+            improvements=improvements,
+        )
 
 
 @tool
@@ -247,6 +392,7 @@ def list_improvements(
     category: Optional[str] = None,
     limit: int = 100,
     offset: int = 0,
+    cursor: Optional[str] = None,
 ) -> dict:
     """
     List improvement items by status/category for the last N days.
@@ -255,20 +401,28 @@ def list_improvements(
     - status: open, closed, wont_do, all (default: open)
     - days: recent window in days (default: 60)
     - category: bug, feature, all/None
+
+    Paging: pass the returned next_cursor (with the same filters) for the next page.
     """
-    return _list_improvements_impl(
-        state=state,
-        status=status,
-        days=days,
-        category=category,
-        limit=limit,
-        offset=offset,
-    )
+    with thread_collections(state, "improvements"):
+        return _list_improvements_impl(
+            state=state,
+            status=status,
+            days=days,
+            category=category,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+        )
 
 
 __all__ = [
     "add_improvement",
     "list_improvements",
+    "allocate_inc_numbers",
+    "repair_inc_numbers",
+    "similar_improvements",
     "_add_improvement_impl",
     "_list_improvements_impl",
+    "_repair_inc_numbers_impl",
 ]
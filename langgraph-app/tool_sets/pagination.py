@@ -0,0 +1,154 @@
+"""
+Keyset pagination for thread collections.
+
+Records are ordered newest first by (timestamp, id). A cursor is the opaque,
+url-safe encoding of the last returned key; the next page resumes strictly
+below it through a bisect on the sorted key list, and concurrent inserts never
+shift or repeat items. Walks copy the sorted positions a page at a time, so a
+deep page costs about its own size. The sorted keys of a thread collection are kept with the
+run's loaded collection (built in one pass, as loaded lists are already in
+timestamp order), so within a run later pages do not re-sort the collection.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import threading
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Callable, Generic, Iterator, Optional, TypeVar
+
+from conversation_states.repository import collection_index
+
+
+T = TypeVar("T")
+Key = tuple[float, str]
+
+
+def epoch(dt: datetime) -> float:
+    return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def encode_cursor(key: Key) -> str:
+    raw = json.dumps([key[0], key[1]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Key]:
+    """Key encoded in a cursor; raises ValueError for a malformed one."""
+    if not cursor:
+        return None
+    try:
+        padded = str(cursor) + "=" * (-len(str(cursor)) % 4)
+        ts, record_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return float(ts), str(record_id)
+    except Exception as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+class KeysetOrder:
+    """List positions sorted by (timestamp, id), maintained as records are added."""
+
+    def __init__(self) -> None:
+        self.keys: list[Key] = []
+        self.positions: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, pos: int, key: Key) -> None:
+        if not self.keys or key >= self.keys[-1]:
+            self.keys.append(key)
+            self.positions.append(pos)
+        else:
+            i = bisect_left(self.keys, key)
+            self.keys.insert(i, key)
+            self.positions.insert(i, pos)
+
+    def bounds(self, *, since: Optional[float] = None, before: Optional[Key] = None) -> tuple[int, int]:
+        """Index range of keys with timestamp >= since and key < before."""
+        lo = bisect_left(self.keys, (since, "")) if since is not None else 0
+        hi = bisect_left(self.keys, before) if before is not None else len(self.keys)
+        return lo, max(lo, hi)
+
+    def page(self, *, since: Optional[float] = None, before: Optional[Key] = None, size: int) -> tuple[list[int], Optional[Key]]:
+        """Positions of the `size` newest keys in the range, newest first, and the oldest key among them."""
+        lo, hi = self.bounds(since=since, before=before)
+        start = max(lo, hi - max(1, size))
+        return self.positions[start:hi][::-1], (self.keys[start] if start < hi else None)
+
+
+_PAGE_MAX = 1024
+
+
+def walk_newest_first(
+    order: KeysetOrder,
+    lock: "threading.Lock | threading.RLock",
+    *,
+    since: Optional[float] = None,
+    before: Optional[Key] = None,
+    page_size: int = 32,
+) -> Iterator[int]:
+    """
+    Positions of `order` newest first, copied under `lock` one page at a time: a
+    caller that stops after a page pays for that page, not for the whole window
+    below the cursor. Each page resumes below the last key returned, so records
+    inserted meanwhile neither shift nor repeat positions.
+    """
+    size = max(1, page_size)
+    while True:
+        with lock:
+            positions, last = order.page(since=since, before=before, size=size)
+        yield from positions
+        if last is None or len(positions) < size:
+            return
+        before = last
+        size = min(size * 2, _PAGE_MAX)
+
+
+class ListKeysetIndex(Generic[T]):
+    """KeysetOrder over one collection list; appended records are picked up on access."""
+
+    def __init__(self, items: list[T], key_of: Callable[[T], Key]):
+        self._items = items
+        self._key_of = key_of
+        self._size = 0
+        self._lock = threading.Lock()
+        self.order = KeysetOrder()
+
+    def extend(self) -> None:
+        with self._lock:
+            for pos in range(self._size, len(self._items)):
+                self.order.add(pos, self._key_of(self._items[pos]))
+            self._size = len(self._items)
+
+    def newest_first(
+        self,
+        *,
+        since: Optional[datetime] = None,
+        before: Optional[Key] = None,
+        limit: int = 32,
+    ) -> Iterator[T]:
+        """Records newest first; `limit` is how many the caller expects to take (the first page copied)."""
+        since_ts = epoch(since) if since is not None else None
+        positions = walk_newest_first(self.order, self._lock, since=since_ts, before=before, page_size=limit)
+        return (self._items[p] for p in positions)
+
+
+def list_keyset_index(name: str, items: list[T], key_of: Callable[[T], Key]) -> ListKeysetIndex[T]:
+    """Keyset index for the collection `name`, kept with the run's loaded collection (see collection_index)."""
+    index = collection_index(name, "keyset", items, lambda items: ListKeysetIndex(items, key_of))
+    index.extend()
+    return index
+
+
+__all__ = [
+    "KeysetOrder",
+    "ListKeysetIndex",
+    "decode_cursor",
+    "encode_cursor",
+    "epoch",
+    "list_keyset_index",
+    "walk_newest_first",
+]
@@ -0,0 +1,184 @@
+"""
+Near-duplicate detection for short backlog texts (improvements, memory records).
+
+Texts are reduced to shingles: character trigrams of the stemmed words (see
+text_search.tokenize), which also match word forms the stemmer leaves apart
+("спамит"/"спамить"). Each record gets a one-permutation MinHash signature (one
+hash per shingle, spread over bins, empty bins filled from their neighbour);
+LSH banding finds candidate pairs without comparing every record with every
+other one, and candidates are confirmed with the exact Jaccard similarity.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import zlib
+from typing import Callable, Generic, Iterable, Optional, TypeVar
+
+from conversation_states.repository import collection_index
+from tool_sets.text_search import tokenize
+
+
+T = TypeVar("T")
+
+_BINS = 64
+_BANDS = 32  # 2 rows per band: pairs with Jaccard ~0.3 already collide in some band
+_ROWS = _BINS // _BANDS
+_SHINGLE = 3
+
+
+def duplicate_threshold() -> float:
+    try:
+        return float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.45"))
+    except ValueError:
+        return 0.45
+
+
+def shingles(text: str) -> frozenset[str]:
+    out: set[str] = set()
+    for term in tokenize(text):
+        padded = f" {term} "
+        out.update(padded[i:i + _SHINGLE] for i in range(max(1, len(padded) - _SHINGLE + 1)))
+    return frozenset(out)
+
+
+def minhash(items: Iterable[str]) -> tuple[int, ...]:
+    bins: list[int] = [-1] * _BINS
+    for item in items:
+        h = (zlib.crc32(item.encode("utf-8")) * 0x9E3779B1) & 0xFFFFFFFF
+        b, v = h % _BINS, h // _BINS
+        if bins[b] < 0 or v < bins[b]:
+            bins[b] = v
+    if all(v < 0 for v in bins):
+        return ()
+    # Densification: an empty bin takes the next filled bin's value, tagged with the distance.
+    out: list[int] = []
+    for i in range(_BINS):
+        d = 0
+        while bins[(i + d) % _BINS] < 0:
+            d += 1
+        out.append(bins[(i + d) % _BINS] * _BINS + d)
+    return tuple(out)
+
+
+def jaccard(a: frozenset[str], b: frozenset[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index over texts keyed by int; exact Jaccard confirms candidates."""
+
+    def __init__(self) -> None:
+        self._shingles: dict[int, frozenset[str]] = {}
+        self._bands: dict[int, list[tuple[int, ...]]] = {}
+        self._buckets: dict[tuple[int, tuple[int, ...]], set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+    @staticmethod
+    def _band_keys(signature: tuple[int, ...]) -> list[tuple[int, ...]]:
+        return [signature[i * _ROWS:(i + 1) * _ROWS] for i in range(_BANDS)] if signature else []
+
+    def add(self, key: int, text: str) -> None:
+        self.discard(key)
+        sh = shingles(text)
+        bands = self._band_keys(minhash(sh))
+        self._shingles[key] = sh
+        self._bands[key] = bands
+        for i, band in enumerate(bands):
+            self._buckets.setdefault((i, band), set()).add(key)
+
+    def discard(self, key: int) -> None:
+        if self._shingles.pop(key, None) is None:
+            return
+        for i, band in enumerate(self._bands.pop(key, ())):
+            bucket = self._buckets.get((i, band))
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[(i, band)]
+
+    def _candidates(self, bands: list[tuple[int, ...]]) -> set[int]:
+        out: set[int] = set()
+        for i, band in enumerate(bands):
+            out |= self._buckets.get((i, band), set())
+        return out
+
+    def similar(self, text: str, threshold: Optional[float] = None) -> list[tuple[int, float]]:
+        """Indexed keys whose text is at least `threshold` similar to `text`, best first."""
+        limit = duplicate_threshold() if threshold is None else threshold
+        sh = shingles(text)
+        hits = [(key, jaccard(sh, self._shingles[key])) for key in self._candidates(self._band_keys(minhash(sh)))]
+        return sorted(((k, round(s, 3)) for k, s in hits if s >= limit), key=lambda kv: (-kv[1], kv[0]))
+
+    def clusters(self, threshold: Optional[float] = None, keys: Optional[Iterable[int]] = None) -> list[list[int]]:
+        """Groups (size >= 2) of indexed keys connected by similar pairs, restricted to `keys` if given."""
+        limit = duplicate_threshold() if threshold is None else threshold
+        allowed = set(self._shingles) if keys is None else set(keys) & set(self._shingles)
+        parent = {k: k for k in allowed}
+
+        def find(k: int) -> int:
+            while parent[k] != k:
+                parent[k] = parent[parent[k]]
+                k = parent[k]
+            return k
+
+        for key in allowed:
+            for other in self._candidates(self._bands[key]):
+                if other <= key or other not in allowed:
+                    continue
+                if jaccard(self._shingles[key], self._shingles[other]) >= limit:
+                    parent[find(other)] = find(key)
+        groups: dict[int, list[int]] = {}
+        for key in sorted(allowed):
+            groups.setdefault(find(key), []).append(key)
+        return [g for g in groups.values() if len(g) > 1]
+
+
+class ListDuplicateIndex(Generic[T]):
+    """NearDuplicateIndex over one collection list by position; appended records are picked up on access."""
+
+    def __init__(self, items: list[T], text_of: Callable[[T], str]):
+        self._items = items
+        self._text_of = text_of
+        self._size = 0
+        self._lock = threading.Lock()
+        self.index = NearDuplicateIndex()
+
+    def _extend(self) -> None:
+        for pos in range(self._size, len(self._items)):
+            self.index.add(pos, self._text_of(self._items[pos]))
+        self._size = len(self._items)
+
+    def similar(self, text: str, threshold: Optional[float] = None) -> list[tuple[T, float]]:
+        with self._lock:
+            self._extend()
+            hits = self.index.similar(text, threshold)
+        return [(self._items[pos], score) for pos, score in hits]
+
+    def clusters(self, threshold: Optional[float] = None, include: Optional[Callable[[T], bool]] = None) -> list[list[T]]:
+        with self._lock:
+            self._extend()
+            keys = None if include is None else [p for p, item in enumerate(self._items) if include(item)]
+            groups = self.index.clusters(threshold, keys)
+        return [[self._items[p] for p in group] for group in groups]
+
+
+def list_duplicate_index(name: str, items: list[T], text_of: Callable[[T], str]) -> ListDuplicateIndex[T]:
+    """Near-duplicate index for the collection `name`, kept with the run's loaded collection (see collection_index)."""
+    return collection_index(name, "duplicates", items, lambda items: ListDuplicateIndex(items, text_of))
+
+
+__all__ = [
+    "ListDuplicateIndex",
+    "NearDuplicateIndex",
+    "duplicate_threshold",
+    "jaccard",
+    "list_duplicate_index",
+    "minhash",
+    "shingles",
+]
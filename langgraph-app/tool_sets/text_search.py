@@ -0,0 +1,228 @@
+"""
+Local ranked full-text search (BM25) over thread collections.
+
+Text is lowercased, split into Russian/English word tokens, stop words are
+dropped and common inflection endings are stripped, so "вакансии"/"вакансия"
+and "articles"/"article" meet in the same posting list. Indexes over a thread
+collection live as long as the run's loaded collection and are extended as
+records are appended. The terms of each record text are kept per thread across
+runs, so a new run assembles its index without tokenizing unchanged records again.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, Iterable, Optional, TypeVar
+
+from conversation_states.repository import collection_index, thread_repository
+
+
+T = TypeVar("T")
+
+_TOKEN_RE = re.compile(r"[0-9a-zа-яё]+")
+
+_STOP_WORDS = frozenset(
+    """
+    a an and are as at be by for from in is it of on or the to with this that
+    и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по
+    только ее мне было вот от меня еще нет о из ему теперь когда даже ну ли если уже
+    или ни быть был него до вас нибудь опять уж вам ведь там потом себя ничего ей может
+    они тут где есть надо ней для мы тебя их чем была сам чтоб без будто чего раз тоже
+    себе под будет ж тогда кто этот того потому этого какой совсем ним здесь этом один
+    почти мой тем чтобы нее были куда зачем всех никогда можно при об про это эти
+    """.split()
+)
+
+# Longest endings first; a stem keeps at least _MIN_STEM characters.
+_RU_ENDINGS = tuple(
+    sorted(
+        """
+        иями ями ами иях ях ием ией ий ый ой ая яя ое ее ые ие ых их ым им ыми ими
+        ого его ому ему ую юю ость ости остью ов ев ей ам ах ом ем ию ия ии
+        ут ют ет ит ешь ишь ете ите ал ял ил ла ли ло а я о е ы и у ю ь
+        """.split(),
+        key=len,
+        reverse=True,
+    )
+)
+_EN_ENDINGS = ("ingly", "ations", "ation", "ness", "ments", "ment", "ings", "ing", "ies", "ied", "ed", "es", "ly", "s")
+_MIN_STEM = 3
+
+
+def _stem(token: str) -> str:
+    if token.isdigit():
+        return token
+    russian = "а" <= token[-1] <= "я"
+    for ending in _RU_ENDINGS if russian else _EN_ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= _MIN_STEM:
+            token = token[: -len(ending)]
+            break
+    # Soft sign / silent e left in front of an ending: "стать|я" vs "стат|ей", "articl|es" vs "article".
+    soft = "ь" if russian else "e"
+    if token.endswith(soft) and len(token) > _MIN_STEM:
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list[str]:
+    """Search terms of a text: stemmed lowercase words without stop words."""
+    words = _TOKEN_RE.findall((text or "").lower().replace("ё", "е"))
+    return [_stem(w) for w in words if w not in _STOP_WORDS and (len(w) > 1 or w.isdigit())]
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring; documents are added/removed by key."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, dict[int, int]] = {}
+        self.lengths: dict[int, int] = {}
+        self._terms: dict[int, set[str]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def add(self, key: int, text: str) -> None:
+        self.add_terms(key, tokenize(text))
+
+    def add_terms(self, key: int, terms: list[str]) -> None:
+        """Add a document already tokenized (see tokenize)."""
+        self.discard(key)
+        self.lengths[key] = len(terms)
+        self._total_length += len(terms)
+        self._terms[key] = set(terms)
+        for term in terms:
+            docs = self.postings.setdefault(term, {})
+            docs[key] = docs.get(key, 0) + 1
+
+    def discard(self, key: int) -> None:
+        length = self.lengths.pop(key, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for term in self._terms.pop(key, ()):
+            docs = self.postings[term]
+            del docs[key]
+            if not docs:
+                del self.postings[term]
+
+    def scores(self, query: str) -> dict[int, float]:
+        """BM25 score of every document containing at least one query term."""
+        n = len(self.lengths)
+        if not n:
+            return {}
+        avg_length = self._total_length / n or 1.0
+        out: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for key, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[key] / avg_length)
+                out[key] = out.get(key, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return out
+
+
+class ListTextIndex(Generic[T]):
+    """
+    BM25 index over one collection list, keyed by position. New list items are
+    indexed on the next search; callers discard positions of deleted records.
+    A replaced list (load, hard delete) or records changed in place get a new index.
+
+    `known` maps texts to their terms from an earlier index; the terms of this
+    index's texts are collected in `terms`.
+    """
+
+    def __init__(
+        self,
+        items: list[T],
+        text_of: Callable[[T], str],
+        skip: Optional[Callable[[T], bool]] = None,
+        known: Optional[dict[str, list[str]]] = None,
+    ):
+        self._items = items
+        self._text_of = text_of
+        self._skip = skip
+        self._known = known or {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.terms: dict[str, list[str]] = {}
+        self.bm25 = BM25Index()
+
+    def _extend(self) -> None:
+        for pos in range(self._size, len(self._items)):
+            item = self._items[pos]
+            if self._skip is None or not self._skip(item):
+                text = self._text_of(item)
+                terms = self.terms.get(text)
+                if terms is None:
+                    terms = self._known.get(text)
+                if terms is None:
+                    terms = tokenize(text)
+                self.terms[text] = terms
+                self.bm25.add_terms(pos, terms)
+        self._size = len(self._items)
+
+    def discard(self, pos: int) -> None:
+        with self._lock:
+            self._extend()
+            self.bm25.discard(pos)
+
+    def search(self, query: str) -> list[tuple[T, float]]:
+        """All matching items with their scores, best first (ties keep list order)."""
+        with self._lock:
+            self._extend()
+            scores = self.bm25.scores(query)
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        return [(self._items[pos], round(score, 4)) for pos, score in ranked]
+
+
+def list_text_index(
+    name: str,
+    items: list[T],
+    text_of: Callable[[T], str],
+    skip: Optional[Callable[[T], bool]] = None,
+) -> ListTextIndex[T]:
+    """
+    Text index for the collection `name`, kept with the run's loaded collection (see
+    collection_index). Building it reuses the terms of the thread's previous index.
+    """
+    repo = thread_repository()
+    if repo is None:
+        return collection_index(name, "text", items, lambda items: ListTextIndex(items, text_of, skip))
+
+    key = (repo.thread_id, name)
+
+    def build(items: list[T]) -> ListTextIndex[T]:
+        with _THREAD_TERMS_LOCK:
+            known = _THREAD_TERMS.get(key)
+        index = ListTextIndex(items, text_of, skip, known=known)
+        with _THREAD_TERMS_LOCK:
+            # The newest index's texts replace the previous ones: terms of deleted or
+            # edited records are dropped with it.
+            _THREAD_TERMS[key] = index.terms
+            _THREAD_TERMS.move_to_end(key)
+            while len(_THREAD_TERMS) > _THREAD_TERMS_SIZE:
+                _THREAD_TERMS.popitem(last=False)
+        return index
+
+    return collection_index(name, "text", items, build)
+
+
+# (thread id, collection) -> text -> terms of the latest index built for it in this process.
+_THREAD_TERMS: "OrderedDict[tuple[str, str], dict[str, list[str]]]" = OrderedDict()
+_THREAD_TERMS_SIZE = 64
+_THREAD_TERMS_LOCK = threading.Lock()
+
+
+def join_text(parts: Iterable[object]) -> str:
+    return " ".join(str(p) for p in parts if p)
+
+
+__all__ = ["BM25Index", "ListTextIndex", "join_text", "list_text_index", "tokenize"]
@@ -0,0 +1,280 @@
+"""
+Engagement-aware trending for highlights.
+
+Every event adds weight * 2^((t - now) / half_life) to a highlight's score: its
+publication, replies to the message it was saved from, reactions, and re-shares
+of the same link. The board keeps log2(sum(weight * 2^(t / half_life))) per
+highlight; decay is the same for everyone, so this value orders highlights at any
+moment and only changes when an event arrives. Entries are stored one per
+highlight, so an event rewrites only the entries it touches. Next to them a
+bounded best-first list per category (TrendingTop) is updated with every
+change, so a query reads that list instead of ranking all entries.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+
+EVENT_KINDS = ("replies", "reactions", "reshares")
+_PUBLISH_WEIGHT = 1.0
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def half_life_hours() -> float:
+    return max(_float_env("TRENDING_HALF_LIFE_HOURS", 48.0), 1.0)
+
+
+def top_size() -> int:
+    return max(int(_float_env("TRENDING_TOP_SIZE", 100)), 1)
+
+
+def event_weights() -> dict[str, float]:
+    return {
+        "replies": _float_env("TRENDING_REPLY_WEIGHT", 2.0),
+        "reactions": _float_env("TRENDING_REACTION_WEIGHT", 1.0),
+        "reshares": _float_env("TRENDING_RESHARE_WEIGHT", 3.0),
+    }
+
+
+def _hours(dt: datetime) -> float:
+    return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp() / 3600.0
+
+
+def _log2_add(a: float, b: float) -> float:
+    if a == -math.inf:
+        return b
+    hi, lo = max(a, b), min(a, b)
+    return hi + math.log2(1.0 + 2.0 ** (lo - hi))
+
+
+class TrendingBoard:
+    """
+    Per-thread trending state: one entry per live highlight with its engagement
+    counters and log score, and lookups by Telegram message id and normalized link.
+
+    A board may hold only the part of the thread an update needs (the entries and
+    lookups it touches). Entries added or changed since the board was built are
+    listed in `changed`, untracked ones in `removed`.
+    """
+
+    def __init__(
+        self,
+        entries: Optional[dict[str, dict[str, Any]]] = None,
+        *,
+        by_message: Optional[dict[str, str]] = None,
+        by_link: Optional[dict[str, str]] = None,
+        half_life: Optional[float] = None,
+    ):
+        self.half_life = float(half_life or half_life_hours())
+        self.entries: dict[str, dict[str, Any]] = {k: dict(v) for k, v in (entries or {}).items()}
+        derived_message: dict[str, str] = {}
+        derived_link: dict[str, str] = {}
+        if by_message is None or by_link is None:
+            # The first tracked highlight owns a link, as with track().
+            for highlight_id, entry in sorted(self.entries.items(), key=lambda kv: kv[1].get("published_h", 0.0)):
+                if entry.get("tg_message_id"):
+                    derived_message[entry["tg_message_id"]] = highlight_id
+                if entry.get("link"):
+                    derived_link.setdefault(entry["link"], highlight_id)
+        self.by_message: dict[str, str] = dict(by_message) if by_message is not None else derived_message
+        self.by_link: dict[str, str] = dict(by_link) if by_link is not None else derived_link
+        self.changed: set[str] = set()
+        self.removed: set[str] = set()
+
+    @classmethod
+    def from_highlights(cls, highlights: Iterable[Any], link_of) -> "TrendingBoard":
+        board = cls()
+        for h in highlights:
+            if getattr(h, "deleted_at", None) is None:
+                board.track(h, link_of(h))
+        return board
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.changed or self.removed)
+
+    def __contains__(self, highlight_id: str) -> bool:
+        return highlight_id in self.entries
+
+    def track(self, highlight: Any, link: Optional[str]) -> None:
+        """Start tracking a new highlight; its publication is the first event."""
+        highlight_id = str(highlight.id)
+        if highlight_id in self.entries:
+            return
+        published = _hours(highlight.published_at)
+        entry: dict[str, Any] = {
+            "category": str(highlight.category),
+            "published_h": round(published, 4),
+            "score": published / self.half_life + math.log2(_PUBLISH_WEIGHT),
+            **{kind: 0 for kind in EVENT_KINDS},
+        }
+        message_id = getattr(highlight, "tg_message_id", None)
+        if message_id:
+            entry["tg_message_id"] = str(message_id)
+            self.by_message[str(message_id)] = highlight_id
+        if link:
+            entry["link"] = link
+            self.by_link.setdefault(link, highlight_id)
+        self.entries[highlight_id] = entry
+        self.changed.add(highlight_id)
+        self.removed.discard(highlight_id)
+
+    def untrack(self, highlight_id: str) -> None:
+        entry = self.entries.pop(str(highlight_id), None)
+        if entry is None:
+            return
+        if self.by_message.get(entry.get("tg_message_id", "")) == highlight_id:
+            del self.by_message[entry["tg_message_id"]]
+        if self.by_link.get(entry.get("link", "")) == highlight_id:
+            del self.by_link[entry["link"]]
+        self.changed.discard(highlight_id)
+        self.removed.add(highlight_id)
+
+    def record(self, highlight_id: str, kind: str, at: datetime, count: int = 1) -> bool:
+        """Add `count` events of `kind` at time `at`."""
+        entry = self.entries.get(highlight_id)
+        if entry is None or kind not in EVENT_KINDS or count <= 0:
+            return False
+        weight = event_weights()[kind] * count
+        if weight <= 0:
+            return False
+        entry[kind] = int(entry.get(kind, 0)) + count
+        entry["score"] = _log2_add(entry["score"], _hours(at) / self.half_life + math.log2(weight))
+        self.changed.add(highlight_id)
+        return True
+
+    def ingest(
+        self,
+        *,
+        at: datetime,
+        message_id: Optional[str] = None,
+        reply_to_message_id: Optional[str] = None,
+        links: Iterable[str] = (),
+    ) -> list[str]:
+        """Count a new chat message as a reply and/or re-share; returns the ids that changed."""
+        changed: list[str] = []
+        target = self.by_message.get(str(reply_to_message_id)) if reply_to_message_id else None
+        if target and self.record(target, "replies", at):
+            changed.append(target)
+        for link in set(links):
+            target = self.by_link.get(link)
+            if not target or target in changed:
+                continue
+            # The message the highlight was saved from is not a re-share of itself.
+            if message_id and self.entries[target].get("tg_message_id") == str(message_id):
+                continue
+            if self.record(target, "reshares", at):
+                changed.append(target)
+        return changed
+
+    def score_at(self, highlight_id: str, now: datetime) -> float:
+        entry = self.entries[highlight_id]
+        return 2.0 ** (entry["score"] - _hours(now) / self.half_life)
+
+    def top(self, *, category: Optional[str] = None, since: Optional[datetime] = None) -> Iterable[str]:
+        """Highlight ids best first, lazily; `since` filters by publication time."""
+        since_h = _hours(since) if since is not None else None
+        pairs = [
+            (entry["score"], highlight_id)
+            for highlight_id, entry in self.entries.items()
+            if (not category or entry["category"] == category) and (since_h is None or entry["published_h"] >= since_h)
+        ]
+        for _, highlight_id in sorted(pairs, reverse=True):
+            yield highlight_id
+
+    def engagement(self, highlight_id: str) -> dict[str, int]:
+        entry = self.entries.get(highlight_id) or {}
+        return {kind: int(entry.get(kind, 0)) for kind in EVENT_KINDS}
+
+
+class TrendingTop:
+    """
+    Best-first (score, highlight id, published_h) lists, one per category and one
+    for all ("" key), each bounded to `capacity`. Every entry left out of a list
+    scores at most the list's last item, so a list's prefix is the true ranking; a
+    list is `complete` while it holds every entry of its category. Scores only grow,
+    so a board's changes are applied in place; a removal shortens the list.
+    """
+
+    def __init__(self, lists: Optional[dict[str, dict[str, Any]]] = None, *, capacity: Optional[int] = None):
+        self.capacity = int(capacity or top_size())
+        self.lists: dict[str, dict[str, Any]] = {
+            category: {"items": [tuple(item) for item in value.get("items") or []], "complete": bool(value.get("complete"))}
+            for category, value in (lists or {}).items()
+        }
+
+    @classmethod
+    def from_dict(cls, value: dict[str, Any]) -> "TrendingTop":
+        return cls(value.get("lists"), capacity=value.get("capacity"))
+
+    @classmethod
+    def from_entries(cls, entries: dict[str, dict[str, Any]], capacity: Optional[int] = None) -> "TrendingTop":
+        top = cls(capacity=capacity)
+        for highlight_id, entry in entries.items():
+            for category in ("", entry["category"]):
+                top._offer(category, highlight_id, entry)
+        return top
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "lists": {
+                category: {"items": [list(item) for item in value["items"]], "complete": value["complete"]}
+                for category, value in self.lists.items()
+            },
+        }
+
+    def _offer(self, category: str, highlight_id: str, entry: dict[str, Any]) -> bool:
+        top = self.lists.setdefault(category, {"items": [], "complete": True})
+        items: list[tuple] = top["items"]
+        kept = [item for item in items if item[1] != highlight_id]
+        listed = len(kept) < len(items)
+        score = float(entry["score"])
+        # An entry outside an incomplete list may only enter above the list's last item.
+        if not listed and not top["complete"] and (not kept or score <= kept[-1][0]):
+            return False
+        item = (score, highlight_id, float(entry.get("published_h", 0.0)))
+        if listed and item in items:
+            return False
+        # Best first, ties as in TrendingBoard.top; lists are short, so re-sorting is cheap.
+        top["items"] = sorted([*kept, item], key=lambda x: (x[0], x[1]), reverse=True)
+        if len(top["items"]) > self.capacity:
+            top["items"].pop()
+            top["complete"] = False
+        return True
+
+    def apply(self, board: "TrendingBoard") -> bool:
+        """Fold the board's changed and removed entries into the lists; True if a list changed."""
+        changed = False
+        for highlight_id in board.removed:
+            for top in self.lists.values():
+                kept = [item for item in top["items"] if item[1] != highlight_id]
+                if len(kept) < len(top["items"]):
+                    top["items"] = kept
+                    changed = True
+        for highlight_id in board.changed:
+            entry = board.entries[highlight_id]
+            for category in ("", entry["category"]):
+                changed = self._offer(category, highlight_id, entry) or changed
+        return changed
+
+    def ranked(self, category: Optional[str] = None) -> tuple[list[tuple], bool]:
+        """(best-first (score, id, published_h) items, whether they are all of the category)."""
+        top = self.lists.get(category or "")
+        if top is None:
+            # Lists are seeded from every entry, so a category without one has none.
+            return [], True
+        return list(top["items"]), top["complete"]
+
+
+__all__ = ["EVENT_KINDS", "TrendingBoard", "TrendingTop", "event_weights", "half_life_hours", "top_size"]
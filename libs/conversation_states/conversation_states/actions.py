@@ -2,8 +2,10 @@ from typing import Literal, Dict
 from pydantic import BaseModel
 from langgraph.types import StreamWriter
 
-ActionType = Literal["image", "gif", "voice", "reaction",
-                     "sticker", "system-message", "system-notification", "restrict", "unrestrict"]
+ActionType = Literal["image", "gif", "voice", "reaction", "sticker", "system-message",
+                     "system-notification", "restrict", "unrestrict", "chat-action"]
+# Telegram chat actions used as placeholders while media is being generated.
+ChatAction = Literal["typing", "upload_photo", "record_voice", "upload_voice"]
 Reaction = Literal[
     "👍", "👎", "❤", "🔥", "🥰", "👏", "😁", "🤔", "🤯", "😱", "🤬", "😢", "🎉", "🤩", "🤮",
     "💩", "🙏", "👌", "🕊", "🤡", "🥱", "🥴", "😍", "🐳", "❤‍🔥", "🌚", "🌭", "💯", "🤣", "⚡",
@@ -58,3 +60,11 @@ class ActionSender:
             value=value
         )
         self.send_action(action)
+
+    def send_chat_action(self, value: ChatAction):
+        """Show a chat action ("typing", "upload_photo", ...) while a reply is prepared."""
+        action = Action(
+            type="chat-action",
+            value=value
+        )
+        self.send_action(action)
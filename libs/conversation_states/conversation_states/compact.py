@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Iterable, Optional
+
+from langchain_core.messages import AnyMessage, BaseMessage
+from pydantic import TypeAdapter
+
+
+# Message metadata that never changes within one thread (one Telegram chat
+# per thread, one bot per deployment). It is stored once in `thread_context`
+# instead of on every message. InternalState re-attaches them to
+# last_external_message on load; readers of other messages use expand_kwargs
+# with state.thread_context.
+THREAD_CONSTANT_KEYS: tuple[str, ...] = (
+    "chat_id",
+    "tg_chat_id",
+    "tg_bot_username",
+    "tg_bot_user_id",
+    "require_intro",
+)
+
+
+def drop_nulls(kwargs: Optional[dict]) -> dict:
+    return {k: v for k, v in (kwargs or {}).items() if v is not None}
+
+
+def split_thread_context(kwargs: Optional[dict]) -> tuple[dict, dict]:
+    """Split message kwargs into (per-message kwargs, thread-level constants)."""
+    message_kwargs: dict = {}
+    thread_context: dict = {}
+    for key, value in drop_nulls(kwargs).items():
+        if key in THREAD_CONSTANT_KEYS:
+            thread_context[key] = value
+        else:
+            message_kwargs[key] = value
+    return message_kwargs, thread_context
+
+
+def compact_kwargs(kwargs: Optional[dict], thread_context: Optional[dict] = None) -> dict:
+    """Drop null keys and keys whose value is already hoisted to the thread."""
+    ctx = thread_context or {}
+    return {
+        k: v
+        for k, v in drop_nulls(kwargs).items()
+        if not (k in THREAD_CONSTANT_KEYS and k in ctx and ctx[k] == v)
+    }
+
+
+def expand_kwargs(kwargs: Optional[dict], thread_context: Optional[dict] = None) -> dict:
+    """Re-attach thread-level constants; values present on the message win."""
+    out = dict(kwargs or {})
+    for key in THREAD_CONSTANT_KEYS:
+        if key not in out and key in (thread_context or {}):
+            out[key] = thread_context[key]
+    return out
+
+
+def expand_message(msg: Any, thread_context: Optional[dict] = None) -> Any:
+    """Return a copy of `msg` with thread constants restored (no-op when nothing is missing)."""
+    if not isinstance(msg, BaseMessage) or not thread_context:
+        return msg
+    current = getattr(msg, "additional_kwargs", None) or {}
+    expanded = expand_kwargs(current, thread_context)
+    if len(expanded) == len(current):
+        return msg
+    return msg.model_copy(update={"additional_kwargs": expanded})
+
+
+def _json_size(value: Any) -> int:
+    return len(json.dumps(value, ensure_ascii=False, default=str, separators=(",", ":")).encode("utf-8"))
+
+
+def _dump_messages(messages: Iterable[Any]) -> list:
+    return [m.model_dump() if isinstance(m, BaseMessage) else m for m in messages]
+
+
+def size_report(values: dict) -> dict:
+    """
+    Compare checkpoint size of exported thread values (as returned by
+    `GET /threads/{id}/state` -> `values`) before and after compaction.
+    """
+    adapter = TypeAdapter(AnyMessage)
+    message_fields = [f for f in ("messages", "external_messages") if values.get(f)]
+    ctx = dict(values.get("thread_context") or {})
+
+    compact_values = dict(values)
+    before_msgs = 0
+    after_msgs = 0
+    count = 0
+    for field in message_fields:
+        msgs = [m if isinstance(m, BaseMessage) else adapter.validate_python(m) for m in values[field]]
+        for m in msgs:
+            _, found = split_thread_context(m.additional_kwargs)
+            for key, value in found.items():
+                ctx.setdefault(key, value)
+        compacted = [
+            m.model_copy(update={"additional_kwargs": compact_kwargs(m.additional_kwargs, ctx)})
+            for m in msgs
+        ]
+        before_msgs += _json_size(_dump_messages(msgs))
+        after_msgs += _json_size(_dump_messages(compacted))
+        count += len(msgs)
+        compact_values[field] = _dump_messages(compacted)
+    compact_values["thread_context"] = ctx
+
+    per = max(count, 1)
+    return {
+        "message_count": count,
+        "bytes_per_message_before": round(before_msgs / per, 1),
+        "bytes_per_message_after": round(after_msgs / per, 1),
+        "checkpoint_bytes_before": _json_size(
+            {k: (_dump_messages(v) if k in message_fields else v) for k, v in values.items()}
+        ),
+        "checkpoint_bytes_after": _json_size(compact_values),
+    }
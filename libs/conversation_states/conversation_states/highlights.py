@@ -24,6 +24,7 @@ class Highlight(BaseModel):
     message_text: str
     author_username: str
     author_telegram_id: Optional[int] = None
+    tg_message_id: Optional[str] = None  # Telegram message the highlight was saved from
     published_at: datetime
     expires_at: Optional[datetime] = None
     deleted_at: Optional[datetime] = None
@@ -1,7 +1,18 @@
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict
 from pydantic import BaseModel, Field
 
 
+# Days kept in Human.daily_activity (UTC dates).
+ACTIVITY_HISTOGRAM_DAYS = 30
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
 class Human(BaseModel):
     username: str
     first_name: str
@@ -14,6 +25,83 @@ class Human(BaseModel):
     telegram_id: Optional[int] = None  # Telegram user ID for permissions
     messages_without_intro: int = 0  # Count messages sent without intro
     intro_message: Optional[str] = None  # Link to Telegram intro message (e.g., t.me link)
+    # Activity aggregates, updated incrementally at ingest (see record_message).
+    first_seen_at: Optional[datetime] = None
+    last_seen_at: Optional[datetime] = None
+    message_count: int = 0
+    has_intro_message_at: Optional[datetime] = None
+    intro_message_id: Optional[str] = None  # Telegram message id of the earliest #intro
+    daily_activity: Dict[str, int] = Field(default_factory=dict)  # "YYYY-MM-DD" (UTC) -> messages
+    last_counted_message_id: Optional[str] = None  # Re-runs and edits of this message are not counted again
+
+    def record_message(
+        self,
+        at: datetime,
+        text: str = "",
+        message_id: Optional[str] = None,
+        link: Optional[str] = None,
+    ) -> None:
+        """Account one message sent by this user at `at`; a repeat of the last counted message only updates the intro."""
+        at = _as_utc(at)
+        if message_id is not None and str(message_id) == self.last_counted_message_id:
+            if "#intro" in (text or "").lower():
+                self.record_intro(at, message_id, link)
+            return
+        if message_id is not None:
+            self.last_counted_message_id = str(message_id)
+        if self.first_seen_at is None or at < _as_utc(self.first_seen_at):
+            self.first_seen_at = at
+        if self.last_seen_at is None or at > _as_utc(self.last_seen_at):
+            self.last_seen_at = at
+        self.message_count += 1
+        if "#intro" in (text or "").lower():
+            self.record_intro(at, message_id, link)
+
+        day = at.date().isoformat()
+        self.daily_activity[day] = int(self.daily_activity.get(day, 0)) + 1
+        self._prune_activity()
+
+    def record_intro(self, at: datetime, message_id: Optional[str] = None, link: Optional[str] = None) -> bool:
+        """Remember the earliest #intro message; returns True if it changed."""
+        at = _as_utc(at)
+        current = _as_utc(self.has_intro_message_at)
+        if current is not None and (at > current or (at == current and (self.intro_message_id or message_id is None))):
+            # Later intro, or the same one already recorded (aggregates that predate ids get the id filled in).
+            return False
+        self.has_intro_message_at = at
+        self.intro_message_id = str(message_id) if message_id is not None else None
+        # Never replace a link set by an admin.
+        if link and not self.intro_message:
+            self.intro_message = link
+        return True
+
+    def merge_activity(self, other: "Human") -> None:
+        """Merge aggregates from another snapshot of the same user (monotone, idempotent)."""
+        first = _as_utc(other.first_seen_at)
+        if first is not None and (self.first_seen_at is None or first < _as_utc(self.first_seen_at)):
+            self.first_seen_at = first
+        last = _as_utc(other.last_seen_at)
+        if last is not None and (self.last_seen_at is None or last > _as_utc(self.last_seen_at)):
+            self.last_seen_at = last
+        if other.message_count > self.message_count and other.last_counted_message_id:
+            self.last_counted_message_id = other.last_counted_message_id
+        self.message_count = max(self.message_count, other.message_count)
+        intro_at = _as_utc(other.has_intro_message_at)
+        if intro_at is not None and (self.has_intro_message_at is None or intro_at < _as_utc(self.has_intro_message_at)):
+            self.has_intro_message_at = intro_at
+            self.intro_message_id = other.intro_message_id
+        elif intro_at is not None and intro_at == _as_utc(self.has_intro_message_at) and not self.intro_message_id:
+            self.intro_message_id = other.intro_message_id
+        for day, count in (other.daily_activity or {}).items():
+            self.daily_activity[day] = max(int(self.daily_activity.get(day, 0)), int(count))
+        self._prune_activity()
+
+    def _prune_activity(self) -> None:
+        if self.last_seen_at is None:
+            return
+        cutoff = (_as_utc(self.last_seen_at) - timedelta(days=ACTIVITY_HISTOGRAM_DAYS - 1)).date().isoformat()
+        for day in [d for d in self.daily_activity if d < cutoff]:
+            del self.daily_activity[day]
 
     def update_info(self, updates: dict[str, str] | list[dict[str, str]]) -> None:
         if isinstance(updates, dict):
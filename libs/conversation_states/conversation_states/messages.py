@@ -1,3 +1,6 @@
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from datetime import datetime, timezone
 from typing import Literal, Optional, List, Union
 from pydantic import BaseModel
 from langchain_core.messages import (
@@ -10,8 +13,8 @@ from langchain_core.messages import (
     trim_messages,
     RemoveMessage
 )
-import tiktoken
 from .humans import Human
+from .utils.derived import owned_cache
 
 
 CountType = Union[int, Literal["all"], None]
@@ -19,8 +22,16 @@ CountType = Union[int, Literal["all"], None]
 RoleLiteral = Literal["human", "ai", "tool", "system", "unknown"]
 
 
+@lru_cache(maxsize=1)
+def _tokenizer():
+    # tiktoken is imported (and its encoding loaded) on the first count, not with the graphs.
+    import tiktoken
+
+    return tiktoken.encoding_for_model("gpt-4")
+
+
 def count_tokens(msg) -> int:
-    tokenizer = tiktoken.encoding_for_model("gpt-4")
+    tokenizer = _tokenizer()
     content = getattr(msg, "content", "")
     if not isinstance(content, str):
         content = str(content)
@@ -43,6 +54,79 @@ def get_role(msg: BaseMessage) -> RoleLiteral:
     return "unknown"
 
 
+def message_timestamp(msg) -> Optional[datetime]:
+    """Telegram send time stored in message kwargs (tg_date), as aware UTC datetime."""
+    raw = (getattr(msg, "additional_kwargs", None) or {}).get("tg_date")
+    if isinstance(raw, datetime):
+        return raw if raw.tzinfo else raw.replace(tzinfo=timezone.utc)
+    if isinstance(raw, str) and raw.strip():
+        try:
+            dt = datetime.fromisoformat(raw.strip())
+        except ValueError:
+            return None
+        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    return None
+
+
+def message_ref(msg) -> tuple[Optional[str], Optional[str]]:
+    """(tg_message_id, tg_link) of a message, ids as strings."""
+    kwargs = getattr(msg, "additional_kwargs", None) or {}
+    message_id = kwargs.get("tg_message_id")
+    link = kwargs.get("tg_link")
+    return (
+        str(message_id) if message_id is not None else None,
+        str(link) if link else None,
+    )
+
+
+class MessageTimeIndex:
+    """
+    Messages ordered by Telegram send time: parsed epoch timestamps in a sorted
+    array next to message positions. Messages without tg_date are not indexed.
+    Appended messages are indexed on the next access.
+    """
+
+    def __init__(self, messages: List[BaseMessage]):
+        entries: list[tuple[float, int]] = []
+        for pos, msg in enumerate(messages):
+            at = message_timestamp(msg)
+            if at is not None:
+                entries.append((at.timestamp(), pos))
+        entries.sort()
+        self._messages = messages
+        self._size = len(messages)
+        self.epochs: list[float] = [e for e, _ in entries]
+        self.positions: list[int] = [p for _, p in entries]
+
+    def extend(self) -> None:
+        for pos in range(self._size, len(self._messages)):
+            at = message_timestamp(self._messages[pos])
+            if at is None:
+                continue
+            epoch = at.timestamp()
+            i = bisect_right(self.epochs, epoch)
+            self.epochs.insert(i, epoch)
+            self.positions.insert(i, pos)
+        self._size = len(self._messages)
+
+    def window(
+        self,
+        since: datetime,
+        until: datetime,
+        role: Optional[RoleLiteral] = None,
+    ) -> list[tuple[datetime, BaseMessage]]:
+        """(timestamp, message) pairs with since <= timestamp <= until, oldest first."""
+        lo = bisect_left(self.epochs, since.timestamp())
+        hi = bisect_right(self.epochs, until.timestamp())
+        out: list[tuple[datetime, BaseMessage]] = []
+        for epoch, pos in zip(self.epochs[lo:hi], self.positions[lo:hi]):
+            msg = self._messages[pos]
+            if role is not None and get_role(msg) != role:
+                continue
+            out.append((datetime.fromtimestamp(epoch, tz=timezone.utc), msg))
+        return out
+
+
 class MessageAPI:
     def __init__(self, state: BaseModel, field_name: str):
         self._state = state
@@ -157,6 +241,21 @@ class MessageAPI:
         )
         return trimmed_first + trimmed_last
 
+    def time_index(self) -> MessageTimeIndex:
+        """Time index over the messages, kept by the state while the list is the same object."""
+        items = self.items
+        index = owned_cache(self._state).get(f"{self._field_name}:time", items, MessageTimeIndex, source=self._field_name)
+        index.extend()
+        return index
+
+    def window(
+        self,
+        since: datetime,
+        until: datetime,
+        role: Optional[RoleLiteral] = None,
+    ) -> list[tuple[datetime, BaseMessage]]:
+        return self.time_index().window(since, until, role=role)
+
     def sender(self, users) -> Optional[Human]:
         [last_human] = self.last(role="human")
         if not last_human or not hasattr(last_human, "name"):
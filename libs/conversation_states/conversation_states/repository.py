@@ -0,0 +1,421 @@
+from __future__ import annotations
+
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
+
+from langgraph.config import get_config, get_store
+from langgraph.store.base import BaseStore, GetOp
+
+from .highlights import Highlight
+from .improvements import Improvement
+from .memory import MemoryRecord
+from .utils.derived import DerivedCache
+from .utils.reducers import ClearedCollection
+
+
+# Thread collections kept in the LangGraph store instead of checkpoints.
+COLLECTIONS: dict[str, type] = {
+    "highlights": Highlight,
+    "memory_records": MemoryRecord,
+    "improvements": Improvement,
+}
+_ORDER_BY = {
+    "highlights": "published_at",
+    "memory_records": "created_at",
+    "improvements": "created_at",
+}
+# Per-thread namespaces of small keyed items that are not collections (trending entries and their lookups).
+AUX_NAMESPACES = ("trending", "trending_refs")
+_META_NAMESPACE = "meta"
+_META_KEY = "collections"
+TRENDING_DOCUMENT = "trending"
+SEQUENCES_DOCUMENT = "sequences"
+USAGE_DOCUMENT = "llm_usage"
+_PAGE_SIZE = 500
+
+# Sequence, ring and trending updates are read-modify-write on store items; serialize them per thread.
+_DOCUMENT_LOCKS: dict[str, threading.Lock] = {}
+_DOCUMENT_LOCKS_GUARD = threading.Lock()
+
+
+def _document_lock(thread_id: str) -> threading.Lock:
+    with _DOCUMENT_LOCKS_GUARD:
+        return _DOCUMENT_LOCKS.setdefault(thread_id, threading.Lock())
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _sort_key(item: Any, field: str) -> datetime:
+    value = getattr(item, field, None)
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return datetime.min.replace(tzinfo=timezone.utc)
+
+
+class ThreadRepository:
+    """
+    Highlights, memory records and improvements of one thread, stored as items under
+    ("threads", <thread_id>, <collection>) with the record id as key.
+
+    One repository serves a whole graph run (see thread_repository): a collection
+    is loaded from the store once and the same working list is handed to every
+    node and tool call of the run; `sync` writes back only records that changed
+    since they were loaded.
+    """
+
+    def __init__(self, store: BaseStore, thread_id: str):
+        self.store = store
+        self.thread_id = str(thread_id)
+        self._snapshots: dict[str, dict[str, dict]] = {}
+        self._collections: dict[str, list] = {}
+        self._open_scopes: dict[int, int] = {}
+        self._migrated = False
+        self._store_backed = False
+        self._derived = DerivedCache()
+        self._lock = threading.RLock()
+
+    def namespace(self, kind: str) -> tuple[str, ...]:
+        if kind not in COLLECTIONS and kind not in AUX_NAMESPACES and kind != _META_NAMESPACE:
+            raise ValueError(f"unknown collection: {kind}")
+        return ("threads", self.thread_id, kind)
+
+    def _search_all(self, kind: str) -> dict[str, dict]:
+        out: dict[str, dict] = {}
+        offset = 0
+        while True:
+            page = self.store.search(self.namespace(kind), limit=_PAGE_SIZE, offset=offset)
+            for item in page:
+                out[item.key] = dict(item.value)
+            if len(page) < _PAGE_SIZE:
+                return out
+            offset += len(page)
+
+    def is_loaded(self, kind: str) -> bool:
+        return kind in self._collections
+
+    def load(self, kind: str) -> list:
+        """Fresh list of the stored records of `kind`, oldest first."""
+        model = COLLECTIONS[kind]
+        snapshot = self._search_all(kind)
+        self._snapshots[kind] = snapshot
+        items = []
+        for value in snapshot.values():
+            try:
+                items.append(model(**value))
+            except Exception:
+                continue
+        items.sort(key=lambda x: _sort_key(x, _ORDER_BY[kind]))
+        return items
+
+    def collection(self, kind: str) -> list:
+        """Working list of `kind` for this run, loaded from the store on first use."""
+        items = self._collections.get(kind)
+        if items is None:
+            loaded = self.load(kind)
+            with self._lock:
+                items = self._collections.setdefault(kind, loaded)
+        return items
+
+    def sync(self, kind: str, items: list) -> int:
+        """Persist changed records; records missing from `items` are deleted only if the collection was loaded."""
+        model = COLLECTIONS[kind]
+        namespace = self.namespace(kind)
+        with self._lock:
+            previous = self._snapshots.get(kind)
+            current: dict[str, dict] = {}
+            for item in items or []:
+                record = item if isinstance(item, model) else model(**item)
+                current[record.id] = record.model_dump(mode="json")
+
+            changed = 0
+            rewritten = False
+            for key, value in current.items():
+                if previous is None or previous.get(key) != value:
+                    self.store.put(namespace, key, value)
+                    changed += 1
+                    rewritten = rewritten or (previous is not None and key in previous)
+            if previous is not None:
+                for key in previous.keys() - current.keys():
+                    self.store.delete(namespace, key)
+                    changed += 1
+                    rewritten = True
+                self._snapshots[kind] = current
+            if changed:
+                self._mark_store_backed()
+            if rewritten:
+                # Records changed in place; indexes over the working list are stale.
+                self._derived.invalidate(kind)
+            if kind in self._collections and isinstance(items, list) and not isinstance(items, ClearedCollection):
+                # A tool may replace the list (hard delete); later calls of the run get the new one.
+                self._collections[kind] = items
+        return changed
+
+    def _mark_store_backed(self) -> None:
+        """
+        Record in the meta that the thread keeps its collections in the store. Threads
+        created empty never migrate, so readers (the admin panel) cannot rely on migrated_at.
+        """
+        if self._store_backed:
+            return
+        self._store_backed = True
+        meta = self.meta()
+        if not meta.get("migrated_at") and not meta.get("store_backed_at"):
+            self.update_meta(store_backed_at=_utc_now().isoformat())
+
+    def derived(self, kind: str, name: str, items: list, build: Callable[[list], Any]) -> Any:
+        """Index `name` over the working list of `kind`, built once and kept until records change in place."""
+        return self._derived.get(f"{kind}:{name}", items, build, source=kind)
+
+    def find(self, kind: str, filter: dict[str, Any], limit: int = 10) -> list[dict]:
+        """Stored records of `kind` whose fields equal `filter` (read from the store, not the working list)."""
+        return [dict(item.value) for item in self.store.search(self.namespace(kind), filter=filter, limit=limit)]
+
+    def meta(self) -> dict:
+        item = self.store.get(self.namespace(_META_NAMESPACE), _META_KEY)
+        return dict(item.value) if item else {}
+
+    def update_meta(self, **fields: Any) -> dict:
+        value = {**self.meta(), **fields}
+        self.store.put(self.namespace(_META_NAMESPACE), _META_KEY, value)
+        return value
+
+    def document(self, key: str) -> Optional[dict]:
+        """Auxiliary per-thread document (e.g. derived indexes) stored next to the meta."""
+        if key == _META_KEY:
+            raise ValueError("use meta() for collection meta")
+        item = self.store.get(self.namespace(_META_NAMESPACE), key)
+        return dict(item.value) if item else None
+
+    def put_document(self, key: str, value: dict) -> None:
+        if key == _META_KEY:
+            raise ValueError("use update_meta() for collection meta")
+        self.store.put(self.namespace(_META_NAMESPACE), key, value)
+
+    def document_lock(self) -> threading.Lock:
+        """Per-thread lock for read-modify-write of documents and auxiliary items."""
+        return _document_lock(self.thread_id)
+
+    def get_items(self, kind: str, keys: Iterable[str]) -> dict[str, dict]:
+        """Values of the existing `keys` of an auxiliary namespace, fetched in one batch."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        namespace = self.namespace(kind)
+        items = self.store.batch([GetOp(namespace, key) for key in keys])
+        return {key: dict(item.value) for key, item in zip(keys, items) if item is not None}
+
+    def all_items(self, kind: str) -> dict[str, dict]:
+        return self._search_all(kind)
+
+    def put_item(self, kind: str, key: str, value: dict) -> None:
+        self.store.put(self.namespace(kind), key, value)
+
+    def delete_item(self, kind: str, key: str) -> None:
+        self.store.delete(self.namespace(kind), key)
+
+    def allocate(self, name: str, count: int = 1, *, floor: Union[int, Callable[[], int]] = 0) -> int:
+        """
+        Reserve `count` consecutive values of the per-thread sequence `name` and return
+        the first one. A sequence that does not exist yet starts after `floor`
+        (called only then, so a scan for the current maximum runs once per thread).
+
+        The read-modify-write is serialized by a process-local lock only: the store has
+        no conditional write, so two server workers or replicas allocating for the same
+        thread at the same moment can get the same values. Callers that need unique
+        numbers check the stored records afterwards (see find) and repair collisions.
+        """
+        count = max(1, int(count))
+        with _document_lock(self.thread_id):
+            sequences = self.document(SEQUENCES_DOCUMENT) or {}
+            current = sequences.get(name)
+            if current is None:
+                current = floor() if callable(floor) else floor
+            first = int(current) + 1
+            sequences[name] = int(current) + count
+            self.put_document(SEQUENCES_DOCUMENT, sequences)
+        return first
+
+    def raise_sequence(self, name: str, value: int) -> int:
+        """Move the sequence forward to at least `value` (never back); returns its current value."""
+        with _document_lock(self.thread_id):
+            sequences = self.document(SEQUENCES_DOCUMENT) or {}
+            current = max(int(sequences.get(name) or 0), int(value))
+            if sequences.get(name) != current:
+                sequences[name] = current
+                self.put_document(SEQUENCES_DOCUMENT, sequences)
+        return current
+
+    def append_ring(self, key: str, entries: list[dict], capacity: int) -> None:
+        """Append to the bounded list document `key` ({"entries": [...]}), dropping the oldest entries."""
+        if not entries:
+            return
+        with _document_lock(self.thread_id):
+            doc = self.document(key) or {}
+            kept = (list(doc.get("entries") or []) + list(entries))[-max(1, int(capacity)):]
+            self.put_document(key, {**doc, "entries": kept})
+
+    def migrate_from_state(self, state: Any) -> bool:
+        """
+        One-shot copy of collections still held in checkpoint state into the store.
+        Records already present in the store win. Returns True if the migration ran.
+        A state without records costs no store access.
+        """
+        with self._lock:
+            if self._migrated:
+                return False
+            legacy = {
+                kind: list(items)
+                for kind in COLLECTIONS
+                if (items := getattr(state, kind, None)) and items is not self._collections.get(kind)
+            }
+            if not legacy:
+                return False
+            self._migrated = True
+            if self.meta().get("migrated_at"):
+                return False
+            counts: dict[str, int] = {}
+            for kind, items in legacy.items():
+                model = COLLECTIONS[kind]
+                existing = self._search_all(kind)
+                added = 0
+                for item in items:
+                    record = item if isinstance(item, model) else model(**item)
+                    if record.id in existing:
+                        continue
+                    self.store.put(self.namespace(kind), record.id, record.model_dump(mode="json"))
+                    added += 1
+                counts[kind] = added
+                self._snapshots.pop(kind, None)
+                self._collections.pop(kind, None)
+            self.update_meta(migrated_at=_utc_now().isoformat(), migrated_counts=counts)
+            return True
+
+    def cleared_channels(self, state: Any) -> dict:
+        """
+        Updates that empty the checkpoint channels still holding legacy collections,
+        migrating them to the store first. {} when there is nothing to clear.
+        """
+        self.migrate_from_state(state)
+        if not self._migrated:
+            return {}
+        return {kind: ClearedCollection() for kind in COLLECTIONS if getattr(state, kind, None)}
+
+    def hydrate(self, state: Any, *kinds: str) -> None:
+        """Put the run's working lists of `kinds` into the state."""
+        if kinds:
+            self.migrate_from_state(state)
+        for kind in kinds:
+            setattr(state, kind, self.collection(kind))
+
+    def open(self, state: Any, *kinds: str) -> None:
+        """Hydrate `kinds` and keep the collections in the state until the matching close()."""
+        with self._lock:
+            self._open_scopes[id(state)] = self._open_scopes.get(id(state), 0) + 1
+        self.hydrate(state, *kinds)
+
+    def close(self, state: Any) -> None:
+        """Persist changes; the last open scope on the state also clears the collections from it."""
+        with self._lock:
+            left = self._open_scopes.get(id(state), 1) - 1
+            if left > 0:
+                self._open_scopes[id(state)] = left
+            else:
+                self._open_scopes.pop(id(state), None)
+        if left > 0:
+            self.persist(state)
+        else:
+            self.flush(state)
+
+    def persist(self, state: Any) -> None:
+        """Write back changes of the loaded collections held in the state."""
+        for kind in list(self._collections):
+            items = getattr(state, kind, None)
+            if isinstance(items, list) and not isinstance(items, ClearedCollection):
+                self.sync(kind, items)
+
+    def flush(self, state: Any) -> None:
+        """
+        Persist loaded collections and reset them in the state, so node output
+        neither rewrites nor keeps the legacy checkpoint channels.
+        """
+        self.persist(state)
+        for kind in COLLECTIONS:
+            if kind in self._collections or (self._migrated and getattr(state, kind, None)):
+                setattr(state, kind, ClearedCollection())
+
+
+# One repository per graph run. The LRU keeps idle repositories (between nodes) for
+# reuse; a repository some node or tool call still holds stays reachable through the
+# weak map, so a busy process never replaces the repository of a run in progress.
+_RUN_REPOSITORIES: "OrderedDict[tuple[str, str], ThreadRepository]" = OrderedDict()
+_LIVE_REPOSITORIES: "weakref.WeakValueDictionary[tuple[str, str], ThreadRepository]" = weakref.WeakValueDictionary()
+_RUN_REPOSITORIES_SIZE = 32
+_RUN_REPOSITORIES_LOCK = threading.Lock()
+
+
+def _run_id(config: dict) -> Optional[str]:
+    # Set by the LangGraph server for every run (and by callers that pass one).
+    run_id = (config.get("configurable") or {}).get("run_id") or (config.get("metadata") or {}).get("run_id")
+    return str(run_id) if run_id else None
+
+
+def thread_repository() -> Optional[ThreadRepository]:
+    """
+    Repository for the current graph run, or None when no store is configured.
+    Without a run id (plain local invoke) every call gets a fresh repository.
+    """
+    try:
+        config = get_config()
+        store = get_store()
+    except (RuntimeError, KeyError, AttributeError):
+        return None
+    thread_id = (config.get("configurable") or {}).get("thread_id")
+    if store is None or not thread_id:
+        return None
+    run_id = _run_id(config)
+    if run_id is None:
+        return ThreadRepository(store, str(thread_id))
+    key = (str(thread_id), run_id)
+    with _RUN_REPOSITORIES_LOCK:
+        repo = _RUN_REPOSITORIES.get(key) or _LIVE_REPOSITORIES.get(key)
+        if repo is None or repo.store is not store:
+            repo = _LIVE_REPOSITORIES[key] = ThreadRepository(store, str(thread_id))
+        _RUN_REPOSITORIES[key] = repo
+        _RUN_REPOSITORIES.move_to_end(key)
+        while len(_RUN_REPOSITORIES) > _RUN_REPOSITORIES_SIZE:
+            # Only drops the cache reference; a repository in use lives on in _LIVE_REPOSITORIES.
+            _RUN_REPOSITORIES.popitem(last=False)
+        return repo
+
+
+def collection_index(kind: str, name: str, items: list, build: Callable[[list], Any]) -> Any:
+    """
+    Index derived from a thread collection list. While `items` is the working list of
+    the run's repository the index is kept with it; otherwise it is built per call.
+    """
+    repo = thread_repository()
+    if repo is not None and repo.is_loaded(kind) and repo.collection(kind) is items:
+        return repo.derived(kind, name, items, build)
+    return build(items)
+
+
+@contextmanager
+def thread_collections(state: Any, *kinds: str) -> Iterator[Optional[ThreadRepository]]:
+    """
+    Load `kinds` into the state for the duration of a tool call and persist changes
+    on exit. Without a store the state lists are used as-is (legacy checkpoint mode).
+    """
+    repo = thread_repository()
+    if repo is not None:
+        repo.open(state, *kinds)
+    try:
+        yield repo
+    finally:
+        if repo is not None:
+            repo.close(state)
@@ -1,4 +1,5 @@
 from __future__ import annotations
+from datetime import datetime, timezone
 from typing import List, Optional, Annotated
 from pydantic import BaseModel, Field, model_validator
 from pydantic.type_adapter import TypeAdapter
@@ -8,8 +9,16 @@ from .humans import Human
 from .highlights import Highlight
 from .improvements import Improvement
 from .memory import MemoryRecord
-from .messages import MessageAPI, count_tokens
-from .utils.reducers import add_user, add_memory_records, add_highlights, add_improvements, manage_state
+from .messages import MessageAPI, count_tokens, message_ref, message_timestamp
+from .compact import expand_message
+from .utils.reducers import (
+    add_user,
+    add_memory_records,
+    add_highlights,
+    add_improvements,
+    manage_state,
+    merge_thread_context,
+)
 
 
 class InternalState(BaseModel):
@@ -21,10 +30,14 @@ class InternalState(BaseModel):
     users: Annotated[list[Human], add_user] = Field(default_factory=list)
     last_sender: Human
     summary: str = ""
+    # Legacy checkpoint copies / per-node working sets. Live data is kept in the
+    # LangGraph store (see repository.ThreadRepository) when one is configured.
     memory_records: Annotated[list[MemoryRecord], add_memory_records] = Field(default_factory=list)
     highlights: Annotated[list[Highlight], add_highlights] = Field(default_factory=list)
     improvements: Annotated[list[Improvement], add_improvements] = Field(default_factory=list)
     thread_info_entries: list[str] = Field(default_factory=list)
+    # Thread-constant message metadata (chat id, bot identity, ...) hoisted off every message.
+    thread_context: Annotated[dict, merge_thread_context] = Field(default_factory=dict)
     # Ephemeral routing helper (not persisted to checkpoints).
     chat_manager_decision: Optional[dict] = Field(default=None, exclude=True)
     # Ephemeral trigger for supervisor routing (mention, link, etc.).
@@ -62,10 +75,8 @@ class InternalState(BaseModel):
             external_messages=external.messages,
             last_external_message=last_message,
             last_sender=sender,
-            memory_records=list(external.memory_records or []),
-            highlights=list(external.highlights or []),
-            improvements=list(external.improvements or []),
             thread_info_entries=list(getattr(external, "thread_info_entries", []) or []),
+            thread_context=dict(getattr(external, "thread_context", {}) or {}),
             chat_manager_response_stats=dict(getattr(external, "chat_manager_response_stats", {}) or {}),
         )
 
@@ -78,6 +89,12 @@ class InternalState(BaseModel):
                     TypeAdapter(AnyMessage).validate_python(m)
                     for m in values[field]
                 ]
+        if values.get("last_external_message") is not None:
+            # Messages are stored compact; restore hoisted thread constants for readers.
+            values["last_external_message"] = expand_message(
+                TypeAdapter(AnyMessage).validate_python(values["last_external_message"]),
+                values.get("thread_context"),
+            )
         if "memory_records" in values and values["memory_records"] is not None:
             values["memory_records"] = [
                 r if isinstance(r, MemoryRecord) else MemoryRecord(**r)
@@ -110,10 +127,12 @@ class ExternalState(BaseModel):
     summary: str = ""
     last_reasoning: Annotated[Optional[list[AnyMessage]],
                               manage_state] = Field(default=None)
+    # Legacy checkpoint copies; see repository.ThreadRepository.
     memory_records: Annotated[list[MemoryRecord], add_memory_records] = Field(default_factory=list)
     highlights: Annotated[list[Highlight], add_highlights] = Field(default_factory=list)
     improvements: Annotated[list[Improvement], add_improvements] = Field(default_factory=list)
     thread_info_entries: list[str] = Field(default_factory=list)
+    thread_context: Annotated[dict, merge_thread_context] = Field(default_factory=dict)
     chat_manager_response_stats: dict = Field(default_factory=dict)
     # Ephemeral routing helper for graph_dispatcher (not persisted to checkpoints).
     dispatch_target: Optional[str] = Field(default=None, exclude=True)
@@ -126,6 +145,50 @@ class ExternalState(BaseModel):
     def messages_api(self) -> MessageAPI:
         return MessageAPI(self, "messages")
 
+    def record_sender_activity(self) -> Optional[Human]:
+        """
+        Update activity aggregates of the sender of the last message. Users without
+        aggregates yet are backfilled once from the stored history.
+        """
+        sender = self.messages_api.sender(self.users)
+        if sender is None:
+            return None
+        [last_message] = self.messages_api.last(role="human")
+        if sender.first_seen_at is None:
+            for m in self.messages:
+                if m is last_message:
+                    continue
+                if getattr(m, "type", None) == "human" and getattr(m, "name", None) == sender.username:
+                    at = message_timestamp(m)
+                    if at is not None:
+                        sender.record_message(at, str(getattr(m, "content", "") or ""), *message_ref(m))
+        sender.record_message(
+            message_timestamp(last_message) or datetime.now(timezone.utc),
+            str(getattr(last_message, "content", "") or ""),
+            *message_ref(last_message),
+        )
+        return sender
+
+    def backfill_intro_status(self) -> list[Human]:
+        """
+        One pass over the history that records the earliest #intro message of every
+        user (see Human.record_intro). Returns the users that changed.
+        """
+        by_username = {u.username: u for u in self.users}
+        changed: dict[str, Human] = {}
+        for m in self.messages:
+            if getattr(m, "type", None) != "human":
+                continue
+            user = by_username.get(getattr(m, "name", None) or "")
+            if user is None or "#intro" not in str(getattr(m, "content", "") or "").lower():
+                continue
+            at = message_timestamp(m)
+            if at is None:
+                continue
+            if user.record_intro(at, *message_ref(m)):
+                changed[user.username] = user
+        return list(changed.values())
+
     @classmethod
     def from_internal(cls, internal: "InternalState", assistant_message: "AIMessage") -> "ExternalState":
         return cls(
@@ -133,10 +196,8 @@ class ExternalState(BaseModel):
             users=list(internal.users),
             summary=internal.summary,
             last_reasoning=internal.reasoning_messages,
-            memory_records=list(getattr(internal, "memory_records", []) or []),
-            highlights=list(getattr(internal, "highlights", []) or []),
-            improvements=list(getattr(internal, "improvements", []) or []),
             thread_info_entries=list(getattr(internal, "thread_info_entries", []) or []),
+            thread_context=dict(getattr(internal, "thread_context", {}) or {}),
             chat_manager_response_stats=dict(getattr(internal, "chat_manager_response_stats", {}) or {}),
         )
 
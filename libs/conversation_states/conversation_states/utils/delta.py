@@ -0,0 +1,30 @@
+from typing import Any, Union
+
+from pydantic import BaseModel
+
+
+_MISSING = object()
+
+
+def state_delta(state: Any, update: Union[BaseModel, dict]) -> dict:
+    """
+    Turn a node result into a partial update: only channels whose value differs
+    from the current `state` are kept, so reducers and the checkpointer see just
+    the change. None values mean "not touched".
+
+    `update` may be a dict or a state model (only explicitly set fields count).
+    """
+    if isinstance(update, BaseModel):
+        values = {k: getattr(update, k) for k in update.model_fields_set}
+    else:
+        values = dict(update)
+
+    out: dict = {}
+    for key, value in values.items():
+        if value is None:
+            continue
+        current = getattr(state, key, _MISSING)
+        if current is not _MISSING and current == value:
+            continue
+        out[key] = value
+    return out
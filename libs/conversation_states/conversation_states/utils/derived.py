@@ -0,0 +1,55 @@
+import threading
+import weakref
+from typing import Any, Callable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class DerivedCache:
+    """
+    Indexes derived from collection lists, kept by the owner of the lists (a
+    ThreadRepository for one run, a state for its messages).
+
+    One entry per name. It is reused while the same list object is passed and the
+    list's source has not been invalidated; records appended to the list are the
+    index's own business (indexes extend themselves on access). Whoever changes
+    records in place calls `invalidate` for their source.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[str, tuple[list, int, Any]] = {}
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, items: list, build: Callable[[list], T], *, source: str = "") -> T:
+        with self._lock:
+            version = self._versions.get(source, 0)
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] is items and entry[1] == version:
+                return entry[2]
+            value = build(items)
+            self._entries[name] = (items, version, value)
+            return value
+
+    def invalidate(self, source: str = "") -> None:
+        with self._lock:
+            self._versions[source] = self._versions.get(source, 0) + 1
+
+
+_OWNED: dict[int, DerivedCache] = {}
+_OWNED_LOCK = threading.Lock()
+
+
+def owned_cache(owner: object) -> DerivedCache:
+    """
+    DerivedCache of an object that cannot hold one itself (a state model: its
+    attributes are checkpointed). The cache is dropped when the owner is collected.
+    """
+    key = id(owner)
+    with _OWNED_LOCK:
+        cache = _OWNED.get(key)
+        if cache is None:
+            cache = _OWNED[key] = DerivedCache()
+            weakref.finalize(owner, _OWNED.pop, key, None)
+        return cache
@@ -66,10 +66,22 @@ def add_user(left: list["Human"], right: list["Human"]) -> list["Human"]:
         except Exception:
             pass
 
+        # Activity aggregates only ever grow; stale snapshots (e.g. from the chatbot) are harmless.
+        lu.merge_activity(ru)
+
     return left
 
 
+class ClearedCollection(list):
+    """
+    Empty update that resets a collection channel (highlights, memory records,
+    improvements) once its records live in the store; a plain [] merges nothing.
+    """
+
+
 def add_memory_records(left: list["MemoryRecord"], right: list["MemoryRecord"]) -> list["MemoryRecord"]:
+    if isinstance(right, ClearedCollection):
+        return []
     # Normalize dict payloads from checkpoints.
     right = [r if isinstance(r, MemoryRecord) else MemoryRecord(**r) for r in right or []]
 
@@ -93,6 +105,8 @@ def add_memory_records(left: list["MemoryRecord"], right: list["MemoryRecord"])
 
 
 def add_highlights(left: list["Highlight"], right: list["Highlight"]) -> list["Highlight"]:
+    if isinstance(right, ClearedCollection):
+        return []
     right = [h if isinstance(h, Highlight) else Highlight(**h) for h in right or []]
 
     by_id = {getattr(h, "id", None): h for h in left or [] if getattr(h, "id", None)}
@@ -127,6 +141,8 @@ def add_highlights(left: list["Highlight"], right: list["Highlight"]) -> list["H
 
 
 def add_improvements(left: list["Improvement"], right: list["Improvement"]) -> list["Improvement"]:
+    if isinstance(right, ClearedCollection):
+        return []
     right = [i if isinstance(i, Improvement) else Improvement(**i) for i in right or []]
 
     by_id = {getattr(i, "id", None): i for i in left or [] if getattr(i, "id", None)}
@@ -148,6 +164,13 @@ def add_improvements(left: list["Improvement"], right: list["Improvement"]) -> l
     return left
 
 
+def merge_thread_context(left: Optional[dict], right: Optional[dict]) -> dict:
+    # Inputs without thread context (admin panel, cron) must not wipe hoisted values.
+    merged = dict(left or {})
+    merged.update({k: v for k, v in (right or {}).items() if v is not None})
+    return merged
+
+
 def manage_state(
     a: Optional[Union["InternalState", list[Any]]],
     b: Optional[Union["InternalState", list[Any]]]
@@ -64,14 +64,19 @@ export async function getThread(threadId) {
 }
 
 /**
- * Get thread history (checkpoints)
+ * Get thread history (checkpoints), newest first
  * @param {string} threadId - Thread ID
- * @returns {Promise<Array>} Array of checkpoint objects
+ * @param {Object} [options]
+ * @param {number} [options.limit] - Page size (1-100, default 10)
+ * @param {string} [options.before] - Cursor: checkpoint_id of the last item of the previous page
+ * @returns {Promise<{items: Array, nextCursor: string|null}>} Checkpoints and the cursor of the next page
  */
-export async function getThreadHistory(threadId) {
+export async function getThreadHistory(threadId, { limit = 10, before = null } = {}) {
   try {
-    const response = await api.get(`/threads/${threadId}/history`)
-    return response.data
+    const params = { limit }
+    if (before) params.before = before
+    const response = await api.get(`/threads/${threadId}/history`, { params })
+    return { items: response.data, nextCursor: response.headers['x-next-cursor'] || null }
   } catch (error) {
     console.error(`Error getting history for thread ${threadId}:`, error)
     throw error
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Backfill per-user intro status (has_intro_message_at, intro_message_id, intro_message
+link) from the message history of existing threads.
+
+Usage:
+  LANGGRAPH_API_URL=http://localhost:2024 python scripts/backfill_intro_status.py [--thread ID] [--as-node NODE] [--dry-run]
+
+The update is applied as a write of --as-node (default: graph_supervisor's
+ingest_message, which owns `users` and leads straight to END, so no node is
+left pending on the thread).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "libs" / "conversation_states"))
+
+from langgraph_sdk import get_client  # noqa: E402
+
+from conversation_states.states import ExternalState  # noqa: E402
+
+_PAGE_SIZE = 100
+_AS_NODE = "ingest_message"
+
+
+async def _thread_ids(client, only: str | None) -> list[str]:
+    if only:
+        return [only]
+    ids: list[str] = []
+    offset = 0
+    while True:
+        page = await client.threads.search(limit=_PAGE_SIZE, offset=offset)
+        ids.extend(str(t["thread_id"]) for t in page)
+        if len(page) < _PAGE_SIZE:
+            return ids
+        offset += len(page)
+
+
+async def _backfill_thread(client, thread_id: str, dry_run: bool, as_node: str = _AS_NODE) -> int:
+    snapshot = await client.threads.get_state(thread_id)
+    values = (snapshot or {}).get("values") or {}
+    if not isinstance(values, dict) or not values.get("messages") or not values.get("users"):
+        return 0
+    state = ExternalState(**values)
+    changed = state.backfill_intro_status()
+    if changed and not dry_run:
+        # add_user merges by username, so only the changed users are sent.
+        await client.threads.update_state(
+            thread_id,
+            {"users": [u.model_dump(mode="json") for u in changed]},
+            as_node=as_node,
+        )
+    for user in changed:
+        print(f"{thread_id} @{user.username}: intro {user.intro_message_id} at {user.has_intro_message_at.isoformat()}")
+    return len(changed)
+
+
+async def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--thread", help="only this thread id")
+    parser.add_argument("--as-node", default=_AS_NODE, help=f"node the update is attributed to (default: {_AS_NODE})")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    url = os.getenv("LANGGRAPH_API_URL")
+    if not url:
+        print("LANGGRAPH_API_URL is not set", file=sys.stderr)
+        return 2
+    client = get_client(url=url)
+    total = 0
+    threads = await _thread_ids(client, args.thread)
+    for thread_id in threads:
+        try:
+            total += await _backfill_thread(client, thread_id, args.dry_run, args.as_node)
+        except Exception as exc:
+            print(f"{thread_id}: failed: {exc}", file=sys.stderr)
+    print(f"threads: {len(threads)}, users updated: {total}{' (dry run)' if args.dry_run else ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main(sys.argv[1:])))
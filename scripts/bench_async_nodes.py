@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Concurrent supervisor runs per worker with a fake, fixed-latency chat model.
+
+"blocking" mimics the old sync nodes: every LLM call holds an executor thread
+for its whole latency. "async" awaits the call on the event loop.
+
+Usage:
+  python scripts/bench_async_nodes.py [--runs 64] [--threads 4] [--latency 0.5]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "langgraph-app"))
+sys.path.insert(0, str(ROOT / "libs" / "conversation_states"))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatResult  # noqa: E402
+
+from conversation_states.humans import Human  # noqa: E402
+from lg_main.g_supervisor import nodes as supervisor_nodes  # noqa: E402
+from lg_main.g_supervisor.graph import graph_supervisor  # noqa: E402
+
+
+class FakeLatencyChatModel(BaseChatModel):
+    """Answers every guard with a fixed verdict after `latency` seconds; tracks peak in-flight calls."""
+
+    latency: float = 0.5
+    blocking: bool = False
+    in_flight: int = 0
+    peak: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-latency"
+
+    def _enter(self) -> None:
+        with _LOCK:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def _exit(self) -> None:
+        with _LOCK:
+            self.in_flight -= 1
+
+    def _result(self) -> ChatResult:
+        message = AIMessage(content='{"allow": false, "reason": "bench"}')
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self._enter()
+        try:
+            time.sleep(self.latency)
+        finally:
+            self._exit()
+        return self._result()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.blocking:
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._enter()
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self._exit()
+        return self._result()
+
+
+_LOCK = threading.Lock()
+
+
+def _run_input(i: int) -> dict:
+    user = Human(username=f"user{i}", first_name="Bench", intro_completed=True)
+    message = HumanMessage(
+        content="useful article https://example.com/post",
+        name=user.username,
+        additional_kwargs={"tg_message_id": str(i)},
+    )
+    return {"messages": [message], "users": [user], "thread_context": {"require_intro": False}}
+
+
+async def _bench(mode: str, runs: int, threads: int, latency: float) -> dict:
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=threads))
+    model = FakeLatencyChatModel(latency=latency, blocking=(mode == "blocking"))
+    supervisor_nodes.llm = model
+
+    started = time.perf_counter()
+    await asyncio.gather(*(graph_supervisor.ainvoke(_run_input(i)) for i in range(runs)))
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "runs": runs,
+        "threads": threads,
+        "elapsed_s": round(elapsed, 2),
+        "runs_per_s": round(runs / elapsed, 1),
+        "peak_concurrent_llm_calls": model.peak,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    for mode in ("blocking", "async"):
+        result = asyncio.run(_bench(mode, args.runs, args.threads, args.latency))
+        print("  ".join(f"{k}={v}" for k, v in result.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
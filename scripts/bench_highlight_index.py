@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark: highlight dedupe, delete and filtered search through HighlightIndex vs
+the previous full scans of state.highlights, on a synthetic thread. The indexed
+side runs inside a graph run with a store, where the index is kept with the run's
+repository as it is for tool calls.
+
+Usage:
+  python scripts/bench_highlight_index.py [--highlights 50000] [--iterations 200]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import TypedDict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "langgraph-app"))
+
+from langgraph.graph import START, StateGraph  # noqa: E402
+from langgraph.store.memory import InMemoryStore  # noqa: E402
+
+from conversation_states.highlights import Highlight  # noqa: E402
+from conversation_states.repository import ThreadRepository, thread_repository  # noqa: E402
+from conversation_states.states import InternalState  # noqa: E402
+from tool_sets.highlights import (  # noqa: E402
+    _normalize_link,
+    _search_highlights_impl,
+    _utc_now,
+    highlight_index,
+)
+
+CATEGORIES = ["jobs", "resources", "services"]
+AUTHORS = [f"user{i}" for i in range(200)]
+TAGS = [f"tag{i}" for i in range(300)]
+
+
+def legacy_find_link(items: list[Highlight], link: str) -> list[Highlight]:
+    return [h for h in items if _normalize_link(str(h.highlight_link or "")) == link and h.deleted_at is None]
+
+
+def legacy_search(items: list[Highlight], *, author: str = "", tags: set[str] = frozenset(), days: int | None = None) -> list[Highlight]:
+    now = _utc_now()
+    out = []
+    for h in items:
+        if h.deleted_at is not None or (h.expires_at is not None and h.expires_at < now):
+            continue
+        if author and h.author_username.lower() != author:
+            continue
+        if days is not None and h.published_at < now - timedelta(days=days):
+            continue
+        if tags and not tags.intersection(h.tags or []):
+            continue
+        out.append(h)
+    out.sort(key=lambda r: r.published_at, reverse=True)
+    return out
+
+
+def build(n: int) -> list[Highlight]:
+    rnd = random.Random(7)
+    now = _utc_now()
+    rows = []
+    for i in range(n):
+        rows.append(
+            Highlight(
+                id=f"h{i}",
+                category=rnd.choice(CATEGORIES),
+                tags=rnd.sample(TAGS, rnd.randint(0, 3)),
+                highlight_link=f"https://t.me/c/100/{i}",
+                highlight_description="description",
+                message_text="message",
+                author_username=rnd.choice(AUTHORS),
+                author_telegram_id=rnd.randint(1, 200),
+                published_at=now - timedelta(minutes=(n - i) * 5),
+            )
+        )
+    return rows
+
+
+def bench(label: str, fn, iterations: int) -> None:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    print(f"{label:34} {(time.perf_counter() - started) / iterations * 1e3:9.3f} ms/op")
+
+
+def run_benchmarks(highlights: int, iterations: int) -> None:
+    repo = thread_repository()
+    state = InternalState.model_construct(highlights=repo.collection("highlights"))
+    items = state.highlights
+    started = time.perf_counter()
+    highlight_index(state)
+    print(f"{len(items)} highlights, index build {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+    link = _normalize_link(f"https://t.me/c/100/{highlights // 2}")
+    n = iterations
+    bench("dedupe/delete lookup: legacy", lambda: legacy_find_link(items, link), max(1, n // 10))
+    bench("dedupe/delete lookup: index", lambda: highlight_index(state).with_link(link), n)
+
+    cases = {
+        "author": {"author_username": "user42"},
+        "tag": {"tags": ["tag7"]},
+        "last day": {"days": 1},
+        "author+tag+7 days": {"author_username": "user42", "tags": ["tag7", "tag8"], "days": 7},
+    }
+    for name, kw in cases.items():
+        legacy_kw = {
+            "author": kw.get("author_username", ""),
+            "tags": set(kw.get("tags") or ()),
+            "days": kw.get("days"),
+        }
+        expected = [h.id for h in legacy_search(items, **legacy_kw)][:20]
+        got = [r["id"] for r in _search_highlights_impl(state=state, **kw)["items"]]
+        assert got == expected, name
+        bench(f"search {name}: legacy", lambda: legacy_search(items, **legacy_kw), max(1, n // 10))
+        bench(f"search {name}: index", lambda: _search_highlights_impl(state=state, **kw), n)
+
+
+class _RunState(TypedDict, total=False):
+    done: bool
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--highlights", type=int, default=50000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    store = InMemoryStore()
+    ThreadRepository(store, "bench").sync("highlights", build(args.highlights))
+
+    def node(_: _RunState) -> _RunState:
+        run_benchmarks(args.highlights, args.iterations)
+        return {"done": True}
+
+    graph = StateGraph(_RunState)
+    graph.add_node("bench", node)
+    graph.add_edge(START, "bench")
+    graph.compile(store=store).invoke({}, {"configurable": {"thread_id": "bench", "run_id": "bench"}})
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
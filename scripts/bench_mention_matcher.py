@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: compiled mention matcher vs the previous per-call implementation
+(env parsing + two webapp-link substitutions + one regex/substring check per alias).
+
+Usage:
+  python scripts/bench_mention_matcher.py [--iterations 20000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "langgraph-app"))
+
+from config.mentions import mention_matcher  # noqa: E402
+
+
+def _legacy_mention_tokens() -> list[str]:
+    raw = os.getenv(
+        "BOT_MENTION_TOKENS",
+        "victorai,@victorai,викор,victorducoai_bot,@victorducoai_bot,victorai_dev_bot,@victorai_dev_bot",
+    ).strip()
+    return [x.strip().lower() for x in raw.split(",") if x.strip()]
+
+
+def _legacy_strip(text: str) -> str:
+    out = re.sub(r"(?:https?://)?t\.me/[a-z0-9_]+/app(?:\?[^\s]*)?", " ", text, flags=re.IGNORECASE)
+    return re.sub(r"@[a-z0-9_]+/app(?:\?[^\s]*)?", " ", out, flags=re.IGNORECASE)
+
+
+def legacy_is_mentioned(text: str) -> bool:
+    t = _legacy_strip(text.lower())
+    for tok in _legacy_mention_tokens():
+        if tok.startswith("@"):
+            if tok in t:
+                return True
+            continue
+        if re.search(rf"(?<!\\w){re.escape(tok)}(?!\\w)", t):
+            return True
+    return False
+
+
+SAMPLES = [
+    "всем привет, кто идёт сегодня на митап?",
+    "Викор, сохрани идею про еженедельный дайджест",
+    "спроси у викора, он знает",
+    "look at this https://habr.com/ru/articles/123456/ pretty good",
+    "открой t.me/victorai_dev_bot/app?startapp=abc",
+    "@victorai_dev_bot покажи хайлайты за неделю",
+    "lorem ipsum " * 40,
+]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    for text in SAMPLES:
+        print(f"{legacy_is_mentioned(text)!s:5} {mention_matcher.mentions(text)!s:5}  {text[:60]!r}")
+
+    for name, fn in (("legacy", legacy_is_mentioned), ("compiled", mention_matcher.mentions)):
+        elapsed = timeit.timeit(lambda: [fn(t) for t in SAMPLES], number=args.iterations)
+        per_call_us = elapsed / (args.iterations * len(SAMPLES)) * 1e6
+        print(f"{name}: {per_call_us:.2f} us/message")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Checkpoint size report for an exported thread.
+
+Usage:
+  curl -s "$LANGGRAPH_API_URL/threads/<thread_id>/state" > state.json
+  python scripts/checkpoint_size_report.py state.json
+"""
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "libs" / "conversation_states"))
+
+from conversation_states.compact import size_report  # noqa: E402
+
+
+def main(argv: list[str]) -> int:
+    if len(argv) != 2:
+        print(__doc__.strip(), file=sys.stderr)
+        return 2
+    data = json.loads(Path(argv[1]).read_text(encoding="utf-8"))
+    values = data.get("values", data) if isinstance(data, dict) else {}
+    report = size_report(values or {})
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    before = report["checkpoint_bytes_before"]
+    after = report["checkpoint_bytes_after"]
+    if before:
+        print(f"checkpoint_saving: {100.0 * (before - after) / before:.1f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
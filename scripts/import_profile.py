@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for each graph in langgraph-app/langgraph.json: every graph
+module is imported in a fresh interpreter under `python -X importtime` and the
+report is summarized per graph as the cold import time, the heaviest third-party
+packages (self time) and the heaviest first-party modules (cumulative time).
+
+It also lists modules that graphs are meant to load only when a node first runs
+(openai, tiktoken, tool sets, prompt builder, test fixtures) but that were
+imported eagerly anyway.
+
+Usage:
+  python scripts/import_profile.py [--graph NAME] [--top N] [--budget-ms MS] [--strict] [--markdown]
+
+Exits 1 when a graph exceeds --budget-ms, or (with --strict) imports a deferred
+module eagerly.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "langgraph-app"
+
+FIRST_PARTY = ("lg_main", "tool_sets", "prompt_templates", "testing_utils", "conversation_states")
+
+# Loaded by nodes on first use; a graph module importing them pays for them on every cold start.
+DEFERRED = (
+    "openai",
+    "tiktoken",
+    "langchain_openai",
+    "testing_utils",
+    "prompt_templates.prompt_builder",
+    "tool_sets.chat_memory",
+    "tool_sets.highlights",
+    "tool_sets.improvements",
+    "tool_sets.user_profile",
+)
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def _graphs() -> dict[str, str]:
+    config = json.loads((APP_DIR / "langgraph.json").read_text())
+    return {name: target.split(":", 1)[0] for name, target in config["graphs"].items()}
+
+
+def _importtime(module: str) -> list[tuple[str, int, int, int]]:
+    """(module, self us, cumulative us, depth) for every import of `module`, in report order."""
+    env = {**os.environ, "PYTHONPATH": str(APP_DIR), "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "sk-startup-probe"}
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if out.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{out.stderr[-2000:]}")
+    rows = []
+    for line in out.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def _deferred_root(name: str) -> str | None:
+    return next((d for d in DEFERRED if name == d or name.startswith(d + ".")), None)
+
+
+def summarize(module: str, top: int) -> dict:
+    rows = _importtime(module)
+    by_package: dict[str, int] = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        by_package[name.split(".", 1)[0]] += self_us
+    # The graph module and its parent packages would only repeat the total.
+    enclosing = {module.rsplit(".", i)[0] for i in range(module.count(".") + 1)}
+    cumulative: dict[str, int] = {}
+    for name, _, cumulative_us, _ in rows:
+        if name.split(".", 1)[0] in FIRST_PARTY and name not in enclosing:
+            cumulative[name] = max(cumulative.get(name, 0), cumulative_us)
+    first_party = sorted(cumulative.items(), key=lambda kv: -kv[1])
+    target = next((cumulative_us for name, _, cumulative_us, _ in rows if name == module), None)
+    return {
+        "module": module,
+        "total_ms": round((target if target is not None else sum(r[1] for r in rows)) / 1000, 1),
+        "modules": len(rows),
+        "packages": [
+            (package, round(us / 1000, 1))
+            for package, us in sorted(by_package.items(), key=lambda kv: -kv[1])
+            if package not in FIRST_PARTY
+        ][:top],
+        "first_party": [(name, round(us / 1000, 1)) for name, us in first_party[:top]],
+        "eager": sorted({root for root in (_deferred_root(name) for name, *_ in rows) if root}),
+    }
+
+
+def _print_text(name: str, report: dict) -> None:
+    print(f"{name}  ({report['module']}): {report['total_ms']:.0f} ms, {report['modules']} modules")
+    print("  packages (self ms):    " + ", ".join(f"{p} {ms:.0f}" for p, ms in report["packages"]))
+    print("  first-party (cum ms):  " + ", ".join(f"{m} {ms:.0f}" for m, ms in report["first_party"]))
+    print("  eager deferred:        " + (", ".join(report["eager"]) or "-"))
+
+
+def _print_markdown(reports: dict[str, dict], budget_ms: float | None) -> None:
+    print("### Graph cold start (import time)\n")
+    print("| graph | import ms | modules | heaviest packages (self ms) | eager deferred |")
+    print("|---|---:|---:|---|---|")
+    for name, report in reports.items():
+        over = " ⚠️" if budget_ms is not None and report["total_ms"] > budget_ms else ""
+        packages = ", ".join(f"{p} {ms:.0f}" for p, ms in report["packages"][:5])
+        print(f"| {name} | {report['total_ms']:.0f}{over} | {report['modules']} | {packages} | {', '.join(report['eager']) or '-'} |")
+    if budget_ms is not None:
+        print(f"\nBudget: {budget_ms:.0f} ms per graph")
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--graph", action="append", help="only this graph (repeatable; default: all in langgraph.json)")
+    parser.add_argument("--top", type=int, default=8, help="entries per list")
+    parser.add_argument("--budget-ms", type=float, help="fail when a graph's cold import exceeds this")
+    parser.add_argument("--strict", action="store_true", help="fail when a deferred module is imported eagerly")
+    parser.add_argument("--markdown", action="store_true", help="print a markdown table (CI job summary)")
+    args = parser.parse_args(argv)
+
+    graphs = _graphs()
+    unknown = set(args.graph or ()) - set(graphs)
+    if unknown:
+        print(f"unknown graph(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    reports = {name: summarize(module, args.top) for name, module in graphs.items() if not args.graph or name in args.graph}
+    if args.markdown:
+        _print_markdown(reports, args.budget_ms)
+    else:
+        for name, report in reports.items():
+            _print_text(name, report)
+
+    failed = False
+    for name, report in reports.items():
+        if args.budget_ms is not None and report["total_ms"] > args.budget_ms:
+            print(f"{name}: {report['total_ms']:.0f} ms exceeds budget {args.budget_ms:.0f} ms", file=sys.stderr)
+            failed = True
+        if args.strict and report["eager"]:
+            print(f"{name}: imports deferred modules eagerly: {', '.join(report['eager'])}", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Startup cost of each graph in langgraph-app/langgraph.json: every graph module is
+imported in a fresh interpreter and the import wall time is reported together
+with the chat models built during import (the registry builds them on first use,
+so this should be empty) and the time to build the first model.
+
+Usage:
+  python scripts/measure_startup.py [--repeat N]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "langgraph-app"
+
+_PROBE = """
+import json, time
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+from lg_main.models import models
+built_at_import = models.built()
+models.chat("default")
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "built_at_import": built_at_import,
+    "first_model_ms": (time.perf_counter() - imported) * 1000,
+}}))
+"""
+
+
+def _graphs() -> dict[str, str]:
+    config = json.loads((APP_DIR / "langgraph.json").read_text())
+    return {name: target.split(":", 1)[0] for name, target in config["graphs"].items()}
+
+
+def _probe(module: str) -> dict:
+    env = {**os.environ, "PYTHONPATH": str(APP_DIR), "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "sk-startup-probe"}
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module)],
+        cwd=APP_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per graph (median is reported)")
+    args = parser.parse_args(argv)
+
+    print(f"{'graph':28} {'import ms':>10} {'first model ms':>15}  built at import")
+    for name, module in _graphs().items():
+        runs = [_probe(module) for _ in range(max(1, args.repeat))]
+        import_ms = statistics.median(r["import_ms"] for r in runs)
+        model_ms = statistics.median(r["first_model_ms"] for r in runs)
+        built = ",".join(runs[-1]["built_at_import"]) or "-"
+        print(f"{name:28} {import_ms:10.0f} {model_ms:15.0f}  {built}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
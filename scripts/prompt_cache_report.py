@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Aggregate provider prompt-cache telemetry (chat_manager_response_stats["prompt_cache"])
+across threads: cached-token ratio, hit-call share and average latency of cache hits
+vs misses per node and prompt version.
+
+Usage:
+  LANGGRAPH_API_URL=http://localhost:2024 python scripts/prompt_cache_report.py [--thread ID]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+
+from langgraph_sdk import get_client
+
+_PAGE_SIZE = 100
+
+
+async def _thread_ids(client, only: str | None) -> list[str]:
+    if only:
+        return [only]
+    ids: list[str] = []
+    offset = 0
+    while True:
+        page = await client.threads.search(limit=_PAGE_SIZE, offset=offset)
+        ids.extend(str(t["thread_id"]) for t in page)
+        if len(page) < _PAGE_SIZE:
+            return ids
+        offset += len(page)
+
+
+def _merge(total: dict, entry: dict) -> None:
+    for key in ("calls", "input_tokens", "cached_tokens", "hit_calls", "hit_ms_total", "miss_ms_total"):
+        total[key] = total.get(key, 0) + (entry.get(key) or 0)
+
+
+async def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--thread", help="only this thread id")
+    args = parser.parse_args(argv)
+
+    url = os.getenv("LANGGRAPH_API_URL")
+    if not url:
+        print("LANGGRAPH_API_URL is not set", file=sys.stderr)
+        return 2
+    client = get_client(url=url)
+
+    totals: dict[tuple[str, str], dict] = {}
+    for thread_id in await _thread_ids(client, args.thread):
+        try:
+            snapshot = await client.threads.get_state(thread_id)
+        except Exception as exc:
+            print(f"{thread_id}: failed: {exc}", file=sys.stderr)
+            continue
+        values = (snapshot or {}).get("values") or {}
+        stats = values.get("chat_manager_response_stats") if isinstance(values, dict) else None
+        for node, entry in ((stats or {}).get("prompt_cache") or {}).items():
+            _merge(totals.setdefault((node, str(entry.get("version") or "")), {}), entry)
+
+    print(f"{'node':32} {'version':12} {'calls':>6} {'cached%':>8} {'hit%':>6} {'hit ms':>8} {'miss ms':>8}")
+    for (node, version), t in sorted(totals.items()):
+        calls = int(t.get("calls") or 0)
+        hits = int(t.get("hit_calls") or 0)
+        misses = calls - hits
+        cached_pct = 100 * t["cached_tokens"] / t["input_tokens"] if t.get("input_tokens") else 0.0
+        hit_ms = t.get("hit_ms_total", 0) / hits if hits else 0.0
+        miss_ms = t.get("miss_ms_total", 0) / misses if misses else 0.0
+        print(
+            f"{node:32} {version:12} {calls:6d} {cached_pct:7.1f}% {100 * hits / max(calls, 1):5.1f}% "
+            f"{hit_ms:8.0f} {miss_ms:8.0f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main(sys.argv[1:])))
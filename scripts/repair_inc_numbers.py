@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Consistency check for improvement task numbers (INCxxxxx) stored in the LangGraph
+store: finds duplicate or invalid numbers per thread, renumbers all but the
+earliest created record of each duplicate, and moves the thread's INC sequence
+past the highest number in use. Dry run unless --apply is given.
+
+Usage:
+  LANGGRAPH_API_URL=http://localhost:2024 python scripts/repair_inc_numbers.py [--thread ID] [--apply]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+from langgraph_sdk import get_client
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "langgraph-app"))
+
+from conversation_states.improvements import Improvement  # noqa: E402
+from conversation_states.repository import SEQUENCES_DOCUMENT  # noqa: E402
+from tool_sets.improvements import INC_SEQUENCE, format_inc, max_inc_number, repair_inc_numbers  # noqa: E402
+
+_PAGE_SIZE = 100
+
+
+async def _thread_ids(client, only: str | None) -> list[str]:
+    if only:
+        return [only]
+    ids: list[str] = []
+    offset = 0
+    while True:
+        page = await client.threads.search(limit=_PAGE_SIZE, offset=offset)
+        ids.extend(str(t["thread_id"]) for t in page)
+        if len(page) < _PAGE_SIZE:
+            return ids
+        offset += len(page)
+
+
+async def _improvements(client, thread_id: str) -> list[Improvement]:
+    out: list[Improvement] = []
+    offset = 0
+    while True:
+        page = (await client.store.search_items(["threads", thread_id, "improvements"], limit=_PAGE_SIZE, offset=offset))["items"]
+        for item in page:
+            try:
+                out.append(Improvement(**item["value"]))
+            except Exception as exc:
+                print(f"{thread_id}: skipping unreadable improvement {item.get('key')}: {exc}", file=sys.stderr)
+        if len(page) < _PAGE_SIZE:
+            return out
+        offset += len(page)
+
+
+async def _sequences(client, thread_id: str) -> dict:
+    try:
+        item = await client.store.get_item(["threads", thread_id, "meta"], SEQUENCES_DOCUMENT)
+    except Exception:
+        return {}
+    return dict((item or {}).get("value") or {})
+
+
+async def _repair_thread(client, thread_id: str, apply: bool) -> int:
+    items = await _improvements(client, thread_id)
+    if not items:
+        return 0
+    sequences = await _sequences(client, thread_id)
+    next_value = max(int(sequences.get(INC_SEQUENCE) or 0), max_inc_number(items)) + 1
+
+    def allocate(count: int) -> list[str]:
+        nonlocal next_value
+        numbers = [format_inc(next_value + i) for i in range(count)]
+        next_value += count
+        return numbers
+
+    changes = repair_inc_numbers(items, allocate)
+    for change in changes:
+        print(f"{thread_id}: {change['id']} {change['from'] or '-'} -> {change['to']}")
+    if apply:
+        by_id = {i.id: i for i in items}
+        for change in changes:
+            await client.store.put_item(
+                ["threads", thread_id, "improvements"], change["id"], by_id[change["id"]].model_dump(mode="json")
+            )
+        if sequences.get(INC_SEQUENCE) != next_value - 1:
+            await client.store.put_item(
+                ["threads", thread_id, "meta"], SEQUENCES_DOCUMENT, {**sequences, INC_SEQUENCE: next_value - 1}
+            )
+    return len(changes)
+
+
+async def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--thread", help="only this thread id")
+    parser.add_argument("--apply", action="store_true", help="write the repairs (default: report only)")
+    args = parser.parse_args(argv)
+
+    url = os.getenv("LANGGRAPH_API_URL")
+    if not url:
+        print("LANGGRAPH_API_URL is not set", file=sys.stderr)
+        return 2
+    client = get_client(url=url)
+
+    total = 0
+    for thread_id in await _thread_ids(client, args.thread):
+        try:
+            total += await _repair_thread(client, thread_id, args.apply)
+        except Exception as exc:
+            print(f"{thread_id}: failed: {exc}", file=sys.stderr)
+    print(f"{total} task numbers {'repaired' if args.apply else 'to repair (dry run)'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main(sys.argv[1:])))
@@ -11,7 +11,9 @@ This prevents users from accessing threads/chats they don't belong to.
 
 import os
 import logging
-from fastapi import FastAPI, HTTPException, Header, Request
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Header, Query, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import httpx
@@ -52,6 +54,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -164,10 +167,16 @@ async def get_thread_state(
 @app.get("/threads/{thread_id}/history")
 async def get_thread_history(
     thread_id: str,
+    limit: int = Query(10, ge=1, le=100),
+    before: Optional[str] = Query(None, description="checkpoint_id cursor: return checkpoints older than it"),
     x_telegram_init_data: str = Header(None)
 ):
     """
-    Get thread history with authentication.
+    Get thread history with authentication, newest checkpoint first.
+
+    Paging is keyset-based: pass the checkpoint_id of the last returned item as
+    `before` to get the next page; the X-Next-Cursor response header carries it
+    when the page is full.
 
     Headers:
         X-Telegram-Init-Data: Telegram WebApp initData (required)
@@ -184,12 +193,20 @@ async def get_thread_history(
     # Fetch history from LangGraph
     try:
         async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(f"{LANGGRAPH_API_URL}/threads/{thread_id}/history")
+            params = {"limit": limit}
+            if before:
+                params["before"] = before
+            response = await client.get(f"{LANGGRAPH_API_URL}/threads/{thread_id}/history", params=params)
             response.raise_for_status()
             history = response.json()
 
         logger.info(f"Returned thread history for thread {thread_id} to user {user_id}")
-        return history
+        headers = {}
+        if isinstance(history, list) and len(history) >= limit:
+            last_checkpoint = (history[-1].get("checkpoint") or {}) if isinstance(history[-1], dict) else {}
+            if last_checkpoint.get("checkpoint_id"):
+                headers["X-Next-Cursor"] = str(last_checkpoint["checkpoint_id"])
+        return JSONResponse(content=history, headers=headers)
 
     except httpx.HTTPError as e:
         logger.error(f"Failed to fetch thread history: {e}")